@@ -0,0 +1,207 @@
+"""Artefato compacto e versionado de um modelo treinado.
+
+Um único arquivo .npy (vetor uint8) reúne tudo o que o dashboard e a API leem do
+modelo: os nós da floresta compilada em int32/float32, os parâmetros do scaler, os
+nomes das features, R²/MAPE, as previsões do conjunto de teste e os resultados
+pré-calculados (dependência parcial, SHAP). O conteúdo é:
+
+    [8 bytes: tamanho do manifesto][manifesto JSON][vetores, alinhados em 64 bytes]
+
+O manifesto descreve o formato, a versão, o hash SHA-256 do conteúdo e, para cada
+vetor, dtype, forma e posição. Como é um .npy comum, abre com
+np.load(mmap_mode="r"): os vetores são vistas do arquivo mapeado, sem pickle nem
+cópia, e as páginas são compartilhadas entre os processos que abrem o mesmo modelo.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import sklearn
+
+from motor_inferencia import FlorestaCompilada
+
+FORMATO = "artefato-floresta"
+VERSAO = 1
+ALINHAMENTO = 64
+BYTES_TAMANHO = 8
+
+
+def _alinhar(posicao):
+    return -(-posicao // ALINHAMENTO) * ALINHAMENTO
+
+
+def _serializavel(valor):
+    """Parâmetros do sklearn e escalares NumPy em tipos aceitos pelo JSON"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (str, int, float, bool)) or valor is None:
+        return valor
+    return str(valor)
+
+
+def _hash(manifesto, dados):
+    """SHA-256 do manifesto (sem o próprio hash) seguido dos bytes dos vetores"""
+    conteudo = {chave: valor for chave, valor in manifesto.items() if chave != "hash"}
+    resumo = hashlib.sha256(json.dumps(conteudo, sort_keys=True).encode("utf-8"))
+    resumo.update(dados)
+    return resumo.hexdigest()
+
+
+def salvar_artefato(caminho, pipeline, metricas, vetores, **metadados):
+    """Grava o artefato do pipeline em `caminho` e retorna o manifesto
+
+    metricas: {"r2": ..., "mape": ...} no conjunto de teste.
+    vetores: nome -> array numérico (ex.: "teste/y_real", "shap/shap"); os da
+    floresta e do scaler são acrescentados aqui.
+    metadados: demais campos do manifesto (região, linhas de treino...).
+    """
+    floresta = FlorestaCompilada.compilar(pipeline, compacta=True)
+    rf = pipeline.named_steps["rf"]
+    todos = {
+        **{f"floresta/{nome}": getattr(floresta, nome) for nome in floresta.VETORES},
+        **{
+            f"scaler/{nome}": getattr(floresta, nome)
+            for nome in floresta.VETORES_SCALER
+        },
+        **vetores,
+    }
+
+    descricao, partes, posicao = {}, [], 0
+    for nome, array in todos.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.kind not in "biuf":
+            raise ValueError(f"Vetor {nome} não é numérico ({array.dtype})")
+        descricao[nome] = {
+            "dtype": array.dtype.str,
+            "forma": list(array.shape),
+            "inicio": posicao,
+        }
+        partes.append((posicao, array))
+        posicao = _alinhar(posicao + array.nbytes)
+    dados = bytearray(posicao)
+    for inicio, array in partes:
+        dados[inicio : inicio + array.nbytes] = array.tobytes()
+
+    manifesto = {
+        "formato": FORMATO,
+        "versao": VERSAO,
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sklearn": sklearn.__version__,
+        "features": list(floresta.features),
+        "profundidade": floresta.profundidade,
+        "arvores": len(rf.estimators_),
+        "parametros": {
+            nome: _serializavel(valor) for nome, valor in rf.get_params().items()
+        },
+        "importancias": rf.feature_importances_.tolist(),
+        "metricas": {nome: float(valor) for nome, valor in metricas.items()},
+        **metadados,
+        "vetores": descricao,
+    }
+    manifesto["hash"] = _hash(manifesto, dados)
+
+    cabecalho = json.dumps(manifesto, ensure_ascii=False).encode("utf-8")
+    inicio_dados = _alinhar(BYTES_TAMANHO + len(cabecalho))
+    conteudo = np.zeros(inicio_dados + len(dados), dtype=np.uint8)
+    conteudo[:BYTES_TAMANHO] = np.frombuffer(
+        len(cabecalho).to_bytes(BYTES_TAMANHO, "little"), dtype=np.uint8
+    )
+    conteudo[BYTES_TAMANHO : BYTES_TAMANHO + len(cabecalho)] = np.frombuffer(
+        cabecalho, dtype=np.uint8
+    )
+    conteudo[inicio_dados:] = np.frombuffer(dados, dtype=np.uint8)
+
+    # Grava ao lado e troca de uma vez: quem está lendo nunca vê meio arquivo
+    diretorio = os.path.dirname(caminho) or "."
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(prefix=".artefato-", dir=diretorio)
+    try:
+        with os.fdopen(descritor, "wb") as arquivo:
+            np.save(arquivo, conteudo)
+        # mkstemp cria o arquivo só para o dono; o artefato é lido por outros processos
+        os.chmod(temporario, 0o644)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+    return manifesto
+
+
+class Artefato:
+    """Artefato aberto: manifesto, vetores (vistas do arquivo) e a floresta compilada"""
+
+    def __init__(self, manifesto, vetores, dados=None):
+        self.manifesto = manifesto
+        self.vetores = vetores
+        # Bytes dos vetores, usados por verificar()
+        self.dados = dados
+
+    @classmethod
+    def abrir(cls, caminho, mmap_mode="r"):
+        bruto = np.load(caminho, mmap_mode=mmap_mode)
+        if bruto.dtype != np.uint8 or bruto.ndim != 1 or len(bruto) < BYTES_TAMANHO:
+            raise ValueError(f"{caminho} não é um artefato de modelo")
+        tamanho = int.from_bytes(bytes(bruto[:BYTES_TAMANHO]), "little")
+        try:
+            manifesto = json.loads(
+                bytes(bruto[BYTES_TAMANHO : BYTES_TAMANHO + tamanho]).decode("utf-8")
+            )
+        except ValueError as erro:
+            raise ValueError(f"{caminho} não é um artefato de modelo") from erro
+        if manifesto.get("formato") != FORMATO:
+            raise ValueError(f"{caminho} não é um artefato de modelo")
+        if manifesto.get("versao") != VERSAO:
+            raise ValueError(
+                f"{caminho} tem versão {manifesto.get('versao')} do artefato; "
+                f"esta versão do código lê a {VERSAO} (treine o modelo novamente)"
+            )
+
+        inicio_dados = _alinhar(BYTES_TAMANHO + tamanho)
+        vetores = {}
+        for nome, descricao in manifesto["vetores"].items():
+            dtype = np.dtype(descricao["dtype"])
+            inicio = inicio_dados + descricao["inicio"]
+            n = int(np.prod(descricao["forma"], dtype=np.int64))
+            vetores[nome] = (
+                bruto[inicio : inicio + n * dtype.itemsize]
+                .view(dtype)
+                .reshape(descricao["forma"])
+            )
+        return cls(manifesto, vetores, bruto[inicio_dados:])
+
+    @property
+    def hash(self):
+        return self.manifesto["hash"]
+
+    @property
+    def metricas(self):
+        return self.manifesto["metricas"]
+
+    @property
+    def floresta(self):
+        """FlorestaCompilada sobre os vetores do arquivo (sem cópia)"""
+        grupo = self.grupo("floresta")
+        return FlorestaCompilada(
+            **grupo,
+            profundidade=self.manifesto["profundidade"],
+            features=self.manifesto["features"],
+            metadados={"importancias": self.manifesto["importancias"]},
+            **self.grupo("scaler"),
+        )
+
+    def grupo(self, prefixo):
+        """Vetores de um grupo ("teste", "pdp", "shap"...), sem o prefixo no nome"""
+        prefixo = prefixo.rstrip("/") + "/"
+        return {
+            nome[len(prefixo) :]: vetor
+            for nome, vetor in self.vetores.items()
+            if nome.startswith(prefixo)
+        }
+
+    def verificar(self):
+        """True se o hash do conteúdo confere com o gravado no manifesto"""
+        return _hash(self.manifesto, self.dados.tobytes()) == self.hash
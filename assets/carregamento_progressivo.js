@@ -0,0 +1,49 @@
+/* Carregamento progressivo das seções abaixo da dobra.
+   Cada div com data-carregar="<id de um dcc.Store>" é observada por um
+   IntersectionObserver; quando chega perto da área visível, o store recebe true
+   (uma única vez) e o callback da seção é pedido ao servidor. */
+
+(function () {
+    // Começa a carregar um pouco antes de a seção aparecer
+    var MARGEM = "300px";
+    var observadas = new WeakSet();
+
+    function avisar(elemento) {
+        window.dash_clientside.set_props(elemento.dataset.carregar, {data: true});
+    }
+
+    var observador = "IntersectionObserver" in window
+        ? new IntersectionObserver(function (entradas) {
+            entradas.forEach(function (entrada) {
+                if (entrada.isIntersecting) {
+                    observador.unobserve(entrada.target);
+                    avisar(entrada.target);
+                }
+            });
+        }, {rootMargin: MARGEM})
+        : null;
+
+    function observar() {
+        if (!window.dash_clientside || !window.dash_clientside.set_props) {
+            return;
+        }
+        document.querySelectorAll("[data-carregar]").forEach(function (elemento) {
+            if (observadas.has(elemento)) {
+                return;
+            }
+            observadas.add(elemento);
+            // Sem IntersectionObserver, tudo é carregado de uma vez
+            if (observador) {
+                observador.observe(elemento);
+            } else {
+                avisar(elemento);
+            }
+        });
+    }
+
+    // O layout do Dash é montado depois que este script roda
+    new MutationObserver(observar).observe(document.documentElement, {
+        childList: true,
+        subtree: true,
+    });
+})();
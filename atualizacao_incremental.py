@@ -0,0 +1,360 @@
+"""Atualização incremental do modelo quando chega um novo mês de dados.
+
+Em vez de refazer todo o modelagem.py, o mês é anexado à partição da região, sua
+linha de features é calculada com FeaturesIncrementais (cujo estado fica gravado
+na partição entre uma atualização e a seguinte) e a floresta ganha algumas
+árvores novas, ajustadas com o scaler já treinado (que fica fixo). No modo
+"substituir" as árvores mais antigas saem e a floresta mantém o tamanho; no modo
+"crescer" as novas são somadas às existentes (como o warm_start do sklearn).
+
+O conjunto de teste do modelo original continua fora do treino. Por padrão, o
+script também refaz o treino completo sobre os mesmos dados para relatar o tempo
+economizado e a diferença de R²/MAPE entre os dois caminhos.
+
+Uso:
+    python atualizacao_incremental.py --temp 21.4 --precip 142.0 --area 6700000 --rendimento 3150
+    python atualizacao_incremental.py --regiao 4314902 --modo crescer --arvores 100 ...
+"""
+
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
+
+from dataset import (
+    REGIAO_PADRAO,
+    caminho_regiao,
+    carregar_dataset,
+    salvar_regiao,
+    versao_dataset,
+)
+from engenharia_features import FEATURES, FeaturesIncrementais, gerar_features
+from modelagem import metricas, nome_arquivo, salvar_modelo
+from modelos import caminho_modelo
+
+# Árvores ajustadas a cada novo mês e como entram na floresta
+ARVORES_POR_ATUALIZACAO = 50
+MODOS = ("substituir", "crescer")
+ARQUIVO_RELATORIO = "atualizacao_incremental.json"
+# Estado de FeaturesIncrementais, gravado dentro da partição da região
+ARQUIVO_ESTADO = "estado_incremental.json"
+
+
+def dividir_historico(colunas):
+    """Features em lote do histórico e a mesma divisão treino/teste do modelagem.py"""
+    features = gerar_features(
+        colunas["mes"],
+        colunas["temp_media"],
+        colunas["precip_media"],
+        colunas["area_plantada"],
+        colunas["rendimento"],
+    )
+    treino, teste = train_test_split(
+        np.arange(len(features["indice"])), test_size=0.2, random_state=42
+    )
+    return features, treino, teste
+
+
+def carregar_estado(caminho, colunas):
+    """Estado incremental gravado na partição, se ainda corresponde a ela
+
+    Vale só para a versão da partição em que foi gravado: se ela foi regravada
+    por outro caminho (ingestão, modelagem), o estado é refeito com o lote.
+    Retorna (estado, "carregado" ou "reconstruido").
+    """
+    try:
+        with open(os.path.join(caminho, ARQUIVO_ESTADO), encoding="utf-8") as arquivo:
+            gravado = json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        gravado = None
+    if (
+        gravado is not None
+        and gravado["versao_dataset"] == list(versao_dataset(caminho))
+        and gravado["mes"] == int(colunas["mes"][-1])
+    ):
+        return FeaturesIncrementais.de_dict(gravado["estado"]), "carregado"
+    estado = FeaturesIncrementais.a_partir_do_historico(
+        colunas["mes"],
+        colunas["temp_media"],
+        colunas["precip_media"],
+        colunas["area_plantada"],
+        colunas["rendimento"],
+    )
+    return estado, "reconstruido"
+
+
+def salvar_estado(caminho, estado, mes):
+    """Grava o estado junto da versão atual da partição (troca atômica)"""
+    dados = {
+        "versao_dataset": list(versao_dataset(caminho)),
+        "mes": int(mes),
+        "estado": estado.para_dict(),
+    }
+    temporario = os.path.join(caminho, f".{ARQUIVO_ESTADO}.tmp")
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, indent=2)
+    os.replace(temporario, os.path.join(caminho, ARQUIVO_ESTADO))
+
+
+def anexar_mes(
+    colunas, regiao, mes, temp_media, precip_media, area_plantada, rendimento
+):
+    """Grava a partição da região com o novo mês no final"""
+    novas = dict(colunas)
+    for nome, valor in (
+        ("mes", mes),
+        ("temp_media", temp_media),
+        ("precip_media", precip_media),
+        ("area_plantada", area_plantada),
+        ("rendimento", rendimento),
+    ):
+        novas[nome] = np.append(colunas[nome], valor)
+    salvar_regiao(novas, regiao)
+    return novas
+
+
+def validar_quantidade(quantidade, modo, arvores):
+    """Erro se `quantidade` árvores novas não cabem no modo para uma floresta de
+    `arvores` árvores: substituir precisa manter ao menos uma árvore antiga"""
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconhecido: {modo} (use {', '.join(MODOS)})")
+    if quantidade < 1:
+        raise ValueError(f"Número de árvores novas deve ser positivo: {quantidade}")
+    if modo == "substituir" and quantidade >= arvores:
+        raise ValueError(
+            f"O modo substituir troca as {quantidade} árvores mais antigas, mas a "
+            f"floresta tem {arvores}: use menos de {arvores} árvores novas ou "
+            f"--modo crescer"
+        )
+
+
+def atualizar_floresta(pipeline, X, y, quantidade, modo, semente, n_jobs=-1):
+    """Ajusta `quantidade` árvores novas e as junta à floresta do pipeline
+
+    Os hiperparâmetros são os da floresta existente e o scaler não é reajustado,
+    então as árvores antigas e as novas veem as features na mesma escala.
+    """
+    scaler = pipeline.named_steps["scaler"]
+    rf = pipeline.named_steps["rf"]
+    validar_quantidade(quantidade, modo, len(rf.estimators_))
+    parametros = {
+        **rf.get_params(),
+        "n_estimators": quantidade,
+        "random_state": semente,
+        "warm_start": False,
+        "n_jobs": n_jobs,
+    }
+    novas = RandomForestRegressor(**parametros).fit(scaler.transform(X), y)
+    # estimators_ vem do mais antigo para o mais novo
+    antigas = rf.estimators_[quantidade:] if modo == "substituir" else rf.estimators_
+    rf.estimators_ = list(antigas) + novas.estimators_
+    rf.n_estimators = len(rf.estimators_)
+    return pipeline
+
+
+def atualizar_regiao(
+    regiao,
+    temp_media,
+    precip_media,
+    area_plantada,
+    rendimento,
+    modo="substituir",
+    quantidade=ARVORES_POR_ATUALIZACAO,
+    comparar=True,
+    n_jobs=-1,
+):
+    """Anexa um mês à região, atualiza seu modelo e retorna o relatório"""
+    # Modelo e número de árvores conferidos antes de qualquer gravação
+    pipeline = joblib.load(caminho_modelo(regiao))
+    validar_quantidade(quantidade, modo, len(pipeline.named_steps["rf"].estimators_))
+    caminho = caminho_regiao(regiao)
+    colunas = {
+        nome: np.array(coluna) for nome, coluna in carregar_dataset(caminho).items()
+    }
+
+    # Features do novo mês a partir do estado gravado na última atualização (tempo
+    # constante); sem ele, ou com a partição alterada desde então, o estado é
+    # refeito com as features em lote do histórico inteiro
+    inicio = time.perf_counter()
+    estado, origem_estado = carregar_estado(caminho, colunas)
+    mes = int(colunas["mes"][-1]) + 1
+    linha = estado.atualizar(mes, temp_media, precip_media, area_plantada, rendimento)
+    segundos_features = time.perf_counter() - inicio
+
+    # As linhas de treino das árvores novas ainda vêm das features em lote do
+    # histórico: esse tempo entra na conta do caminho incremental
+    inicio = time.perf_counter()
+    features, treino, teste = dividir_historico(colunas)
+    segundos_lote = time.perf_counter() - inicio
+
+    relatorio = {
+        "regiao": str(regiao),
+        "mes": mes,
+        "modo": modo,
+        "arvores_novas": quantidade,
+        "modelo_atualizado": linha is not None,
+        "estado_incremental": origem_estado,
+        "segundos_features": segundos_features,
+    }
+    # O mês entra no dataset mesmo quando é outlier: a série mensal não pode ter
+    # buracos (o próximo mês seria gravado no índice deste)
+    colunas_novas = anexar_mes(
+        colunas, regiao, mes, temp_media, precip_media, area_plantada, rendimento
+    )
+    salvar_estado(caminho, estado, mes)
+    if linha is None:
+        # Outlier pelo Z-score acumulado: fica fora do treino e o modelo (.pkl e
+        # artefato) não muda; o dashboard mostra o mês com o modelo anterior
+        relatorio["motivo"] = "mês fora do filtro de Z-score"
+        print(
+            f"[{regiao}] mês {mes} gravado no dataset, mas fora do filtro de Z-score: "
+            f"o modelo NÃO foi atualizado"
+        )
+        return relatorio
+
+    # Treino do modelo original + o novo mês (alvo relativo à média parcial do ano)
+    alvo = rendimento / (estado.soma_ano / estado.meses_ano)
+    X_treino = pd.DataFrame(np.vstack([features["X"][treino], linha]), columns=FEATURES)
+    y_treino = np.append(features["rendimento_relativo"][treino], alvo)
+
+    original = clone(pipeline)
+    X_teste = pd.DataFrame(features["X"][teste], columns=FEATURES)
+    previsto_antes = pipeline.predict(X_teste)
+
+    # Semente diferente a cada mês para as árvores novas não repetirem as antigas
+    semente = pipeline.named_steps["rf"].random_state
+    semente = semente + mes if isinstance(semente, int) else None
+    inicio = time.perf_counter()
+    atualizar_floresta(pipeline, X_treino, y_treino, quantidade, modo, semente, n_jobs)
+    relatorio["arvores"] = pipeline.named_steps["rf"].n_estimators
+    relatorio["segundos_incremental"] = (
+        segundos_features + segundos_lote + time.perf_counter() - inicio
+    )
+
+    # Pipeline e artefato sobre o histórico atualizado: o teste são as linhas do teste
+    # original, com o alvo relativo às médias anuais já com o novo mês
+    novas = gerar_features(
+        colunas_novas["mes"],
+        colunas_novas["temp_media"],
+        colunas_novas["precip_media"],
+        colunas_novas["area_plantada"],
+        colunas_novas["rendimento"],
+    )
+    salvar_modelo(
+        pipeline,
+        regiao,
+        pd.DataFrame(novas["X"], columns=FEATURES),
+        novas["rendimento_relativo"],
+        novas["media_anual"],
+        np.flatnonzero(np.isin(novas["indice"], features["indice"][teste])),
+        n_jobs,
+    )
+
+    # Avaliação no teste original, que nenhum dos modelos viu
+    y_teste_real = (
+        features["rendimento_relativo"][teste] * features["media_anual"][teste]
+    )
+    previsoes = {
+        "antes": previsto_antes,
+        "incremental": pipeline.predict(X_teste),
+    }
+
+    if comparar:
+        # Treino completo com os mesmos dados: features em lote e floresta do zero
+        inicio_completo = time.perf_counter()
+        novas = gerar_features(
+            colunas_novas["mes"],
+            colunas_novas["temp_media"],
+            colunas_novas["precip_media"],
+            colunas_novas["area_plantada"],
+            colunas_novas["rendimento"],
+        )
+        no_teste = np.isin(novas["indice"], features["indice"][teste])
+        completo = original.fit(
+            pd.DataFrame(novas["X"][~no_teste], columns=FEATURES),
+            novas["rendimento_relativo"][~no_teste],
+        )
+        relatorio["segundos_completo"] = time.perf_counter() - inicio_completo
+        relatorio["economia"] = (
+            1 - relatorio["segundos_incremental"] / relatorio["segundos_completo"]
+        )
+        previsoes["completo"] = completo.predict(X_teste)
+
+    for nome, previsto in previsoes.items():
+        r2, mape = metricas(y_teste_real, previsto * features["media_anual"][teste])
+        relatorio[f"r2_{nome}"] = r2
+        relatorio[f"mape_{nome}"] = mape
+    if comparar:
+        relatorio["deriva_r2"] = relatorio["r2_incremental"] - relatorio["r2_completo"]
+        relatorio["deriva_mape"] = (
+            relatorio["mape_incremental"] - relatorio["mape_completo"]
+        )
+        # Diferença média entre as previsões dos dois modelos, em kg/ha
+        relatorio["deriva_previsoes"] = float(
+            np.mean(
+                np.abs(previsoes["incremental"] - previsoes["completo"])
+                * features["media_anual"][teste]
+            )
+        )
+    return relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regiao", default=REGIAO_PADRAO)
+    parser.add_argument(
+        "--temp", type=float, required=True, help="temperatura média (°C)"
+    )
+    parser.add_argument(
+        "--precip", type=float, required=True, help="precipitação média (mm)"
+    )
+    parser.add_argument("--area", type=int, required=True, help="área plantada (ha)")
+    parser.add_argument(
+        "--rendimento", type=int, required=True, help="rendimento (kg/ha)"
+    )
+    parser.add_argument("--modo", choices=MODOS, default="substituir")
+    parser.add_argument("--arvores", type=int, default=ARVORES_POR_ATUALIZACAO)
+    parser.add_argument(
+        "--sem-comparacao",
+        action="store_true",
+        help="não refaz o treino completo para medir a economia e a deriva",
+    )
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    try:
+        relatorio = atualizar_regiao(
+            args.regiao,
+            args.temp,
+            args.precip,
+            args.area,
+            args.rendimento,
+            args.modo,
+            args.arvores,
+            not args.sem_comparacao,
+            args.n_jobs,
+        )
+    except ValueError as erro:
+        parser.error(str(erro))
+    for chave, valor in relatorio.items():
+        print(
+            f"  {chave:<22} {valor:.4f}"
+            if isinstance(valor, float)
+            else f"  {chave:<22} {valor}"
+        )
+
+    saida = nome_arquivo(ARQUIVO_RELATORIO, args.regiao)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f"Relatório salvo em {saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Carga inicial do dashboard: carregamento progressivo contra o carregamento completo.
+
+Reproduz com o cliente de teste do Flask as requisições que o renderer do Dash faz
+ao abrir a página: o HTML e os scripts locais, /_dash-layout, /_dash-dependencies e
+as rodadas de callbacks. Uma rodada reúne os callbacks cujas entradas já estão
+prontas; o navegador as envia juntas e um processo do servidor as atende em série,
+então o tempo da rodada é a soma das latências. Componentes que chegam numa
+resposta disparam os próprios callbacks iniciais na rodada seguinte.
+
+Tempos (servidor, sem rede):
+    esqueleto: página, layout e dependências (o que o navegador pinta primeiro)
+    primeira pintura: até as métricas (metric-card-1) chegarem
+    acima da dobra: até os dois gráficos principais chegarem
+Bytes: tudo o que é trafegado antes de rolar a página e, à parte, o que as seções
+abaixo da dobra trazem quando entram na tela.
+
+Uso: python benchmarks/bench_carregamento.py
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import warnings
+
+from comum import RAIZ
+
+MODOS = {"progressivo": "1", "completo": "0"}
+CARD_METRICAS = "metric-card-1"
+CARDS_ACIMA_DA_DOBRA = ("feature-importance-card", "predictions-card")
+
+
+def componentes(valor):
+    """(id, props) de todos os componentes com id dentro de um layout ou resposta"""
+    if isinstance(valor, list):
+        for item in valor:
+            yield from componentes(item)
+    elif isinstance(valor, dict):
+        if "type" in valor and "props" in valor:
+            if "id" in valor["props"]:
+                yield valor["props"]["id"], valor["props"]
+            for prop in valor["props"].values():
+                yield from componentes(prop)
+        else:
+            for item in valor.values():
+                yield from componentes(item)
+
+
+def saidas(dependencia):
+    return [
+        tuple(saida.split(".", 1))
+        for saida in dependencia["output"].strip(".").split("...")
+    ]
+
+
+class RendererSimulado:
+    """Estado dos componentes e rodadas de callbacks, como no renderer do Dash"""
+
+    def __init__(self, cliente, layout, dependencias):
+        self.cliente = cliente
+        self.dependencias = [
+            dep for dep in dependencias if not dep.get("clientside_function")
+        ]
+        self.estado = {}
+        self.pendentes = set()
+        self.instante_ms = 0.0
+        self.bytes = 0
+        self.chegada_ms = {}
+        self.adicionar(layout)
+
+    def adicionar(self, valor):
+        novos = set()
+        for id_componente, props in componentes(valor):
+            novos.add(id_componente)
+            for prop, valor_prop in props.items():
+                self.estado[f"{id_componente}.{prop}"] = valor_prop
+        # Callbacks iniciais dos componentes novos (exceto prevent_initial_call)
+        for indice, dep in enumerate(self.dependencias):
+            ids = {item["id"] for item in dep["inputs"]} | {
+                id_saida for id_saida, _ in saidas(dep)
+            }
+            if ids & novos and self.presentes(dep) and not dep["prevent_initial_call"]:
+                self.pendentes.add(indice)
+
+    def presentes(self, dep):
+        ids = {item["id"] for item in dep["inputs"] + dep["state"]}
+        ids |= {id_saida for id_saida, _ in saidas(dep)}
+        return all(
+            any(chave.startswith(f"{id_componente}.") for chave in self.estado)
+            for id_componente in ids
+        )
+
+    def alterar(self, chaves):
+        for indice, dep in enumerate(self.dependencias):
+            entradas = {f"{item['id']}.{item['property']}" for item in dep["inputs"]}
+            if entradas & set(chaves) and self.presentes(dep):
+                self.pendentes.add(indice)
+
+    def requisicao(self, dep):
+        def valor(item):
+            return {
+                "id": item["id"],
+                "property": item["property"],
+                "value": self.estado.get(f"{item['id']}.{item['property']}"),
+            }
+
+        lista = [{"id": id_saida, "property": prop} for id_saida, prop in saidas(dep)]
+        return {
+            "output": dep["output"],
+            "outputs": lista if len(lista) > 1 else lista[0],
+            "inputs": [valor(item) for item in dep["inputs"]],
+            "state": [valor(item) for item in dep["state"]],
+            "changedPropIds": [],
+        }
+
+    def rodar(self):
+        """Executa rodadas até não haver callbacks pendentes"""
+        while self.pendentes:
+            aguardando = {
+                f"{id_saida}.{prop}"
+                for indice in self.pendentes
+                for id_saida, prop in saidas(self.dependencias[indice])
+            }
+            rodada = [
+                indice
+                for indice in sorted(self.pendentes)
+                if not any(
+                    f"{item['id']}.{item['property']}" in aguardando
+                    for item in self.dependencias[indice]["inputs"]
+                )
+            ] or sorted(self.pendentes)
+            self.pendentes -= set(rodada)
+
+            respostas = []
+            for indice in rodada:
+                corpo = self.requisicao(self.dependencias[indice])
+                inicio = time.perf_counter()
+                resposta = self.cliente.post("/_dash-update-component", json=corpo)
+                self.instante_ms += (time.perf_counter() - inicio) * 1000
+                self.bytes += len(json.dumps(corpo)) + len(resposta.data)
+                if resposta.status_code == 200:
+                    respostas.append(resposta.get_json()["response"])
+
+            alterados = []
+            for resposta in respostas:
+                for id_saida, props in resposta.items():
+                    self.chegada_ms.setdefault(id_saida, self.instante_ms)
+                    for prop, valor in props.items():
+                        self.estado[f"{id_saida}.{prop}"] = valor
+                        alterados.append(f"{id_saida}.{prop}")
+                    self.adicionar(props)
+            self.alterar(alterados)
+
+
+def medir_modo():
+    """Roda no subprocesso, com CARREGAMENTO_PROGRESSIVO já definido"""
+    warnings.filterwarnings("ignore")
+    sys.path.insert(0, RAIZ)
+    os.chdir(RAIZ)
+    import main
+
+    cliente = main.app.server.test_client()
+    # Primeira requisição monta as rotas do Dash; não entra na medição
+    cliente.get("/")
+
+    inicio = time.perf_counter()
+    pagina = cliente.get("/")
+    bytes_estaticos = len(pagina.data)
+    for caminho in re.findall(
+        r'(?:src|href)="(/[^"]+)"', pagina.get_data(as_text=True)
+    ):
+        bytes_estaticos += len(cliente.get(caminho).data)
+    layout = cliente.get("/_dash-layout")
+    dependencias = cliente.get("/_dash-dependencies")
+    esqueleto_ms = (time.perf_counter() - inicio) * 1000
+
+    renderer = RendererSimulado(cliente, layout.get_json(), dependencias.get_json())
+    renderer.instante_ms = esqueleto_ms
+    renderer.rodar()
+    bytes_callbacks = renderer.bytes
+    carga_ms = renderer.instante_ms
+    primeira_pintura = renderer.chegada_ms.get(CARD_METRICAS)
+    acima_da_dobra = max(
+        renderer.chegada_ms.get(card, 0) for card in CARDS_ACIMA_DA_DOBRA
+    )
+
+    # Rolagem até o fim: as seções sob demanda entram na tela
+    visiveis = [f"{secao}-visivel.data" for secao in main.SECOES_SOB_DEMANDA]
+    mudaram = [chave for chave in visiveis if not renderer.estado.get(chave)]
+    for chave in mudaram:
+        renderer.estado[chave] = True
+    renderer.alterar(mudaram)
+    renderer.rodar()
+
+    return {
+        "esqueleto_ms": esqueleto_ms,
+        "primeira_pintura_ms": primeira_pintura,
+        "acima_da_dobra_ms": acima_da_dobra,
+        "carga_inicial_ms": carga_ms,
+        "bytes_estaticos": bytes_estaticos,
+        "bytes_layout": len(layout.data) + len(dependencias.data),
+        "bytes_callbacks_iniciais": bytes_callbacks,
+        "bytes_iniciais": bytes_estaticos
+        + len(layout.data)
+        + len(dependencias.data)
+        + bytes_callbacks,
+        "bytes_ao_rolar": renderer.bytes - bytes_callbacks,
+    }
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modo", choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    if args.modo:
+        print(json.dumps(medir_modo()))
+        return
+
+    print(
+        f"{'modo':<12} {'esqueleto':>10} {'1ª pintura':>11} {'acima dobra':>12} "
+        f"{'bytes iniciais':>15} {'callbacks':>10} {'ao rolar':>9}"
+    )
+    for modo, valor in MODOS.items():
+        medicoes = [
+            json.loads(
+                subprocess.run(
+                    [sys.executable, __file__, "--modo", modo],
+                    env={**os.environ, "CARREGAMENTO_PROGRESSIVO": valor},
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                .stdout.strip()
+                .splitlines()[-1]
+            )
+            for _ in range(args.repeticoes)
+        ]
+        # Mediana dos tempos; os bytes não variam entre repetições
+        mediana = {
+            chave: sorted(m[chave] for m in medicoes)[len(medicoes) // 2]
+            for chave in medicoes[0]
+        }
+        print(
+            f"{modo:<12} {mediana['esqueleto_ms']:>8.1f}ms "
+            f"{mediana['primeira_pintura_ms']:>9.1f}ms "
+            f"{mediana['acima_da_dobra_ms']:>10.1f}ms "
+            f"{mediana['bytes_iniciais']:>15,} {mediana['bytes_callbacks_iniciais']:>10,} "
+            f"{mediana['bytes_ao_rolar']:>9,}"
+        )
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,109 @@
+"""Tempo de carga e memória: dataset colunar mapeado versus literais Python.
+
+Cada medição roda em um subprocesso novo. O cenário "literal" compila e executa um
+módulo com o dict `data` no mesmo formato que existia em main.py; o cenário
+"colunar" abre o mesmo conteúdo com dataset.carregar_dataset e lê todas as colunas.
+
+Uso: python benchmarks/bench_dataset.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from comum import RAIZ
+from dataset import carregar_dataset, salvar_dataset
+
+# Histórico atual e um cenário com 497 municípios do RS e 30 anos de meses
+CENARIOS = {"atual (122 meses)": 1, "497 regiões x 30 anos": None}
+LINHAS_CENARIO_GRANDE = 497 * 30 * 12
+
+MEDIR = """
+import json, os, sys, time
+sys.path.insert(0, {raiz!r})
+import numpy as np
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+antes = rss()
+inicio = time.perf_counter()
+{codigo}
+tempo = time.perf_counter() - inicio
+print(json.dumps({{"tempo_ms": tempo * 1000, "rss_mb": (rss() - antes) / 2**20}}))
+"""
+
+LITERAL = """
+with open({arquivo!r}, encoding="utf-8") as f:
+    fonte = f.read()
+ns = {{}}
+exec(compile(fonte, "dados_literais.py", "exec"), ns)
+total = sum(sum(v) for v in ns["data"].values())
+"""
+
+COLUNAR = """
+from dataset import carregar_dataset
+colunas = carregar_dataset({caminho!r})
+total = sum(float(np.sum(v)) for v in colunas.values())
+"""
+
+
+def gerar_colunas(repeticoes):
+    base = {nome: np.asarray(coluna) for nome, coluna in carregar_dataset().items()}
+    colunas = {nome: np.tile(coluna, repeticoes) for nome, coluna in base.items()}
+    colunas["mes"] = np.arange(1, len(colunas["mes"]) + 1)
+    return colunas
+
+
+def escrever_literal(colunas, arquivo):
+    # Mesmo formato do dict que existia em main.py (um valor por linha)
+    with open(arquivo, "w", encoding="utf-8") as f:
+        f.write("data = {\n")
+        for nome, coluna in colunas.items():
+            f.write(f'    "{nome}": [\n')
+            f.writelines(f"        {valor!r},\n" for valor in coluna.tolist())
+            f.write("    ],\n")
+        f.write("}\n")
+
+
+def medir(codigo):
+    script = MEDIR.format(raiz=RAIZ, codigo=codigo)
+    saida = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(saida.stdout)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temporario:
+        print(
+            f"{'cenário':<24} | {'literal ms':>10} {'literal MB':>10} | "
+            f"{'colunar ms':>10} {'colunar MB':>10} | {'disco literal':>13} {'disco colunar':>13}"
+        )
+        for nome, repeticoes in CENARIOS.items():
+            repeticoes = repeticoes or -(-LINHAS_CENARIO_GRANDE // 122)
+            colunas = gerar_colunas(repeticoes)
+            arquivo = os.path.join(temporario, f"literal_{repeticoes}.py")
+            caminho = os.path.join(temporario, f"colunar_{repeticoes}")
+            escrever_literal(colunas, arquivo)
+            salvar_dataset(colunas, caminho)
+
+            literal = medir(LITERAL.format(arquivo=arquivo))
+            colunar = medir(COLUNAR.format(caminho=caminho))
+            disco_colunar = sum(
+                os.path.getsize(os.path.join(caminho, f)) for f in os.listdir(caminho)
+            )
+            print(
+                f"{nome:<24} | {literal['tempo_ms']:>10.2f} {literal['rss_mb']:>10.2f} | "
+                f"{colunar['tempo_ms']:>10.2f} {colunar['rss_mb']:>10.2f} | "
+                f"{os.path.getsize(arquivo) / 1024:>10.0f} KB {disco_colunar / 1024:>10.0f} KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Decimação LTTB de séries longas: tempo no servidor e bytes enviados ao navegador.
+
+Gera passeios aleatórios de tamanhos crescentes (datas minuto a minuto) e compara a
+série inteira serializada com a versão decimada para a largura do gráfico, na visão
+completa e num zoom sobre 1% do período (o que update_series_zoom faz no dashboard).
+
+Uso: python benchmarks/bench_decimacao.py [--tamanhos 100000 1000000 10000000]
+"""
+
+import argparse
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+from comum import medir
+from decimacao import decimar
+
+PONTOS = 1000
+
+
+def serie(tamanho, semente=0):
+    datas = np.datetime64("2015-01-01T00:00", "m") + np.arange(tamanho)
+    valores = np.cumsum(np.random.default_rng(semente).normal(size=tamanho))
+    return datas, valores
+
+
+def bytes_json(datas, valores):
+    return len(to_json_plotly({"x": np.datetime_as_string(datas), "y": valores}))
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--tamanhos", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'pontos':>12} {'bytes série':>14} {'completa':>10} {'bytes':>9} "
+        f"{'zoom 1%':>9} {'bytes':>9}"
+    )
+    for tamanho in args.tamanhos:
+        datas, valores = serie(tamanho)
+        # Zoom no meio da série cobrindo 1% do período
+        inicio = datas[tamanho // 2]
+        fim = datas[tamanho // 2 + tamanho // 100]
+        completa = medir(lambda: decimar(datas, valores, PONTOS), args.repeticoes)
+        zoom = medir(
+            lambda: decimar(datas, valores, PONTOS, inicio, fim), args.repeticoes
+        )
+        # A série inteira só é serializada até 1 milhão de pontos (estimada acima)
+        amostra = min(tamanho, 1_000_000)
+        bytes_serie = (
+            bytes_json(datas[:amostra], valores[:amostra]) * tamanho // amostra
+        )
+        print(
+            f"{tamanho:>12,} {bytes_serie:>14,} {completa['p50_ms']:>8.1f}ms "
+            f"{bytes_json(*decimar(datas, valores, PONTOS)):>9,} "
+            f"{zoom['p50_ms']:>7.1f}ms "
+            f"{bytes_json(*decimar(datas, valores, PONTOS, inicio, fim)):>9,}"
+        )
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,68 @@
+"""Latência p50/p99 do motor compilado versus pipeline.predict.
+
+Uso: python benchmarks/bench_motor_inferencia.py [--modelo CAMINHO]
+"""
+
+import argparse
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from comum import medir
+from motor_inferencia import FlorestaCompilada
+
+# Tamanho do lote -> (repetições do motor, repetições do pipeline)
+# (1.000 a 10.000 mostram onde o pipeline passa a ser mais rápido: LOTE_MAXIMO_MOTOR)
+LOTES = {
+    1: (500, 50),
+    100: (200, 20),
+    1_000: (20, 10),
+    2_000: (10, 10),
+    10_000: (3, 3),
+    100_000: (3, 3),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modelo", default="modelo_produtividade_soja.pkl")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    pipeline = joblib.load(args.modelo)
+
+    inicio = time.perf_counter()
+    floresta = FlorestaCompilada.compilar(pipeline)
+    print(
+        f"Compilação: {(time.perf_counter() - inicio) * 1000:.1f} ms "
+        f"({floresta.n_arvores} árvores, {len(floresta.valor)} nós)"
+    )
+
+    # Linhas sintéticas em torno da distribuição vista pelo scaler
+    scaler = pipeline.named_steps["scaler"]
+    rng = np.random.default_rng(42)
+
+    print(
+        f"{'lote':>8} | {'motor p50':>10} {'motor p99':>10} | "
+        f"{'pipeline p50':>12} {'pipeline p99':>12} | idêntico"
+    )
+    for tamanho, (rep_motor, rep_pipeline) in LOTES.items():
+        X = scaler.mean_ + scaler.scale_ * rng.standard_normal(
+            (tamanho, len(scaler.mean_))
+        )
+        df = pd.DataFrame(X, columns=floresta.features)
+
+        identico = np.array_equal(floresta.prever(X), pipeline.predict(df))
+        motor = medir(lambda: floresta.prever(X), rep_motor, aquecimento=0)
+        referencia = medir(lambda: pipeline.predict(df), rep_pipeline, aquecimento=0)
+        print(
+            f"{tamanho:>8} | {motor['p50_ms']:>8.2f}ms {motor['p99_ms']:>8.2f}ms | "
+            f"{referencia['p50_ms']:>10.2f}ms {referencia['p99_ms']:>10.2f}ms | {identico}"
+        )
+
+
+if __name__ == "__main__":
+    main()
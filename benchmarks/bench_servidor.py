@@ -0,0 +1,244 @@
+"""Teste de carga: servidor de desenvolvimento do Flask contra o gunicorn com N workers.
+
+Cada cenário sobe o servidor em um subprocesso, dispara requisições concorrentes
+(página inicial, layout do Dash e /predict) durante alguns segundos e, ao final,
+lê de /proc a memória de cada processo do servidor: RSS, PSS (a memória
+compartilhada dividida entre os processos que a usam) e a memória privada, que
+mostra quanto cada worker deixou de compartilhar com o mestre. Só funciona no Linux.
+
+Uso:
+    python benchmarks/bench_servidor.py
+    python benchmarks/bench_servidor.py --workers 2 4 --duracao 20 --concorrencia 16
+    python benchmarks/bench_servidor.py --sem-preload   # inclui o gunicorn sem preload_app
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+import numpy as np
+
+from comum import RAIZ
+
+DIRETORIO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+PORTA = 8765
+TEMPO_MAXIMO_INICIO = 180
+
+LINHA_PREDICT = {
+    "mes_cos": 1.0,
+    "mes_sin": 0.0,
+    "temp_movel": 20.5,
+    "precip_movel": 120.0,
+    "clima_interacao": 2460.0,
+    "area_plantada": 6700000,
+}
+# (método, rota, corpo JSON) disparados em rodízio por cada cliente
+REQUISICOES = [
+    ("GET", "/", None),
+    ("GET", "/_dash-layout", None),
+    ("POST", "/predict", {"linhas": [LINHA_PREDICT] * 10, "media_anual": 3000}),
+]
+
+
+def comando(cenario, workers):
+    if cenario == "dev":
+        return [sys.executable, "main.py"], {}
+    return (
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "wsgi:application",
+        ],
+        {
+            "WEB_CONCURRENCY": str(workers),
+            "GUNICORN_PRELOAD": "0" if cenario == "gunicorn-sem-preload" else "1",
+        },
+    )
+
+
+def processos(raiz):
+    """PID do servidor e de todos os seus descendentes"""
+    filhos = {}
+    for nome in os.listdir("/proc"):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nome}/stat") as arquivo:
+                # O nome do processo vem entre parênteses e pode conter espaços
+                pai = int(arquivo.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        filhos.setdefault(pai, []).append(int(nome))
+    encontrados, pendentes = [], [raiz]
+    while pendentes:
+        pid = pendentes.pop()
+        encontrados.append(pid)
+        pendentes.extend(filhos.get(pid, []))
+    return encontrados
+
+
+def memoria(pid):
+    """RSS, PSS e memória privada (MB) de um processo, de /proc/<pid>/smaps_rollup"""
+    campos = {}
+    with open(f"/proc/{pid}/smaps_rollup") as arquivo:
+        for linha in arquivo:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == "kB":
+                campos[partes[0].rstrip(":")] = int(partes[1]) / 1024
+    return {
+        "rss_mb": campos["Rss"],
+        "pss_mb": campos["Pss"],
+        "privado_mb": campos["Private_Clean"] + campos["Private_Dirty"],
+    }
+
+
+async def aguardar_servidor(url, servidor):
+    limite = time.perf_counter() + TEMPO_MAXIMO_INICIO
+    async with aiohttp.ClientSession() as sessao:
+        while time.perf_counter() < limite:
+            if servidor.poll() is not None:
+                raise RuntimeError("o servidor terminou antes de responder")
+            try:
+                async with sessao.get(url) as resposta:
+                    if resposta.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"o servidor não respondeu em {TEMPO_MAXIMO_INICIO}s")
+
+
+async def gerar_carga(url, duracao, concorrencia):
+    """Clientes concorrentes em rodízio pelas REQUISICOES até o fim da duração"""
+    latencias, erros = [], 0
+    fim = time.perf_counter() + duracao
+
+    async def cliente(sessao, deslocamento):
+        nonlocal erros
+        indice = deslocamento
+        while time.perf_counter() < fim:
+            metodo, rota, corpo = REQUISICOES[indice % len(REQUISICOES)]
+            indice += 1
+            inicio = time.perf_counter()
+            try:
+                async with sessao.request(metodo, url + rota, json=corpo) as resposta:
+                    await resposta.read()
+                    if resposta.status != 200:
+                        erros += 1
+                        continue
+            except aiohttp.ClientError:
+                erros += 1
+                continue
+            latencias.append(time.perf_counter() - inicio)
+
+    conector = aiohttp.TCPConnector(limit=concorrencia)
+    async with aiohttp.ClientSession(connector=conector) as sessao:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(sessao, i) for i in range(concorrencia)))
+        segundos = time.perf_counter() - inicio
+    latencias = np.array(latencias) * 1000
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "requisicoes_por_segundo": len(latencias) / segundos,
+        "p50_ms": float(np.percentile(latencias, 50)) if len(latencias) else None,
+        "p99_ms": float(np.percentile(latencias, 99)) if len(latencias) else None,
+    }
+
+
+def executar_cenario(cenario, workers, duracao, concorrencia):
+    argumentos, ambiente = comando(cenario, workers)
+    url = f"http://127.0.0.1:{PORTA}"
+    inicio = time.perf_counter()
+    servidor = subprocess.Popen(
+        argumentos,
+        cwd=RAIZ,
+        env={**os.environ, **ambiente, "PORT": str(PORTA)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(aguardar_servidor(url, servidor))
+        segundos_inicio = time.perf_counter() - inicio
+        carga = asyncio.run(gerar_carga(url, duracao, concorrencia))
+        pids = processos(servidor.pid)
+        por_processo = [memoria(pid) for pid in pids]
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    # No gunicorn o primeiro processo é o mestre, que não atende requisições
+    atendem = por_processo[1:] if len(por_processo) > 1 else por_processo
+    return {
+        "cenario": cenario,
+        "workers": len(atendem),
+        "segundos_inicio": segundos_inicio,
+        **carga,
+        "rss_por_worker_mb": float(np.mean([m["rss_mb"] for m in atendem])),
+        "privado_por_worker_mb": float(np.mean([m["privado_mb"] for m in atendem])),
+        "pss_total_mb": float(sum(m["pss_mb"] for m in por_processo)),
+        "processos": por_processo,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--duracao", type=float, default=10, help="segundos de carga")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument(
+        "--sem-preload",
+        action="store_true",
+        help="também mede o gunicorn sem preload_app (cada worker carrega tudo)",
+    )
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    cenarios = [("dev", 1)] + [("gunicorn", n) for n in args.workers]
+    if args.sem_preload:
+        cenarios += [("gunicorn-sem-preload", n) for n in args.workers]
+
+    resultados = []
+    print(
+        f"{'cenário':<22} {'workers':>7} {'req/s':>8} {'p50':>8} {'p99':>8} "
+        f"{'RSS/worker':>11} {'privado/worker':>15} {'PSS total':>10}"
+    )
+    for cenario, workers in cenarios:
+        resultado = executar_cenario(cenario, workers, args.duracao, args.concorrencia)
+        resultados.append(resultado)
+        print(
+            f"{cenario:<22} {resultado['workers']:>7} "
+            f"{resultado['requisicoes_por_segundo']:>8.1f} "
+            f"{resultado['p50_ms']:>6.1f}ms {resultado['p99_ms']:>6.1f}ms "
+            f"{resultado['rss_por_worker_mb']:>9.1f}MB "
+            f"{resultado['privado_por_worker_mb']:>13.1f}MB "
+            f"{resultado['pss_total_mb']:>8.1f}MB"
+            + (f"  ({resultado['erros']} erros)" if resultado["erros"] else "")
+        )
+
+    relatorio = {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpus": os.cpu_count(),
+        "duracao": args.duracao,
+        "concorrencia": args.concorrencia,
+        "resultados": resultados,
+    }
+    saida = args.saida or os.path.join(
+        DIRETORIO_RESULTADOS, f"servidor-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em {saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Bytes trafegados pelo servidor ao alternar o tema do dashboard.
+
+Lista, a partir de /_dash-dependencies, os callbacks disparados pelos botões de tema
+ou por `theme-store` e soma o tamanho das respostas de /_dash-update-component. Callbacks
+client-side não geram tráfego e aparecem apenas na contagem.
+
+Uso: python benchmarks/bench_tema.py
+"""
+
+import json
+import warnings
+
+from comum import medir
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+import main
+
+GATILHOS_TEMA = {"theme-toggle", "theme-toggle-mobile", "theme-store"}
+
+# Valores atuais dos Inputs/States usados para montar as requisições
+ESTADO = {
+    "theme-store.data": "dark",
+    "mobile-store.data": False,
+    "selected-year-store.data": int(main.anos[-1]),
+    "selected-region-store.data": main.REGIAO_PADRAO,
+}
+
+
+def requisicao(dependencia):
+    def valor(item):
+        return {
+            "id": item["id"],
+            "property": item["property"],
+            "value": ESTADO.get(f"{item['id']}.{item['property']}"),
+        }
+
+    saidas = [
+        {"id": saida.split(".")[0], "property": saida.split(".")[1]}
+        for saida in dependencia["output"].strip(".").split("...")
+    ]
+    return {
+        "output": dependencia["output"],
+        "outputs": saidas if len(saidas) > 1 else saidas[0],
+        "inputs": [valor(item) for item in dependencia["inputs"]],
+        "state": [valor(item) for item in dependencia["state"]],
+        "changedPropIds": ["theme-store.data"],
+    }
+
+
+def main_bench():
+    cliente = main.app.server.test_client()
+    cliente.get("/")
+    dependencias = cliente.get("/_dash-dependencies").get_json()
+
+    disparados = [
+        dep
+        for dep in dependencias
+        if any(item["id"] in GATILHOS_TEMA for item in dep["inputs"])
+    ]
+    servidor = [dep for dep in disparados if not dep.get("clientside_function")]
+    print(
+        f"Callbacks disparados pela troca de tema: {len(disparados)} "
+        f"({len(disparados) - len(servidor)} client-side, {len(servidor)} no servidor)"
+    )
+
+    total_bytes = 0
+    for dep in servidor:
+        corpo = requisicao(dep)
+        resposta = cliente.post("/_dash-update-component", json=corpo)
+        tamanho = len(json.dumps(corpo)) + len(resposta.data)
+        tempo = medir(lambda: cliente.post("/_dash-update-component", json=corpo), 20)
+        total_bytes += tamanho
+        print(
+            f"  {dep['output'][:60]:<60} {tamanho:>8} bytes  p50 {tempo['p50_ms']:.2f}ms"
+        )
+    print(f"Total trafegado por troca de tema: {total_bytes} bytes")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,30 @@
+"""Utilitários compartilhados pelos scripts de benchmark."""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+def medir(funcao, repeticoes, aquecimento=1):
+    """Executa `funcao` e retorna estatísticas de tempo em milissegundos"""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tempos = np.array(tempos) * 1000
+    return {
+        "repeticoes": repeticoes,
+        "media_ms": float(tempos.mean()),
+        "p50_ms": float(np.percentile(tempos, 50)),
+        "p99_ms": float(np.percentile(tempos, 99)),
+        "min_ms": float(tempos.min()),
+    }
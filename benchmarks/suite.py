@@ -0,0 +1,239 @@
+"""Suíte de benchmarks: treinamento, inferência e callbacks do dashboard.
+
+Grava um JSON com metadados do ambiente e as estatísticas de cada medição, para
+comparar execuções ao longo do tempo.
+
+Uso:
+    python benchmarks/suite.py                       # todos os grupos
+    python benchmarks/suite.py --grupos inferencia dashboard
+    python benchmarks/suite.py --comparar benchmarks/resultados/anterior.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import warnings
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import joblib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import sklearn
+
+from comum import RAIZ, medir
+
+DIRETORIO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+TAMANHOS_LOTE = [1, 100, 10_000]
+
+
+@contextlib.contextmanager
+def diretorio_atual(caminho):
+    anterior = os.getcwd()
+    os.chdir(caminho)
+    try:
+        yield
+    finally:
+        os.chdir(anterior)
+
+
+def bench_treinamento(repeticoes):
+    import modelagem
+
+    resultados = {}
+    silencioso = contextlib.redirect_stdout(io.StringIO())
+    # As etapas gravam arquivos no diretório atual: roda tudo em um diretório temporário
+    with tempfile.TemporaryDirectory() as temporario, diretorio_atual(temporario):
+        df = modelagem.carregar_dados()
+        X, y, media_ano = modelagem.preparar_features(df)
+        X_train, X_test, y_train, y_test, _, media_test = modelagem.dividir_dados(
+            X, y, media_ano
+        )
+        pipeline = modelagem.criar_pipeline().fit(X_train, y_train)
+        with silencioso:
+            y_test_real, y_pred_real = modelagem.avaliar(
+                pipeline, X_test, y_test, media_test
+            )
+
+        etapas = {
+            "carregar_dados": lambda: modelagem.carregar_dados(),
+            "preparar_features": lambda: modelagem.preparar_features(df),
+            "dividir_dados": lambda: modelagem.dividir_dados(X, y, media_ano),
+            "pipeline.fit": lambda: modelagem.criar_pipeline().fit(X_train, y_train),
+            "avaliar": lambda: modelagem.avaliar(pipeline, X_test, y_test, media_test),
+            "gerar_graficos": lambda: modelagem.gerar_graficos(
+                pipeline, y_test_real, y_pred_real
+            ),
+            "joblib.dump": lambda: joblib.dump(pipeline, "modelo.pkl"),
+        }
+        for nome, etapa in etapas.items():
+            with silencioso:
+                resultados[nome] = medir(etapa, repeticoes)
+            plt.close("all")
+    return resultados
+
+
+def bench_inferencia(repeticoes):
+    from motor_inferencia import FlorestaCompilada
+
+    pipeline = joblib.load(os.path.join(RAIZ, "modelo_produtividade_soja.pkl"))
+    floresta = FlorestaCompilada.compilar(pipeline)
+    scaler = pipeline.named_steps["scaler"]
+    rng = np.random.default_rng(42)
+
+    resultados = {}
+    for tamanho in TAMANHOS_LOTE:
+        X = scaler.mean_ + scaler.scale_ * rng.standard_normal(
+            (tamanho, len(scaler.mean_))
+        )
+        df = pd.DataFrame(X, columns=floresta.features)
+        resultados[f"pipeline.predict[{tamanho}]"] = medir(
+            lambda: pipeline.predict(df), repeticoes
+        )
+        resultados[f"FlorestaCompilada.prever[{tamanho}]"] = medir(
+            lambda: floresta.prever(X), repeticoes
+        )
+    return resultados
+
+
+def bench_dashboard(repeticoes):
+    import main
+
+    resultados = {}
+    # Figuras só no tema claro: o escuro é recolorido via CSS, no navegador
+    for is_mobile in (False, True):
+        sufixo = f"[{'mobile' if is_mobile else 'desktop'}]"
+        casos = {
+            "create_feature_importance_graph": lambda: main.create_feature_importance_graph(
+                is_mobile
+            ),
+            "create_predictions_graph": lambda: main.create_predictions_graph(
+                is_mobile
+            ),
+            "update_responsive_layout": lambda: main.update_responsive_layout(
+                is_mobile
+            ),
+            "update_graph_cards": lambda: main.update_graph_cards(
+                {"mobile": is_mobile, "regiao": main.REGIAO_PADRAO}
+            ),
+            "update_shap_card": lambda: main.update_shap_card(
+                True, {"mobile": is_mobile, "regiao": main.REGIAO_PADRAO}
+            ),
+            "update_series_zoom": lambda: main.update_series_zoom(
+                {"xaxis.range[0]": "2018-01-01", "xaxis.range[1]": "2021-12-31"},
+                main.REGIAO_PADRAO,
+                is_mobile,
+            ),
+            "update_table": lambda: main.update_table(main.anos[-1], is_mobile),
+            "update_simulation": lambda: main.update_simulation(
+                21.3, 130, 6.5e6, 3, main.anos[-2], main.REGIAO_PADRAO, is_mobile
+            ),
+            "update_table_page": lambda: main.update_table_page(
+                0,
+                main.TAMANHO_PAGINA_TABELA,
+                [
+                    {
+                        "column_id": "Rendimento médio da produção (kg/ha)",
+                        "direction": "desc",
+                    }
+                ],
+                "{Temperatura média (°C)} > 15",
+                main.anos[-2],
+            ),
+        }
+        for nome, caso in casos.items():
+            resultados[nome + sufixo] = medir(caso, repeticoes)
+    return resultados
+
+
+# Grupo -> (função, repetições padrão)
+GRUPOS = {
+    "treinamento": (bench_treinamento, 3),
+    "inferencia": (bench_inferencia, 20),
+    "dashboard": (bench_dashboard, 30),
+}
+
+
+def metadados():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "cpus": os.cpu_count(),
+        "plataforma": platform.platform(),
+    }
+
+
+def comparar(atual, anterior):
+    print(f"\n{'medição':<60} {'anterior':>11} {'atual':>11} {'variação':>9}")
+    for grupo, medicoes in atual["resultados"].items():
+        for nome, estatisticas in medicoes.items():
+            antes = anterior.get("resultados", {}).get(grupo, {}).get(nome)
+            if antes is None:
+                continue
+            variacao = estatisticas["p50_ms"] / antes["p50_ms"] - 1
+            print(
+                f"{grupo + '/' + nome:<60} {antes['p50_ms']:>9.2f}ms "
+                f"{estatisticas['p50_ms']:>9.2f}ms {variacao:>+8.1%}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grupos", nargs="+", choices=GRUPOS, default=list(GRUPOS))
+    parser.add_argument(
+        "--repeticoes", type=int, help="sobrescreve as repetições padrão de cada grupo"
+    )
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    relatorio = {"metadados": metadados(), "resultados": {}}
+    for grupo in args.grupos:
+        funcao, repeticoes = GRUPOS[grupo]
+        print(f"Executando grupo '{grupo}'...")
+        relatorio["resultados"][grupo] = funcao(args.repeticoes or repeticoes)
+        for nome, estatisticas in relatorio["resultados"][grupo].items():
+            print(
+                f"  {nome:<58} p50 {estatisticas['p50_ms']:>9.2f}ms  "
+                f"p99 {estatisticas['p99_ms']:>9.2f}ms"
+            )
+
+    saida = args.saida or os.path.join(
+        DIRETORIO_RESULTADOS, time.strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados salvos em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(relatorio, json.load(arquivo))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import os
+
+import numpy as np
+
+# Dataset canônico particionado por região: raiz/<regiao>/ com um arquivo .npy por
+# coluna + schema.json, e raiz/regioes.json com o código e o nome de cada partição
+DIRETORIO_DADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados")
+RAIZ_DATASET = os.environ.get("DATASET", os.path.join(DIRETORIO_DADOS, "soja_rs"))
+
+# Série estadual; municípios usam o código IBGE de 7 dígitos (ex.: 4314902)
+REGIAO_PADRAO = "RS"
+
+ARQUIVO_SCHEMA = "schema.json"
+ARQUIVO_REGIOES = "regioes.json"
+
+
+def caminho_regiao(regiao=REGIAO_PADRAO, raiz=RAIZ_DATASET):
+    return os.path.join(raiz, str(regiao))
+
+
+DATASET_PADRAO = caminho_regiao()
+
+# Colunas obrigatórias e seus tipos em disco
+SCHEMA = {
+    "mes": "int32",  # Índice do mês (1 = janeiro de 2015)
+    "temp_media": "float64",  # Temperatura média (°C) - NASA POWER
+    "precip_media": "float64",  # Precipitação média (mm) - NASA POWER
+    "area_plantada": "int64",  # Área plantada (ha) - IBGE SIDRA 6588
+    "rendimento": "int64",  # Rendimento médio da produção (kg/ha) - IBGE SIDRA 6588
+}
+
+
+def _ler_schema(caminho):
+    with open(os.path.join(caminho, ARQUIVO_SCHEMA), encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def versao_dataset(caminho=DATASET_PADRAO):
+    """Identifica o conteúdo da partição: o schema.json é gravado por último"""
+    estado = os.stat(os.path.join(caminho, ARQUIVO_SCHEMA))
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+# Caminho -> (versão, colunas mapeadas)
+_datasets = {}
+
+
+def carregar_dataset(caminho=DATASET_PADRAO):
+    """Abre as colunas do dataset como arrays somente leitura mapeados em memória
+
+    O resultado fica em cache: cada processo mapeia os arquivos uma única vez e só
+    as páginas efetivamente lidas são trazidas para a memória. Se a partição for
+    regravada (por outro processo, ex.: atualizacao_incremental.py), a versão muda
+    e os arquivos são mapeados de novo.
+    """
+    versao = versao_dataset(caminho)
+    entrada = _datasets.get(caminho)
+    if entrada is None or entrada[0] != versao:
+        entrada = _datasets[caminho] = (versao, _mapear_colunas(caminho))
+    return entrada[1]
+
+
+def _mapear_colunas(caminho):
+    schema = _ler_schema(caminho)
+    colunas = {}
+    for nome, tipo in schema["colunas"].items():
+        coluna = np.load(os.path.join(caminho, f"{nome}.npy"), mmap_mode="r")
+        if coluna.dtype != np.dtype(tipo) or len(coluna) != schema["linhas"]:
+            raise ValueError(
+                f"Coluna '{nome}' não confere com o schema: "
+                f"{coluna.dtype}[{len(coluna)}], esperado {tipo}[{schema['linhas']}]"
+            )
+        colunas[nome] = coluna
+    return colunas
+
+
+def salvar_dataset(colunas, caminho=DATASET_PADRAO):
+    """Grava as colunas no formato canônico, validando contra SCHEMA"""
+    faltando = [nome for nome in SCHEMA if nome not in colunas]
+    if faltando:
+        raise ValueError(f"Colunas ausentes: {', '.join(faltando)}")
+    tipos = {
+        nome: SCHEMA.get(nome, np.asarray(colunas[nome]).dtype.name) for nome in colunas
+    }
+    arrays = {nome: np.asarray(colunas[nome]).astype(tipos[nome]) for nome in colunas}
+    linhas = {len(array) for array in arrays.values()}
+    if len(linhas) != 1:
+        raise ValueError("Todas as colunas devem ter o mesmo número de linhas")
+
+    os.makedirs(caminho, exist_ok=True)
+    for nome, array in arrays.items():
+        # Grava em arquivo temporário e troca de uma vez: leitores nunca veem meio arquivo
+        temporario = os.path.join(caminho, f".{nome}.npy.tmp")
+        with open(temporario, "wb") as arquivo:
+            np.save(arquivo, array)
+        os.replace(temporario, os.path.join(caminho, f"{nome}.npy"))
+
+    schema = {"versao": 1, "linhas": linhas.pop(), "colunas": tipos}
+    _gravar_json(schema, os.path.join(caminho, ARQUIVO_SCHEMA))
+    _datasets.pop(caminho, None)
+
+
+def _gravar_json(dados, caminho):
+    temporario = os.path.join(
+        os.path.dirname(caminho), f".{os.path.basename(caminho)}.tmp"
+    )
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def listar_regioes(raiz=RAIZ_DATASET):
+    """Código -> nome das regiões com partição no dataset"""
+    try:
+        with open(os.path.join(raiz, ARQUIVO_REGIOES), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        # Sem índice: qualquer subdiretório com schema é uma partição
+        return {
+            nome: nome
+            for nome in sorted(os.listdir(raiz))
+            if os.path.isfile(os.path.join(raiz, nome, ARQUIVO_SCHEMA))
+        }
+
+
+def salvar_regiao(colunas, regiao, nome=None, raiz=RAIZ_DATASET):
+    """Grava a partição de uma região e a registra em regioes.json"""
+    salvar_dataset(colunas, caminho_regiao(regiao, raiz))
+    regioes = listar_regioes(raiz)
+    regioes[str(regiao)] = nome or regioes.get(str(regiao), str(regiao))
+    _gravar_json(dict(sorted(regioes.items())), os.path.join(raiz, ARQUIVO_REGIOES))
+
+
+def particionar_dataset(colunas, coluna_regiao="regiao", nomes=None, raiz=RAIZ_DATASET):
+    """Divide uma tabela longa (várias regiões) em uma partição por região
+
+    A ordem das linhas de cada região é preservada. nomes: código -> nome legível.
+    """
+    regiao = np.asarray(colunas[coluna_regiao]).astype(str)
+    ordem = np.argsort(regiao, kind="stable")
+    codigos, inicios = np.unique(regiao[ordem], return_index=True)
+    fins = np.append(inicios[1:], len(ordem))
+    for codigo, inicio, fim in zip(codigos, inicios, fins):
+        linhas = ordem[inicio:fim]
+        salvar_regiao(
+            {
+                nome: np.asarray(coluna)[linhas]
+                for nome, coluna in colunas.items()
+                if nome != coluna_regiao
+            },
+            codigo,
+            (nomes or {}).get(codigo),
+            raiz,
+        )
+    return [str(codigo) for codigo in codigos]
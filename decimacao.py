@@ -0,0 +1,77 @@
+"""Decimação de séries temporais longas para exibição (LTTB).
+
+Um gráfico não mostra mais pontos do que tem pixels de largura: enviar milhões de
+pontos ao navegador só aumenta o tráfego e o tempo de renderização. O
+Largest-Triangle-Three-Buckets reduz a série a um número fixo de pontos mantendo
+picos e vales, que uma amostragem a cada k pontos perderia. Com `janela`, só o
+trecho visível (após um zoom) é decimado, na resolução da tela.
+"""
+
+import numpy as np
+
+
+def lttb(x, y, pontos):
+    """Índices dos `pontos` pontos da série escolhidos pelo LTTB
+
+    O primeiro e o último ponto são mantidos e os demais são divididos em
+    `pontos - 2` baldes consecutivos. Em cada balde fica o ponto que forma o maior
+    triângulo com o ponto escolhido no balde anterior e a média do balde seguinte.
+    """
+    n = len(x)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Baldes sobre os pontos 1..n-2: o balde k vai de limites[k] a limites[k + 1] - 1
+    limites = 1 + (np.arange(pontos - 1) * (n - 2)) // (pontos - 2)
+    tamanhos = np.diff(limites)
+    media_x = np.add.reduceat(x[: n - 1], limites[:-1]) / tamanhos
+    media_y = np.add.reduceat(y[: n - 1], limites[:-1]) / tamanhos
+    # Referência de cada balde: a média do seguinte (o último usa o ponto final)
+    proximo_x = np.append(media_x[1:], x[-1])
+    proximo_y = np.append(media_y[1:], y[-1])
+
+    escolhidos = np.empty(pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+    for balde in range(pontos - 2):
+        inicio, fim = limites[balde], limites[balde + 1]
+        ax, ay = x[anterior], y[anterior]
+        # Dobro da área do triângulo (anterior, candidato, média do próximo balde)
+        area = np.abs(
+            (ax - proximo_x[balde]) * (y[inicio:fim] - ay)
+            - (ax - x[inicio:fim]) * (proximo_y[balde] - ay)
+        )
+        anterior = inicio + int(np.argmax(area))
+        escolhidos[balde + 1] = anterior
+    return escolhidos
+
+
+def janela(x, inicio=None, fim=None):
+    """Fatia de x (ordenado) entre inicio e fim, com um ponto a mais de cada lado
+
+    Os pontos vizinhos fazem a linha chegar até as bordas do gráfico.
+    """
+    primeiro = 0 if inicio is None else max(np.searchsorted(x, inicio) - 1, 0)
+    ultimo = (
+        len(x) if fim is None else min(np.searchsorted(x, fim, "right") + 1, len(x))
+    )
+    return slice(primeiro, ultimo)
+
+
+def decimar(x, y, pontos, inicio=None, fim=None):
+    """(x, y) do trecho [inicio, fim] da série, reduzido a no máximo `pontos` pontos
+
+    x deve estar ordenado; datas (datetime64) são comparadas como inteiros.
+    """
+    if x.dtype.kind == "M":
+        # Limites na mesma unidade de x: senão o searchsorted converte a série inteira
+        inicio, fim = (
+            None if limite is None else np.datetime64(limite).astype(x.dtype)
+            for limite in (inicio, fim)
+        )
+    trecho = janela(x, inicio, fim)
+    x, y = x[trecho], y[trecho]
+    indices = lttb(x.astype(np.int64) if x.dtype.kind == "M" else x, y, pontos)
+    return x[indices], y[indices]
@@ -0,0 +1,248 @@
+from collections import deque
+
+import numpy as np
+
+# Ano do primeiro mês da série (mes = 1 corresponde a janeiro de 2015)
+ANO_INICIAL = 2015
+
+# Janela das médias móveis de temperatura e precipitação (em meses)
+JANELA_MOVEL = 6
+
+# Limite do Z-score usado para remover outliers
+LIMITE_ZSCORE = 3
+
+# Ordem das colunas esperada pelo modelo
+FEATURES = [
+    "mes_cos",
+    "mes_sin",
+    "temp_movel",
+    "precip_movel",
+    "clima_interacao",
+    "area_plantada",
+]
+
+
+def ano_do_mes(mes):
+    return ANO_INICIAL + (np.asarray(mes) - 1) // 12
+
+
+def codificar_mes(mes):
+    """Codificação cíclica (seno e cosseno) do índice do mês"""
+    angulo = 2 * np.pi * np.asarray(mes, dtype=np.float64) / 12
+    return np.sin(angulo), np.cos(angulo)
+
+
+def media_anual(ano, rendimento):
+    """Média do rendimento de cada ano, repetida em cada mês do ano"""
+    anos, posicao = np.unique(ano, return_inverse=True)
+    soma = np.bincount(posicao, weights=rendimento, minlength=len(anos))
+    contagem = np.bincount(posicao, minlength=len(anos))
+    return (soma / contagem)[posicao]
+
+
+def media_movel(valores):
+    """Média móvel de JANELA_MOVEL meses; os primeiros meses usam o próprio valor"""
+    valores = np.asarray(valores, dtype=np.float64)
+    n = len(valores)
+    resultado = valores.copy()
+    if n >= JANELA_MOVEL:
+        # Soma sequencial em ordem cronológica, igual à do modo incremental
+        soma = valores[: n - JANELA_MOVEL + 1].copy()
+        for atraso in range(1, JANELA_MOVEL):
+            soma += valores[atraso : n - JANELA_MOVEL + 1 + atraso]
+        resultado[JANELA_MOVEL - 1 :] = soma / JANELA_MOVEL
+    return resultado
+
+
+def filtro_zscore(*colunas):
+    """Máscara das linhas com |z| < LIMITE_ZSCORE em todas as colunas"""
+    matriz = np.column_stack(colunas)
+    z = np.abs((matriz - matriz.mean(axis=0)) / matriz.std(axis=0))
+    return (z < LIMITE_ZSCORE).all(axis=1)
+
+
+def montar_matriz(mes, temp_movel, precip_movel, area_plantada):
+    """Empilha as features na ordem de FEATURES"""
+    mes_sin, mes_cos = codificar_mes(mes)
+    return np.column_stack(
+        [
+            mes_cos,
+            mes_sin,
+            temp_movel,
+            precip_movel,
+            temp_movel * precip_movel,
+            np.asarray(area_plantada, dtype=np.float64),
+        ]
+    )
+
+
+def gerar_features(mes, temp_media, precip_media, area_plantada, rendimento):
+    """Modo em lote: reproduz a engenharia de features do modelagem.py
+
+    Retorna um dict com as posições das linhas mantidas após o filtro de Z-score
+    ("indice"), a matriz "X" (colunas em FEATURES), o alvo "rendimento_relativo"
+    e a "media_anual" usada para voltar à escala original (kg/ha).
+    """
+    mes = np.asarray(mes)
+    temp_media = np.asarray(temp_media, dtype=np.float64)
+    precip_media = np.asarray(precip_media, dtype=np.float64)
+    area_plantada = np.asarray(area_plantada, dtype=np.float64)
+    rendimento = np.asarray(rendimento, dtype=np.float64)
+
+    media = media_anual(ano_do_mes(mes), rendimento)
+    rendimento_relativo = rendimento / media
+    lag_rendimento_rel = np.empty_like(rendimento)
+    lag_rendimento_rel[0] = np.nan
+    lag_rendimento_rel[1:] = rendimento[:-1] / media[1:]
+
+    # O primeiro mês não tem defasagem e fica fora, como no dropna original
+    indice = np.arange(1, len(mes))
+    mantidas = filtro_zscore(rendimento_relativo[indice], lag_rendimento_rel[indice])
+    indice = indice[mantidas]
+
+    # Médias móveis calculadas apenas sobre os meses mantidos
+    temp_movel = media_movel(temp_media[indice])
+    precip_movel = media_movel(precip_media[indice])
+
+    return {
+        "indice": indice,
+        "X": montar_matriz(
+            mes[indice], temp_movel, precip_movel, area_plantada[indice]
+        ),
+        "rendimento_relativo": rendimento_relativo[indice],
+        "media_anual": media[indice],
+    }
+
+
+class FeaturesIncrementais:
+    """Modo incremental: atualiza as features a cada novo mês em tempo constante
+
+    Mantém as janelas das médias móveis, o último rendimento (para a defasagem),
+    a média parcial do ano corrente e estatísticas acumuladas para o Z-score.
+    Como a média anual ainda está incompleta, o alvo relativo e o filtro de
+    Z-score usam apenas os meses conhecidos até o momento.
+    """
+
+    def __init__(self):
+        self.temp = deque(maxlen=JANELA_MOVEL)
+        self.precip = deque(maxlen=JANELA_MOVEL)
+        self.ultimo_rendimento = None
+        self.ano = None
+        self.soma_ano = 0.0
+        self.meses_ano = 0
+        # Somas (n, Σx, Σx²) de rendimento_relativo e lag_rendimento_rel
+        self.n = 0
+        self.soma = np.zeros(2)
+        self.soma_quadrados = np.zeros(2)
+
+    @classmethod
+    def a_partir_do_historico(
+        cls, mes, temp_media, precip_media, area_plantada, rendimento
+    ):
+        """Inicializa o estado com o histórico processado pelo modo em lote"""
+        features = gerar_features(
+            mes, temp_media, precip_media, area_plantada, rendimento
+        )
+        indice = features["indice"]
+        estado = cls()
+        estado.temp.extend(
+            np.asarray(temp_media, dtype=np.float64)[indice][-JANELA_MOVEL:]
+        )
+        estado.precip.extend(
+            np.asarray(precip_media, dtype=np.float64)[indice][-JANELA_MOVEL:]
+        )
+
+        rendimento = np.asarray(rendimento, dtype=np.float64)
+        ano = ano_do_mes(mes)
+        estado.ultimo_rendimento = float(rendimento[-1])
+        estado.ano = int(ano[-1])
+        do_ano = ano == estado.ano
+        estado.soma_ano = float(rendimento[do_ano].sum())
+        estado.meses_ano = int(do_ano.sum())
+
+        media = features["media_anual"]
+        alvo = np.column_stack(
+            [features["rendimento_relativo"], rendimento[indice - 1] / media]
+        )
+        estado.n = len(alvo)
+        estado.soma = alvo.sum(axis=0)
+        estado.soma_quadrados = (alvo**2).sum(axis=0)
+        return estado
+
+    def para_dict(self):
+        """Estado em tipos do JSON; floats voltam exatos em de_dict()"""
+        return {
+            "temp": list(self.temp),
+            "precip": list(self.precip),
+            "ultimo_rendimento": self.ultimo_rendimento,
+            "ano": self.ano,
+            "soma_ano": self.soma_ano,
+            "meses_ano": self.meses_ano,
+            "n": self.n,
+            "soma": self.soma.tolist(),
+            "soma_quadrados": self.soma_quadrados.tolist(),
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        estado = cls()
+        estado.temp.extend(dados["temp"])
+        estado.precip.extend(dados["precip"])
+        estado.ultimo_rendimento = dados["ultimo_rendimento"]
+        estado.ano = dados["ano"]
+        estado.soma_ano = dados["soma_ano"]
+        estado.meses_ano = dados["meses_ano"]
+        estado.n = dados["n"]
+        estado.soma = np.array(dados["soma"], dtype=np.float64)
+        estado.soma_quadrados = np.array(dados["soma_quadrados"], dtype=np.float64)
+        return estado
+
+    def _dentro_do_zscore(self, valores):
+        if self.n < 2:
+            return True
+        media = self.soma / self.n
+        desvio = np.sqrt(np.maximum(self.soma_quadrados / self.n - media**2, 0))
+        z = np.abs((valores - media) / np.where(desvio > 0, desvio, np.inf))
+        return bool((z < LIMITE_ZSCORE).all())
+
+    def atualizar(self, mes, temp_media, precip_media, area_plantada, rendimento=None):
+        """Processa um novo mês e retorna sua linha de features (ou None se outlier)
+
+        Sem rendimento (mês a prever), o filtro de Z-score não se aplica e o mês
+        entra direto nas janelas móveis.
+        """
+        ano = int(ano_do_mes(mes))
+        if ano != self.ano:
+            self.ano, self.soma_ano, self.meses_ano = ano, 0.0, 0
+
+        if rendimento is not None:
+            self.soma_ano += rendimento
+            self.meses_ano += 1
+            media = self.soma_ano / self.meses_ano
+            lag = self.ultimo_rendimento
+            self.ultimo_rendimento = float(rendimento)
+            if lag is None:
+                return None
+            valores = np.array([rendimento / media, lag / media])
+            if not self._dentro_do_zscore(valores):
+                return None
+            self.n += 1
+            self.soma += valores
+            self.soma_quadrados += valores**2
+
+        self.temp.append(float(temp_media))
+        self.precip.append(float(precip_media))
+        return montar_matriz(
+            [mes], self._media(self.temp), self._media(self.precip), [area_plantada]
+        )[0]
+
+    @staticmethod
+    def _media(janela):
+        valores = np.array(janela)
+        if len(janela) < JANELA_MOVEL:
+            # Mesmo preenchimento do modo em lote para o início da série
+            return valores[-1:]
+        soma = valores[0]
+        for valor in valores[1:]:
+            soma += valor
+        return np.array([soma / JANELA_MOVEL])
@@ -0,0 +1,176 @@
+from math import factorial
+
+import joblib
+import numpy as np
+
+# Memória aproximada (bytes) dos blocos de amostras em processamento ao mesmo tempo
+# no cálculo das coalizões, somados todos os threads
+MEMORIA_BLOCO = 256 * 2**20
+
+
+def caminhos_das_folhas(floresta):
+    """Caminho raiz → folha de todas as folhas da floresta, como matrizes (folhas, profundidade)
+
+    As árvores são concatenadas em vetores únicos de nós e os caminhos são montados
+    subindo de todas as folhas ao mesmo tempo, um nível por iteração. Posições
+    além da profundidade da folha ficam com feature -1.
+    """
+    arvores = [estimador.tree_ for estimador in floresta.estimators_]
+    deslocamentos = np.cumsum([0] + [arvore.node_count for arvore in arvores[:-1]])
+
+    def concatenar(campo):
+        return np.concatenate([getattr(arvore, campo) for arvore in arvores])
+
+    esquerda = np.concatenate(
+        [
+            np.where(arvore.children_left >= 0, arvore.children_left + inicio, -1)
+            for arvore, inicio in zip(arvores, deslocamentos)
+        ]
+    )
+    direita = np.concatenate(
+        [
+            np.where(arvore.children_right >= 0, arvore.children_right + inicio, -1)
+            for arvore, inicio in zip(arvores, deslocamentos)
+        ]
+    )
+    feature = concatenar("feature")
+    limiar = concatenar("threshold")
+    # Cobertura: peso das amostras de treino (com o bootstrap) que passam pelo nó
+    cobertura = concatenar("weighted_n_node_samples")
+    valor = np.concatenate([arvore.value[:, 0, 0] for arvore in arvores])
+
+    internos = np.flatnonzero(esquerda >= 0)
+    pai = np.full(len(esquerda), -1)
+    pai[esquerda[internos]] = internos
+    pai[direita[internos]] = internos
+    eh_esquerda = np.zeros(len(esquerda), dtype=bool)
+    eh_esquerda[esquerda[internos]] = True
+
+    folhas = np.flatnonzero(esquerda < 0)
+    niveis = []
+    no = folhas
+    while (pai[no] >= 0).any():
+        acima = pai[no]
+        valido = acima >= 0
+        origem = np.where(valido, acima, 0)
+        niveis.append(
+            (
+                np.where(valido, feature[origem], -1),
+                limiar[origem],
+                eh_esquerda[no],
+                np.where(valido, cobertura[no] / cobertura[origem], 1.0),
+            )
+        )
+        no = np.where(valido, acima, no)
+
+    feature_caminho, limiar_caminho, vai_esquerda, razao = (
+        np.column_stack(campo) for campo in zip(*niveis)
+    )
+    return {
+        "feature": feature_caminho,
+        "limiar": limiar_caminho,
+        "esquerda": vai_esquerda,
+        "razao": razao,
+        "valor": valor[folhas],
+    }
+
+
+def _valores_coalizoes(x, caminhos, razao_por_feature, n_features):
+    """v(S) para todas as 2^M coalizões S e cada amostra de x: matriz (2^M, amostras)
+
+    v(S) é a previsão esperada com as features de S fixadas em x e as demais
+    seguindo a cobertura de cada nó (a esperança condicional do TreeSHAP). O peso
+    de uma folha é o produto, ao longo do caminho, da indicação de que x segue o
+    caminho (features em S) ou da fração de cobertura do filho (fora de S).
+    """
+    feature = caminhos["feature"]
+    valores_x = x[:, np.maximum(feature, 0)]
+    segue = np.where(
+        caminhos["esquerda"],
+        valores_x <= caminhos["limiar"],
+        valores_x > caminhos["limiar"],
+    )
+    # Indicação por feature: x segue todos os nós do caminho que testam a feature
+    segue_por_feature = np.stack(
+        [np.where(feature == f, segue, True).all(axis=2) for f in range(n_features)],
+        axis=-1,
+    ).astype(np.float64)
+
+    # Coalizões montadas por duplicação, no próprio array: o bit f do índice indica
+    # f ∈ S. A metade de cima vem da de baixo (f ∈ S), que depois recebe o fator de
+    # f ∉ S; só o array final fica vivo, sem cópias intermediárias
+    pesos = np.empty((2**n_features, len(x), len(feature)))
+    pesos[0] = 1.0
+    for f in range(n_features):
+        metade = 2**f
+        np.multiply(
+            pesos[:metade], segue_por_feature[:, :, f], out=pesos[metade : 2 * metade]
+        )
+        pesos[:metade] *= razao_por_feature[:, f]
+    return pesos @ caminhos["valor"]
+
+
+def _bytes_por_amostra(caminhos, n_features):
+    """Memória do cálculo das coalizões por amostra do bloco
+
+    O array de pesos (2^M coalizões × folhas, float64) e os temporários por nó de
+    caminho: valores de x (float32), as comparações e indicações (bool, ~4 por
+    nó) e a indicação por feature (float64).
+    """
+    folhas, profundidade = caminhos["feature"].shape
+    return folhas * (8 * 2**n_features + 8 * profundidade + 8 * n_features)
+
+
+def shap_floresta(pipeline, X, n_jobs=-1):
+    """Valores SHAP exatos (TreeSHAP, esperança condicional pela cobertura) do pipeline
+
+    Retorna (valores, valor_base): valores[i, f] é a contribuição da feature f para
+    a previsão da linha i, e valor_base + valores.sum(axis=1) reproduz
+    pipeline.predict(X). Enumera as 2^M coalizões, o que é exato e barato para as
+    6 features do modelo; os blocos de amostras são divididos entre os núcleos.
+    """
+    scaler = pipeline.named_steps["scaler"]
+    floresta = pipeline.named_steps["rf"]
+    # As árvores do sklearn comparam as features em float32
+    x = scaler.transform(X).astype(np.float32)
+    n_features = x.shape[1]
+    caminhos = caminhos_das_folhas(floresta)
+    razao_por_feature = np.stack(
+        [
+            np.where(caminhos["feature"] == f, caminhos["razao"], 1.0).prod(axis=1)
+            for f in range(n_features)
+        ],
+        axis=1,
+    )
+
+    coalizoes = 2**n_features
+    # O orçamento é dividido entre os threads: cada um tem o seu bloco em memória
+    trabalhadores = min(joblib.effective_n_jobs(n_jobs), len(x))
+    tamanho = max(
+        1, MEMORIA_BLOCO // (trabalhadores * _bytes_por_amostra(caminhos, n_features))
+    )
+    blocos = [x[inicio : inicio + tamanho] for inicio in range(0, len(x), tamanho)]
+    v = np.concatenate(
+        joblib.Parallel(n_jobs=n_jobs, prefer="threads")(
+            joblib.delayed(_valores_coalizoes)(
+                bloco, caminhos, razao_por_feature, n_features
+            )
+            for bloco in blocos
+        ),
+        axis=1,
+    ) / len(floresta.estimators_)
+
+    # Fórmula de Shapley: média ponderada das contribuições marginais de cada feature
+    indices = np.arange(coalizoes)
+    tamanhos = np.array([bin(indice).count("1") for indice in indices])
+    peso = np.array(
+        [
+            factorial(s) * factorial(n_features - s - 1) / factorial(n_features)
+            for s in range(n_features)
+        ]
+    )
+    valores = np.empty((len(x), n_features))
+    for f in range(n_features):
+        sem_f = indices[(indices & (1 << f)) == 0]
+        valores[:, f] = peso[tamanhos[sem_f]] @ (v[sem_f | (1 << f)] - v[sem_f])
+    return valores, float(v[0, 0])
@@ -0,0 +1,26 @@
+"""Configuração do gunicorn para o dashboard (gunicorn -c gunicorn.conf.py wsgi:application)
+
+Variáveis de ambiente: PORT (8050), WEB_CONCURRENCY (workers; padrão 2 × núcleos + 1),
+GUNICORN_THREADS (threads por worker; 1 = worker sync) e GUNICORN_PRELOAD (1 = carrega
+dados, modelos e figuras no mestre antes do fork, compartilhados copy-on-write).
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+timeout = 60
+
+if preload_app:
+    # Sem coletas no mestre durante o pré-carregamento: objetos liberados deixariam
+    # buracos nas páginas que os workers vão herdar (ver gc.freeze em wsgi.py)
+    gc.disable()
+
+
+def post_fork(server, worker):
+    # Cada worker volta a coletar normalmente; os objetos do mestre estão congelados
+    gc.enable()
@@ -0,0 +1,467 @@
+"""Ingestão dos dados mensais do NASA POWER e do IBGE SIDRA (tabela 6588).
+
+Busca temperatura e precipitação (NASA POWER, por ano) e área plantada e
+rendimento da soja (SIDRA/LSPA, por mês) de várias regiões ao mesmo tempo, com
+asyncio e um pool limitado de conexões, e grava cada região no dataset canônico.
+
+As respostas brutas ficam em cache no disco, endereçadas pelo hash do conteúdo:
+períodos já fechados não são baixados de novo, e os recentes só regravam o
+dataset se o conteúdo mudou. Com --gravar, as respostas também são salvas em um
+diretório que o servidor local (--servir) devolve no lugar das APIs reais.
+
+Uso:
+    python ingestao.py                                   # todas as regiões de fontes.json
+    python ingestao.py --regioes RS --inicio 201501 --fim 202512
+    python ingestao.py --gravar gravacoes/               # grava as respostas
+    python ingestao.py --servir gravacoes/ --porta 8765  # servidor local
+    INGESTAO_NASA_URL=http://127.0.0.1:8765 INGESTAO_SIDRA_URL=http://127.0.0.1:8765 \\
+        python ingestao.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from urllib.parse import unquote, urlsplit
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+from dataset import (
+    DIRETORIO_DADOS,
+    RAIZ_DATASET,
+    SCHEMA,
+    caminho_regiao,
+    carregar_dataset,
+    salvar_regiao,
+)
+from engenharia_features import ANO_INICIAL
+
+URL_NASA_POWER = os.environ.get("INGESTAO_NASA_URL", "https://power.larc.nasa.gov")
+URL_SIDRA = os.environ.get("INGESTAO_SIDRA_URL", "https://apisidra.ibge.gov.br")
+
+# Coordenadas (NASA POWER) e território (SIDRA) de cada região, em RAIZ_DATASET
+ARQUIVO_FONTES = "fontes.json"
+
+# Temperatura média (°C) e precipitação acumulada no mês (mm)
+PARAMETROS_NASA = {"T2M": "temp_media", "PRECTOTCORR_SUM": "precip_media"}
+# LSPA: área plantada (ha) e rendimento médio (kg/ha) da soja em grão
+TABELA_SIDRA = 6588
+VARIAVEIS_SIDRA = {"109": "area_plantada", "112": "rendimento"}
+PRODUTO_SIDRA = "c48/39443"
+VALOR_AUSENTE_NASA = -999
+
+# Pool de conexões e novas tentativas
+CONEXOES_MAXIMAS = 16
+CONEXOES_POR_HOST = 4
+TENTATIVAS = 3
+TEMPO_LIMITE = aiohttp.ClientTimeout(total=60)
+
+# Respostas brutas por hash do conteúdo; meses mais recentes que isso ainda podem
+# ser revisados pela fonte e são sempre consultados de novo
+DIRETORIO_CACHE = os.path.join(DIRETORIO_DADOS, "cache_ingestao")
+MESES_EM_REVISAO = 2
+
+
+def mes_indice(ano, mes):
+    """Índice do mês no dataset (1 = janeiro de ANO_INICIAL)"""
+    return (ano - ANO_INICIAL) * 12 + mes
+
+
+def ano_mes(indice):
+    return ANO_INICIAL + (indice - 1) // 12, (indice - 1) % 12 + 1
+
+
+def ano_mes_texto(indice):
+    """Índice do mês -> AAAAMM"""
+    return "%04d%02d" % ano_mes(int(indice))
+
+
+def mes_atual():
+    agora = time.localtime()
+    return mes_indice(agora.tm_year, agora.tm_mon)
+
+
+def chave_requisicao(url):
+    """Caminho + query sem codificação: identifica a requisição no cache e nas gravações"""
+    partes = urlsplit(url)
+    return unquote(partes.path + ("?" + partes.query if partes.query else ""))
+
+
+def nome_gravacao(url):
+    return hashlib.sha256(chave_requisicao(url).encode()).hexdigest()[:24] + ".json"
+
+
+def url_nasa_power(fonte, ano):
+    return (
+        f"{URL_NASA_POWER}/api/temporal/monthly/point"
+        f"?parameters={','.join(PARAMETROS_NASA)}&community=AG"
+        f"&longitude={fonte['longitude']}&latitude={fonte['latitude']}"
+        f"&start={ano}&end={ano}&format=JSON"
+    )
+
+
+def url_sidra(fonte, ano, mes):
+    return (
+        f"{URL_SIDRA}/values/t/{TABELA_SIDRA}/{fonte['nivel']}/{fonte['codigo']}"
+        f"/v/{','.join(VARIAVEIS_SIDRA)}/p/{ano}{mes:02d}/{PRODUTO_SIDRA}"
+    )
+
+
+def ler_nasa_power(conteudo):
+    """{índice do mês: {coluna: valor}} de uma resposta mensal do NASA POWER"""
+    parametros = json.loads(conteudo)["properties"]["parameter"]
+    meses = {}
+    for parametro, coluna in PARAMETROS_NASA.items():
+        for periodo, valor in parametros.get(parametro, {}).items():
+            ano, mes = int(periodo[:4]), int(periodo[4:])
+            # O mês 13 é o agregado anual
+            if mes > 12 or valor is None or valor == VALOR_AUSENTE_NASA:
+                continue
+            meses.setdefault(mes_indice(ano, mes), {})[coluna] = float(valor)
+    return meses
+
+
+def ler_sidra(conteudo):
+    """{índice do mês: {coluna: valor}} de uma resposta da API do SIDRA"""
+    cabecalho, *linhas = json.loads(conteudo)
+    # A posição das dimensões (D1, D2, ...) depende da consulta: localiza pelo nome.
+    # Cada dimensão tem a coluna do código ("Mês (Código)": 201501) e a do nome
+    # ("Mês": janeiro 2015); só a do código interessa
+    dimensoes = {
+        rotulo.removesuffix(" (Código)"): chave
+        for chave, rotulo in cabecalho.items()
+        if rotulo.endswith(" (Código)")
+    }
+    variavel, periodo = dimensoes["Variável"], dimensoes["Mês"]
+    meses = {}
+    for linha in linhas:
+        coluna = VARIAVEIS_SIDRA.get(linha[variavel])
+        valor = linha["V"]
+        # "-", "..", "..." e "X" marcam valores nulos, não disponíveis ou sigilosos
+        if coluna is None or not valor.replace(".", "", 1).isdigit():
+            continue
+        codigo = linha[periodo]
+        indice = mes_indice(int(codigo[:4]), int(codigo[4:]))
+        meses.setdefault(indice, {})[coluna] = int(round(float(valor)))
+    return meses
+
+
+class CacheRespostas:
+    """Respostas brutas em disco, endereçadas pelo SHA-256 do conteúdo
+
+    objetos/<hash>.json guarda cada conteúdo distinto uma única vez e indice.json
+    liga cada requisição ao hash da última resposta recebida.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_CACHE):
+        self.diretorio = diretorio
+        self.arquivo_indice = os.path.join(diretorio, "indice.json")
+        os.makedirs(os.path.join(diretorio, "objetos"), exist_ok=True)
+        try:
+            with open(self.arquivo_indice, encoding="utf-8") as arquivo:
+                self.indice = json.load(arquivo)
+        except FileNotFoundError:
+            self.indice = {}
+
+    def _caminho(self, hash_conteudo):
+        return os.path.join(self.diretorio, "objetos", f"{hash_conteudo}.json")
+
+    def obter(self, url):
+        hash_conteudo = self.indice.get(chave_requisicao(url))
+        if hash_conteudo is None:
+            return None
+        try:
+            with open(self._caminho(hash_conteudo), "rb") as arquivo:
+                return arquivo.read()
+        except FileNotFoundError:
+            return None
+
+    def gravar(self, url, conteudo):
+        """Guarda a resposta; retorna True se ela difere da anterior"""
+        hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+        chave = chave_requisicao(url)
+        if self.indice.get(chave) == hash_conteudo:
+            return False
+        caminho = self._caminho(hash_conteudo)
+        if not os.path.exists(caminho):
+            temporario = caminho + ".tmp"
+            with open(temporario, "wb") as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+        self.indice[chave] = hash_conteudo
+        return True
+
+    def salvar_indice(self):
+        temporario = self.arquivo_indice + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(self.indice, arquivo, indent=2, ensure_ascii=False)
+        os.replace(temporario, self.arquivo_indice)
+
+
+async def buscar(sessao, url, cache, fechado, gravar=None):
+    """Conteúdo da URL e sua origem: "cache", "inalterado" ou "novo"
+
+    Períodos fechados já presentes no cache não geram requisição.
+    """
+    if fechado:
+        conteudo = cache.obter(url)
+        if conteudo is not None:
+            return conteudo, "cache"
+    for tentativa in range(TENTATIVAS):
+        try:
+            async with sessao.get(url) as resposta:
+                resposta.raise_for_status()
+                conteudo = await resposta.read()
+            break
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if tentativa == TENTATIVAS - 1:
+                raise
+            await asyncio.sleep(2**tentativa)
+    if gravar:
+        with open(os.path.join(gravar, nome_gravacao(url)), "wb") as arquivo:
+            arquivo.write(conteudo)
+    return conteudo, "novo" if cache.gravar(url, conteudo) else "inalterado"
+
+
+async def buscar_regiao(sessao, fonte, inicio, fim, cache, gravar=None):
+    """Meses [inicio, fim] de uma região: {índice do mês: {coluna: valor}}"""
+    revisao = mes_atual() - MESES_EM_REVISAO
+    anos = range(ano_mes(inicio)[0], ano_mes(fim)[0] + 1)
+    meses = range(inicio, fim + 1)
+    # Todas as requisições da região de uma vez; o conector limita a concorrência
+    tarefas = [
+        buscar(
+            sessao,
+            url_nasa_power(fonte, ano),
+            cache,
+            mes_indice(ano, 12) < revisao,
+            gravar,
+        )
+        for ano in anos
+    ] + [
+        buscar(sessao, url_sidra(fonte, *ano_mes(mes)), cache, mes < revisao, gravar)
+        for mes in meses
+    ]
+    respostas = await asyncio.gather(*tarefas)
+
+    dados = {}
+    for (conteudo, _), leitor in zip(
+        respostas, [ler_nasa_power] * len(anos) + [ler_sidra] * len(meses)
+    ):
+        for mes, valores in leitor(conteudo).items():
+            if inicio <= mes <= fim:
+                dados.setdefault(mes, {}).update(valores)
+    origens = [origem for _, origem in respostas]
+    return dados, {origem: origens.count(origem) for origem in set(origens)}
+
+
+def montar_colunas(dados, inicio):
+    """Colunas do dataset com os meses completos a partir de `inicio`
+
+    Para no primeiro mês com alguma variável faltando, para manter a série contínua.
+    """
+    linhas = []
+    mes = inicio
+    while mes in dados and all(
+        coluna in dados[mes] for coluna in SCHEMA if coluna != "mes"
+    ):
+        linhas.append({"mes": mes, **dados[mes]})
+        mes += 1
+    return {
+        coluna: np.array([linha[coluna] for linha in linhas], dtype=tipo)
+        for coluna, tipo in SCHEMA.items()
+    }
+
+
+def carregar_atual(regiao, raiz):
+    """Partição da região já gravada, ou None se ainda não existe"""
+    try:
+        return carregar_dataset(caminho_regiao(regiao, raiz))
+    except FileNotFoundError:
+        return None
+
+
+def mesclar_colunas(atual, novas):
+    """Partição atual com os meses de `novas` gravados sobre seus índices `mes`
+
+    Meses já existentes são substituídos e os demais anexados antes ou depois. A
+    série tem de continuar contínua: um buraco entre a partição e os meses novos
+    gera ValueError, em vez de descartar os meses que não foram baixados.
+    """
+    if atual is None or len(atual["mes"]) == 0:
+        return novas
+    extras = sorted(set(atual) - set(SCHEMA))
+    if extras:
+        raise ValueError(f"Partição com colunas fora do schema: {', '.join(extras)}")
+    meses_atuais = np.asarray(atual["mes"], dtype=np.int64)
+    meses_novos = np.asarray(novas["mes"], dtype=np.int64)
+    primeiro, ultimo = meses_atuais[0], meses_atuais[-1]
+    if not np.array_equal(meses_atuais, np.arange(primeiro, ultimo + 1)):
+        raise ValueError("A partição atual não tem meses contínuos")
+    if meses_novos[0] > ultimo + 1 or meses_novos[-1] < primeiro - 1:
+        raise ValueError(
+            f"Meses {ano_mes_texto(meses_novos[0])}-{ano_mes_texto(meses_novos[-1])}"
+            f" deixariam um buraco na partição "
+            f"({ano_mes_texto(primeiro)}-{ano_mes_texto(ultimo)})"
+        )
+
+    inicio = min(primeiro, meses_novos[0])
+    meses = np.arange(inicio, max(ultimo, meses_novos[-1]) + 1)
+    colunas = {}
+    for coluna, tipo in SCHEMA.items():
+        valores = np.empty(len(meses), dtype=tipo)
+        valores[meses_atuais - inicio] = atual[coluna]
+        valores[meses_novos - inicio] = novas[coluna]
+        colunas[coluna] = valores
+    colunas["mes"] = meses.astype(SCHEMA["mes"])
+    return colunas
+
+
+def dataset_igual(colunas, atual):
+    if atual is None:
+        return False
+    return all(
+        coluna in atual and np.array_equal(atual[coluna], valores)
+        for coluna, valores in colunas.items()
+    )
+
+
+def listar_fontes(raiz=RAIZ_DATASET):
+    with open(os.path.join(raiz, ARQUIVO_FONTES), encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+async def ingerir(
+    regioes=None, inicio=1, fim=None, raiz=RAIZ_DATASET, cache=None, gravar=None
+):
+    """Busca as regiões em paralelo e grava no dataset as que mudaram
+
+    Os meses [inicio, fim] são mesclados à partição existente (mesclar_colunas):
+    um período parcial atualiza só esses meses.
+    """
+    fontes = listar_fontes(raiz)
+    regioes = list(fontes) if regioes is None else [str(regiao) for regiao in regioes]
+    fim = fim or mes_atual() - 1
+    cache = cache or CacheRespostas()
+    if gravar:
+        os.makedirs(gravar, exist_ok=True)
+
+    conector = aiohttp.TCPConnector(
+        limit=CONEXOES_MAXIMAS, limit_per_host=CONEXOES_POR_HOST
+    )
+    async with aiohttp.ClientSession(
+        connector=conector, timeout=TEMPO_LIMITE
+    ) as sessao:
+        resultados = await asyncio.gather(
+            *(
+                buscar_regiao(sessao, fontes[regiao], inicio, fim, cache, gravar)
+                for regiao in regioes
+            )
+        )
+    cache.salvar_indice()
+
+    relatorio = {}
+    for regiao, (dados, origens) in zip(regioes, resultados):
+        novas = montar_colunas(dados, inicio)
+        linhas = len(novas["mes"])
+        relatorio[regiao] = {
+            "linhas": linhas,
+            "gravado": False,
+            "requisicoes": origens,
+        }
+        if not linhas:
+            continue
+        # Só os meses baixados mudam; o restante da partição é mantido
+        atual = carregar_atual(regiao, raiz)
+        try:
+            colunas = mesclar_colunas(atual, novas)
+        except ValueError as erro:
+            relatorio[regiao]["erro"] = str(erro)
+            continue
+        if not dataset_igual(colunas, atual):
+            salvar_regiao(colunas, regiao, fontes[regiao].get("nome"), raiz)
+            relatorio[regiao]["gravado"] = True
+    return relatorio
+
+
+def criar_servidor_gravado(diretorio):
+    """Aplicação aiohttp que responde com as gravações feitas por --gravar"""
+
+    async def responder(requisicao):
+        caminho = os.path.join(diretorio, nome_gravacao(requisicao.raw_path))
+        if not os.path.exists(caminho):
+            raise web.HTTPNotFound(
+                text=f"Sem gravação para {unquote(requisicao.raw_path)}"
+            )
+        return web.FileResponse(caminho, headers={"Content-Type": "application/json"})
+
+    aplicacao = web.Application()
+    aplicacao.router.add_get("/{caminho:.*}", responder)
+    return aplicacao
+
+
+def interpretar_periodo(texto):
+    """AAAAMM -> índice do mês"""
+    return mes_indice(int(texto[:4]), int(texto[4:]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--regioes",
+        nargs="+",
+        help="códigos das regiões (padrão: todas de fontes.json)",
+    )
+    parser.add_argument(
+        "--inicio", type=interpretar_periodo, default=1, help="primeiro mês (AAAAMM)"
+    )
+    parser.add_argument(
+        "--fim",
+        type=interpretar_periodo,
+        help="último mês (AAAAMM; padrão: o mês passado)",
+    )
+    parser.add_argument(
+        "--cache", default=DIRETORIO_CACHE, help="diretório do cache de respostas"
+    )
+    parser.add_argument(
+        "--gravar", help="diretório onde salvar as respostas para o servidor local"
+    )
+    parser.add_argument(
+        "--servir", help="serve as gravações deste diretório em vez de ingerir"
+    )
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.servir:
+        web.run_app(
+            criar_servidor_gravado(args.servir), host="127.0.0.1", port=args.porta
+        )
+        return
+
+    inicio = time.perf_counter()
+    relatorio = asyncio.run(
+        ingerir(
+            args.regioes,
+            args.inicio,
+            args.fim,
+            cache=CacheRespostas(args.cache),
+            gravar=args.gravar,
+        )
+    )
+    for regiao, resumo in relatorio.items():
+        situacao = "gravado" if resumo["gravado"] else "sem mudanças"
+        print(
+            f"  {regiao:<10} {resumo['linhas']:>5} meses  "
+            f"{situacao:<13} {resumo['requisicoes']}"
+        )
+        if "erro" in resumo:
+            print(f"  {'':<10} não gravado: {resumo['erro']}")
+    print(f"Ingestão concluída em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
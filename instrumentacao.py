@@ -0,0 +1,94 @@
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de RSS não é medido
+    resource = None
+
+
+def pico_rss_mb():
+    """Maior memória residente do processo até agora (MB), ou None sem `resource`"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS, em bytes
+    return pico / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+class Instrumentacao:
+    """Tempo de parede, tempo de CPU e pico de RSS de cada etapa de um processo
+
+    O tempo de CPU inclui as threads do processo (como as da floresta com
+    n_jobs), mas não processos filhos. O pico de RSS é o do processo inteiro até
+    o fim da etapa: como só cresce, "aumento_rss_mb" mostra quanto a etapa o
+    elevou. Etapas que são chaves de `perfilar` também rodam sob o cProfile e
+    têm as estatísticas gravadas no caminho associado a elas (não há caminho
+    padrão).
+    """
+
+    def __init__(self, perfilar=None):
+        # perfilar: etapa -> caminho do .prof
+        self.perfilar = dict(perfilar or {})
+        self.etapas = []
+
+    @contextmanager
+    def etapa(self, nome):
+        perfil = cProfile.Profile() if nome in self.perfilar else None
+        rss_antes = pico_rss_mb()
+        inicio, cpu = time.perf_counter(), time.process_time()
+        if perfil is not None:
+            perfil.enable()
+        try:
+            yield
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            segundos = time.perf_counter() - inicio
+            registro = {
+                "etapa": nome,
+                "segundos": segundos,
+                "cpu_segundos": time.process_time() - cpu,
+                "pico_rss_mb": pico_rss_mb(),
+                "aumento_rss_mb": None,
+            }
+            if rss_antes is not None:
+                registro["aumento_rss_mb"] = registro["pico_rss_mb"] - rss_antes
+            if perfil is not None:
+                perfil.dump_stats(self.perfilar[nome])
+                registro["perfil"] = self.perfilar[nome]
+            self.etapas.append(registro)
+
+    def relatorio(self, **contexto):
+        """Etapas na ordem de execução, totais e o ambiente da medição"""
+        return {
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            **contexto,
+            "etapas": self.etapas,
+            "total_segundos": sum(etapa["segundos"] for etapa in self.etapas),
+            "total_cpu_segundos": sum(etapa["cpu_segundos"] for etapa in self.etapas),
+            "pico_rss_mb": pico_rss_mb(),
+        }
+
+    def salvar(self, caminho, **contexto):
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(self.relatorio(**contexto), arquivo, indent=2, ensure_ascii=False)
+
+    def resumo(self):
+        """Tabela em texto para o terminal"""
+        linhas = [f"{'etapa':<24} {'parede':>9} {'cpu':>9} {'pico RSS':>10}"]
+        for etapa in self.etapas:
+            rss = etapa["pico_rss_mb"]
+            linhas.append(
+                f"{etapa['etapa']:<24} {etapa['segundos']:>8.3f}s "
+                f"{etapa['cpu_segundos']:>8.3f}s "
+                + (f"{rss:>8.1f}MB" if rss is not None else f"{'-':>10}")
+            )
+        return "\n".join(linhas)
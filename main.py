@@ -1,520 +1,41 @@
 import dash
-from dash import dcc, html, dash_table, Input, Output, callback, State
+from dash import dcc, html, dash_table, Input, Output, Patch, callback, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 from dash_iconify import DashIconify
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
+import joblib
+import json
 import os
+from functools import lru_cache
+from flask import jsonify, request
+
+from sklearn.metrics import mean_absolute_percentage_error, r2_score
+from sklearn.model_selection import train_test_split
+
+from artefato import Artefato
+from dataset import (
+    REGIAO_PADRAO,
+    caminho_regiao,
+    carregar_dataset,
+    listar_regioes,
+    versao_dataset,
+)
+from decimacao import decimar
+from engenharia_features import FEATURES, gerar_features, montar_matriz
+from modelos import (
+    RegistroModelos,
+    caminho_artefato,
+    caminho_modelo,
+    floresta_mapeada,
+)
+from motor_inferencia import FlorestaCompilada
+from tabela_historico import IndiceTabela
 
-# --- DADOS REAIS (do script de modelagem) ---
-data = {
-    "mes": list(range(1, 123)),
-    "temp_media": [
-        23.63,
-        23.43,
-        22.27,
-        19.20,
-        16.26,
-        13.59,
-        13.39,
-        17.44,
-        15.73,
-        17.59,
-        19.47,
-        22.60,
-        23.92,
-        24.52,
-        20.63,
-        20.40,
-        13.27,
-        10.24,
-        12.57,
-        14.34,
-        14.40,
-        17.89,
-        19.55,
-        22.81,
-        23.84,
-        24.25,
-        21.36,
-        18.24,
-        16.66,
-        13.93,
-        14.02,
-        15.29,
-        18.52,
-        18.30,
-        19.04,
-        23.33,
-        23.98,
-        23.15,
-        22.10,
-        21.85,
-        16.56,
-        11.76,
-        12.73,
-        12.21,
-        17.56,
-        18.31,
-        21.19,
-        22.74,
-        24.82,
-        23.02,
-        21.35,
-        20.20,
-        17.12,
-        16.19,
-        11.97,
-        13.04,
-        15.52,
-        19.54,
-        21.40,
-        23.07,
-        24.40,
-        23.89,
-        24.30,
-        18.94,
-        15.11,
-        14.35,
-        11.63,
-        14.36,
-        16.23,
-        18.69,
-        21.00,
-        23.50,
-        24.50,
-        23.06,
-        22.63,
-        19.70,
-        14.08,
-        12.55,
-        11.80,
-        15.15,
-        17.14,
-        18.11,
-        21.49,
-        24.06,
-        27.08,
-        25.11,
-        21.53,
-        18.30,
-        13.61,
-        11.29,
-        15.20,
-        12.96,
-        14.29,
-        17.30,
-        19.83,
-        23.91,
-        26.26,
-        24.76,
-        24.79,
-        19.27,
-        16.66,
-        14.56,
-        13.73,
-        15.13,
-        17.62,
-        18.05,
-        20.75,
-        23.28,
-        23.59,
-        25.32,
-        23.37,
-        20.71,
-        14.91,
-        15.52,
-        11.85,
-        13.99,
-        17.41,
-        19.29,
-        21.83,
-        21.47,
-        24.97,
-        26.88,
-    ],
-    "precip_media": [
-        201.91,
-        90.50,
-        62.05,
-        75.15,
-        126.29,
-        110.86,
-        158.67,
-        82.94,
-        136.49,
-        267.48,
-        156.21,
-        305.49,
-        101.91,
-        114.10,
-        201.94,
-        215.71,
-        79.38,
-        30.80,
-        118.08,
-        119.46,
-        61.66,
-        233.78,
-        127.50,
-        153.64,
-        163.43,
-        150.90,
-        166.79,
-        183.33,
-        284.47,
-        106.05,
-        26.83,
-        166.39,
-        139.54,
-        207.34,
-        102.86,
-        88.56,
-        146.15,
-        69.67,
-        140.22,
-        79.41,
-        95.58,
-        106.66,
-        131.27,
-        130.67,
-        175.34,
-        138.34,
-        152.75,
-        116.76,
-        225.22,
-        92.60,
-        101.23,
-        142.88,
-        194.92,
-        54.89,
-        116.54,
-        80.51,
-        71.02,
-        269.97,
-        130.29,
-        51.87,
-        122.75,
-        62.85,
-        30.97,
-        43.30,
-        143.60,
-        177.14,
-        144.13,
-        65.02,
-        125.90,
-        69.37,
-        59.36,
-        98.97,
-        166.06,
-        91.24,
-        102.07,
-        40.71,
-        126.48,
-        143.66,
-        44.12,
-        73.58,
-        188.76,
-        95.42,
-        67.85,
-        41.92,
-        91.87,
-        92.82,
-        151.34,
-        193.13,
-        160.87,
-        138.41,
-        140.68,
-        106.70,
-        68.54,
-        109.66,
-        48.62,
-        68.14,
-        57.89,
-        79.51,
-        93.33,
-        34.16,
-        133.03,
-        102.83,
-        135.74,
-        69.50,
-        322.29,
-        230.83,
-        260.05,
-        141.12,
-        110.53,
-        83.44,
-        122.13,
-        239.37,
-        293.33,
-        153.65,
-        50.20,
-        94.24,
-        139.63,
-        122.33,
-        85.14,
-        97.31,
-        57.37,
-        109.49,
-    ],
-    "area_plantada": [
-        5200279,
-        5219684,
-        5230879,
-        5230879,
-        5241776,
-        5241776,
-        5263899,
-        5263899,
-        5263899,
-        5263899,
-        5263899,
-        5263899,
-        5471680,
-        5475537,
-        5472388,
-        5472388,
-        5477005,
-        5477005,
-        5474084,
-        5474084,
-        5474084,
-        5474084,
-        5474084,
-        5464084,
-        5463281,
-        5499742,
-        5496062,
-        5496062,
-        5528233,
-        5528233,
-        5541860,
-        5541860,
-        5541860,
-        5541860,
-        5541860,
-        5541860,
-        5674433,
-        5674433,
-        5674433,
-        5679427,
-        5679427,
-        5679427,
-        5679427,
-        5758133,
-        5758133,
-        5709034,
-        5709034,
-        5709034,
-        5805001,
-        5806922,
-        5828790,
-        5828790,
-        5848766,
-        5848766,
-        5843714,
-        5843714,
-        5843513,
-        5843533,
-        5843533,
-        5843533,
-        5930249,
-        5930249,
-        5976049,
-        5976049,
-        5980832,
-        5980832,
-        5981671,
-        5981671,
-        5981671,
-        5980671,
-        5980671,
-        5980671,
-        6075058,
-        6087229,
-        6091873,
-        6091873,
-        6095677,
-        6095677,
-        6107270,
-        6107270,
-        6107270,
-        6107320,
-        6107320,
-        6107620,
-        6362434,
-        6362588,
-        6381617,
-        6381617,
-        6387985,
-        6387985,
-        6387670,
-        6387670,
-        6387670,
-        6387670,
-        6387670,
-        6387670,
-        6628647,
-        6638744,
-        6637125,
-        6637125,
-        6658472,
-        6658472,
-        6651731,
-        6651731,
-        6641731,
-        6640385,
-        6640385,
-        6642290,
-        6716122,
-        6692798,
-        6700006,
-        6700006,
-        6707273,
-        6707273,
-        6708247,
-        6708247,
-        6707247,
-        6707747,
-        6707747,
-        6707747,
-        6817844,
-        6786139,
-    ],
-    "rendimento": [
-        2817,
-        2850,
-        2890,
-        2890,
-        2976,
-        2976,
-        2983,
-        2983,
-        2983,
-        2983,
-        2983,
-        2983,
-        2967,
-        2942,
-        2921,
-        2921,
-        2985,
-        2985,
-        2972,
-        2972,
-        2972,
-        2972,
-        2972,
-        2981,
-        2998,
-        3031,
-        3141,
-        3141,
-        3361,
-        3361,
-        3385,
-        3385,
-        3385,
-        3385,
-        3385,
-        3385,
-        3140,
-        3140,
-        3140,
-        3093,
-        3093,
-        3093,
-        3093,
-        3104,
-        3103,
-        3104,
-        3104,
-        3104,
-        3206,
-        3209,
-        3233,
-        3233,
-        3194,
-        3194,
-        3177,
-        3177,
-        3178,
-        3178,
-        3178,
-        3178,
-        3249,
-        3249,
-        2280,
-        2280,
-        1883,
-        1883,
-        1883,
-        1883,
-        1882,
-        1894,
-        1894,
-        1895,
-        3197,
-        3206,
-        3226,
-        3226,
-        3324,
-        3324,
-        3341,
-        3341,
-        3344,
-        3344,
-        3344,
-        3344,
-        3312,
-        2069,
-        1512,
-        1512,
-        1472,
-        1472,
-        1500,
-        1500,
-        1503,
-        1503,
-        1503,
-        1503,
-        3207,
-        2758,
-        2227,
-        2227,
-        1949,
-        1949,
-        1912,
-        1912,
-        1912,
-        1912,
-        1912,
-        1912,
-        3193,
-        3247,
-        3244,
-        3244,
-        3045,
-        3045,
-        2809,
-        2809,
-        2811,
-        2809,
-        2809,
-        2809,
-        3245,
-        2792,
-    ],
-}
-
-# Criar DataFrame real
-df = pd.DataFrame(data)
-
-
-# Adicionar colunas de ano e mês
-df["ano"] = 2015 + (df["mes"] - 1) // 12
-df["mes_num"] = ((df["mes"] - 1) % 12) + 1
+# --- DADOS REAIS (dataset colunar em dados/, particionado por região e compartilhado com o modelagem.py) ---
 meses_nome = [
     "Janeiro",
     "Fevereiro",
@@ -529,60 +50,127 @@ meses_nome = [
     "Novembro",
     "Dezembro",
 ]
-df["mes_nome"] = df["mes_num"].apply(lambda x: meses_nome[x - 1])
-
-# Preparar DataFrame para a tabela do dashboard
-df_historico = df.rename(
-    columns={
-        "ano": "Ano",
-        "mes_nome": "Mês",
-        "temp_media": "Temperatura média (°C)",
-        "precip_media": "Precipitação média (mm)",
-        "area_plantada": "Área plantada (ha)",
-        "rendimento": "Rendimento médio da produção (kg/ha)",
-    }
-)[
-    [
-        "Ano",
-        "Mês",
-        "Temperatura média (°C)",
-        "Precipitação média (mm)",
-        "Área plantada (ha)",
-        "Rendimento médio da produção (kg/ha)",
-    ]
-]
 
+# Linhas por página da tabela histórica
+TAMANHO_PAGINA_TABELA = 12
 
-# Reordenar colunas
-df_historico = df_historico[
-    [
-        "Ano",
-        "Mês",
-        "Temperatura média (°C)",
-        "Precipitação média (mm)",
-        "Área plantada (ha)",
-        "Rendimento médio da produção (kg/ha)",
-    ]
+# Casas decimais exibidas em cada coluna numérica da tabela
+CASAS_DECIMAIS_TABELA = {
+    "Temperatura média (°C)": 1,
+    "Precipitação média (mm)": 1,
+    "Área plantada (ha)": 0,
+    "Rendimento médio da produção (kg/ha)": 0,
+}
+
+
+# Séries do gráfico histórico: (coluna do dataset, rótulo do eixo, cor), uma por linha
+SERIES_HISTORICAS = [
+    ("temp_media", "Temperatura (°C)", "#dc3545"),
+    ("precip_media", "Precipitação (mm)", "#0d6efd"),
+    ("rendimento", "Rendimento (kg/ha)", "#28a745"),
 ]
+# Pontos enviados por série, da ordem da largura do gráfico em pixels: o LTTB
+# (decimacao.py) reduz a série (ou o trecho visível, após um zoom) a esse número
+PONTOS_POR_TELA = {False: 1000, True: 400}
+
+
+# Região -> (versão da partição, dados derivados do histórico)
+cache_dados = {}
+
+
+def dados_regiao(regiao=REGIAO_PADRAO):
+    """Histórico, tabela e divisão de teste de uma região (só a partição dela é lida)
+
+    Recalculados quando a partição muda em disco, ex.: um mês anexado pelo
+    atualizacao_incremental.py com o servidor no ar.
+    """
+    versao = versao_dataset(caminho_regiao(regiao))
+    entrada = cache_dados.get(regiao)
+    if entrada is None or entrada[0] != versao:
+        entrada = cache_dados[regiao] = (versao, montar_dados_regiao(regiao))
+    return entrada[1]
+
+
+def montar_dados_regiao(regiao=REGIAO_PADRAO):
+    df = pd.DataFrame(carregar_dataset(caminho_regiao(regiao)))
+
+    # Adicionar colunas de ano e mês
+    df["ano"] = 2015 + (df["mes"] - 1) // 12
+    df["mes_num"] = ((df["mes"] - 1) % 12) + 1
+    df["mes_nome"] = df["mes_num"].apply(lambda x: meses_nome[x - 1])
+
+    # Preparar DataFrame para a tabela do dashboard
+    df_historico = df.rename(
+        columns={
+            "ano": "Ano",
+            "mes_nome": "Mês",
+            "temp_media": "Temperatura média (°C)",
+            "precip_media": "Precipitação média (mm)",
+            "area_plantada": "Área plantada (ha)",
+            "rendimento": "Rendimento médio da produção (kg/ha)",
+        }
+    )[
+        [
+            "Ano",
+            "Mês",
+            "Temperatura média (°C)",
+            "Precipitação média (mm)",
+            "Área plantada (ha)",
+            "Rendimento médio da produção (kg/ha)",
+        ]
+    ]
+
+    # Entradas do modelo reconstruídas a partir dos meses brutos, com a mesma
+    # engenharia de features e a mesma divisão treino/teste do modelagem.py
+    features_historico = gerar_features(
+        df["mes"],
+        df["temp_media"],
+        df["precip_media"],
+        df["area_plantada"],
+        df["rendimento"],
+    )
+    _, X_teste, _, y_teste_rel, _, media_teste, _, posicoes_teste = train_test_split(
+        features_historico["X"],
+        features_historico["rendimento_relativo"],
+        features_historico["media_anual"],
+        np.arange(len(features_historico["X"])),
+        test_size=0.2,
+        random_state=42,
+    )
+
+    return {
+        "df_historico": df_historico,
+        # Lista de anos disponíveis
+        "anos": sorted(df_historico["Ano"].unique()),
+        # Índice pré-ordenado da tabela: paginação, ordenação e filtro feitos no servidor
+        "tabela": IndiceTabela(
+            df_historico, CASAS_DECIMAIS_TABELA, chaves={"Mês": df["mes"]}
+        ),
+        "X": features_historico["X"],
+        "X_teste": X_teste,
+        "y_teste_rel": y_teste_rel,
+        "media_teste": media_teste,
+        # Posição de cada linha de teste nas features do histórico (linhas do SHAP)
+        "posicoes_teste": posicoes_teste,
+        # Rendimento médio de cada ano (volta do relativo para kg/ha, como media_test)
+        "media_por_ano": df.groupby("ano")["rendimento"].mean().to_dict(),
+        # Série histórica (primeiro dia de cada mês) para o gráfico de séries
+        "datas": (np.datetime64("2015-01") + (df["mes"].to_numpy() - 1)).astype(
+            "datetime64[D]"
+        ),
+        "series": {
+            coluna: df[coluna].to_numpy(dtype=np.float64)
+            for coluna, _, _ in SERIES_HISTORICAS
+        },
+    }
+
 
-# Lista de anos disponíveis
-anos = sorted(df_historico["Ano"].unique())
+# Anos da região padrão (opções iniciais do filtro de ano)
+anos = dados_regiao(REGIAO_PADRAO)["anos"]
 
-dark_theme_bg = "linear-gradient(135deg, #1a1d24 0%, #2a2e3a 100%)"
-light_theme_bg = "linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%)"
 
-# --- DADOS DO MODELO (ATUALIZADOS COM DADOS REAIS DO TESTE) ---
+# --- DADOS DO MODELO (métricas e predições vêm do artefato do modelo carregado) ---
 model_data = {
-    "r2": 0.9870,
-    "mape": 2.1332,
-    "best_params": {
-        "n_estimators": 800,
-        "max_depth": 10,
-        "min_samples_split": 5,
-        "min_samples_leaf": 3,
-        "max_features": 0.5,
-        "random_state": 42,
-    },
     "feature_names": [
         "Sazonalidade (Cosseno)",
         "Sazonalidade (Seno)",
@@ -591,75 +179,239 @@ model_data = {
         "Temperatura x Precipitação (Interação)",
         "Área plantada (ha)",
     ],
-    "feature_importances": np.array([0.03, 0.06, 0.13, 0.16, 0.21, 0.41]),
-    "y_test_real": np.array(
-        [
-            1472,
-            2976,
-            3104,
-            3093,
-            2983,
-            3206,
-            2811,
-            3140,
-            3206,
-            2967,
-            3104,
-            3141,
-            1949,
-            3177,
-            2972,
-            2850,
-            3178,
-            1500,
-            2809,
-            1912,
-            2227,
-            1503,
-            1894,
-            2942,
-        ]
-    ),
-    "y_pred_real": np.array(
-        [
-            1576.7,
-            2970.68,
-            3104.65,
-            3118.74,
-            2935.95,
-            3193.74,
-            2816.04,
-            3112.79,
-            3238.87,
-            2929.00,
-            3112.30,
-            3245.58,
-            2178.71,
-            3200.44,
-            2967.98,
-            2907.51,
-            3195.27,
-            1538.74,
-            2822.85,
-            2007.44,
-            2193.69,
-            1552.73,
-            2006.69,
-            2944.96,
-        ]
-    ),
 }
 
 
-# --- PREPARAÇÃO DOS DADOS ---
-sorted_indices = np.argsort(model_data["feature_importances"])
-sorted_feature_names = [model_data["feature_names"][i] for i in sorted_indices]
-sorted_feature_importances = model_data["feature_importances"][sorted_indices]
+# --- MODELOS TREINADOS (um pipeline por região, salvos por modelagem.py) ---
+DIRETORIO_APP = os.path.dirname(os.path.abspath(__file__))
+MODELO_PATH = os.environ.get(
+    "MODELO_PATH", caminho_modelo(REGIAO_PADRAO, DIRETORIO_APP)
+)
+# Floresta achatada para lotes pequenos; acima do limite o pipeline do sklearn é mais
+# rápido. Cruzamento medido com benchmarks/bench_motor_inferencia.py (1 núcleo, 800
+# árvores): 1.000 linhas, motor 86 ms x pipeline 139 ms; 2.000 linhas, 214 ms x 180 ms
+LOTE_MAXIMO_MOTOR = 1500
+# MODELOS_MMAP=1: florestas abertas com mmap (páginas compartilhadas entre workers)
+MAPEAR_MODELOS = os.environ.get("MODELOS_MMAP", "0") == "1"
+
+
+def caminho_modelo_regiao(regiao=REGIAO_PADRAO):
+    if regiao == REGIAO_PADRAO:
+        return MODELO_PATH
+    return caminho_modelo(regiao, DIRETORIO_APP)
+
+
+def arquivo_modelo(regiao=REGIAO_PADRAO):
+    """Artefato compacto da região se existir; senão, o pipeline (.pkl)"""
+    caminho = caminho_modelo_regiao(regiao)
+    artefato = caminho_artefato(caminho)
+    return artefato if os.path.exists(artefato) else caminho
+
+
+# Código -> nome das regiões disponíveis (estado e municípios); só entram as que
+# já têm modelo treinado
+regioes = {
+    codigo: nome
+    for codigo, nome in listar_regioes().items()
+    if os.path.exists(arquivo_modelo(codigo))
+}
+
+
+def versao_arquivo_modelo(regiao=REGIAO_PADRAO):
+    estado = os.stat(arquivo_modelo(regiao))
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+def carregar_modelo(regiao=REGIAO_PADRAO):
+    """Carrega o modelo da região com as métricas e predições exibidas no dashboard
+
+    Com o artefato compacto (artefato.py), floresta, métricas, previsões de teste e
+    resultados pré-calculados são vistas do arquivo mapeado em memória, sem pickle e
+    sem passar pelo modelo. Sem ele, carrega o pipeline e recalcula tudo sobre a
+    divisão de teste do histórico.
+    """
+    caminho = arquivo_modelo(regiao)
+    if caminho.endswith(".npy"):
+        artefato = Artefato.abrir(caminho)
+        teste = artefato.grupo("teste")
+        return {
+            "pipeline": None,
+            "floresta": artefato.floresta,
+            "artefato": artefato,
+            "features": artefato.manifesto["features"],
+            "feature_importances": np.array(artefato.manifesto["importancias"]),
+            "y_test_real": teste["y_real"],
+            "y_pred_real": teste["y_previsto"],
+            "y_quantis_real": teste["quantis"],
+            "posicoes_teste": teste["posicoes"],
+            "r2": artefato.metricas["r2"],
+            "mape": artefato.metricas["mape"],
+        }
+    if MAPEAR_MODELOS:
+        # Só a floresta compilada, mapeada em memória e compartilhada entre os
+        # processos; o pipeline do sklearn não fica residente
+        pipeline = None
+        floresta = floresta_mapeada(caminho)
+        importancias = np.array(floresta.metadados["importancias"])
+    else:
+        pipeline = joblib.load(caminho)
+        floresta = FlorestaCompilada.compilar(pipeline)
+        importancias = pipeline.named_steps["rf"].feature_importances_
+
+    dados = dados_regiao(regiao)
+    y_test_real = dados["y_teste_rel"] * dados["media_teste"]
+    # Previsão e faixa P10/P50/P90 das 800 árvores numa única passada
+    y_pred_rel, quantis_rel = floresta.prever_intervalo(dados["X_teste"])
+    y_pred_real = y_pred_rel * dados["media_teste"]
+    return {
+        "pipeline": pipeline,
+        "floresta": floresta,
+        "artefato": None,
+        "features": floresta.features,
+        "feature_importances": importancias,
+        "y_test_real": y_test_real,
+        "y_pred_real": y_pred_real,
+        "y_quantis_real": quantis_rel * dados["media_teste"],
+        "posicoes_teste": dados["posicoes_teste"],
+        "r2": r2_score(y_test_real, y_pred_real),
+        "mape": mean_absolute_percentage_error(y_test_real, y_pred_real) * 100,
+    }
+
+
+# Modelos residentes por região, compartilhados por dashboard e /predict: carregados
+# no primeiro uso, recarregados se o arquivo mudar em disco e descartados (LRU)
+# acima de MODELOS_MEMORIA_MB
+registro_modelos = RegistroModelos(carregar_modelo, versao=versao_arquivo_modelo)
+
+
+def modelo_regiao(regiao=REGIAO_PADRAO):
+    return registro_modelos.obter(regiao)
+
+
+def versao_pipeline(regiao=REGIAO_PADRAO):
+    estado = os.stat(caminho_modelo_regiao(regiao))
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+# Pipelines do sklearn para os lotes grandes do /predict quando o modelo residente é
+# o artefato compacto (ou a floresta mapeada): lidos do .pkl só no primeiro lote
+# acima de LOTE_MAXIMO_MOTOR, com o mesmo descarte LRU dos modelos
+registro_pipelines = RegistroModelos(
+    lambda regiao: joblib.load(caminho_modelo_regiao(regiao)),
+    versao=versao_pipeline,
+)
+
+
+def pipeline_regiao(regiao=REGIAO_PADRAO):
+    """Pipeline do sklearn da região; None se só houver o artefato (sem .pkl)"""
+    pipeline = modelo_regiao(regiao)["pipeline"]
+    if pipeline is None and os.path.exists(caminho_modelo_regiao(regiao)):
+        pipeline = registro_pipelines.obter(regiao)
+    return pipeline
+
+
+# Figuras prontas por (gráfico, mobile, região), junto das versões do modelo e do
+# dataset de que vieram. Os dados são estáticos entre versões, então cada
+# combinação é montada uma única vez por versão. Ficam só com tipos nativos do JSON (listas,
+# strings, números): arrays numpy, sobretudo de datas, seriam convertidos de novo
+# pelo Dash a cada resposta.
+cache_figuras = {}
+
+# O modelo da região padrão é carregado já na inicialização
+modelo_regiao()
+
+
+def _pre_calculado(regiao, grupo):
+    artefato = modelo_regiao(regiao)["artefato"]
+    return (artefato.grupo(grupo) or None) if artefato is not None else None
+
+
+def dependencia_parcial(regiao=REGIAO_PADRAO):
+    """Grades de dependência parcial do artefato do modelo (None se não houver)"""
+    return _pre_calculado(regiao, "pdp")
+
+
+def explicacoes(regiao=REGIAO_PADRAO):
+    """Valores SHAP (kg/ha) do artefato do modelo (None se não houver)"""
+    return _pre_calculado(regiao, "shap")
+
+
+# --- SIMULADOR DE CENÁRIOS ---
+# Entradas do simulador (coluna de FEATURES -> passo do slider). Os valores são
+# arredondados ao passo antes da previsão: cenários na mesma célula reaproveitam
+# o resultado em cache sem chamar a floresta.
+PASSOS_SIMULADOR = {"temp_movel": 0.1, "precip_movel": 1.0, "area_plantada": 1000.0}
+
+
+def quantizar(valor, passo):
+    return round(round(float(valor) / passo) * passo, 6)
+
+
+@lru_cache(maxsize=4096)
+def prever_cenario(regiao, versao, temp_movel, precip_movel, area_plantada):
+    """Rendimento relativo previsto nos 12 meses de um cenário (entradas quantizadas)
+
+    A versão do arquivo do modelo faz parte da chave: um modelo novo não reaproveita
+    previsões antigas.
+    """
+    meses = np.arange(1, 13)
+    X = montar_matriz(
+        meses,
+        np.full(12, temp_movel),
+        np.full(12, precip_movel),
+        np.full(12, area_plantada),
+    )
+    # A grade inteira (12 meses) em uma única chamada ao modelo
+    return tuple(modelo_regiao(regiao)["floresta"].prever(X))
+
+
+def simular_cenario(regiao, temp_movel, precip_movel, area_plantada):
+    return np.array(
+        prever_cenario(
+            regiao,
+            versao_arquivo_modelo(regiao),
+            quantizar(temp_movel, PASSOS_SIMULADOR["temp_movel"]),
+            quantizar(precip_movel, PASSOS_SIMULADOR["precip_movel"]),
+            quantizar(area_plantada, PASSOS_SIMULADOR["area_plantada"]),
+        )
+    )
+
+
+# --- CARREGAMENTO PROGRESSIVO ---
+# CARREGAMENTO_PROGRESSIVO=1 (padrão): o layout chega com esqueletos no lugar dos
+# cards, métricas e estilos vêm primeiro, os gráficos acima da dobra logo em seguida
+# e as seções abaixo dela só são pedidas ao servidor quando entram na tela
+# (IntersectionObserver em assets/carregamento_progressivo.js). Com 0, todos os
+# cards são montados já na carga inicial.
+CARREGAMENTO_PROGRESSIVO = os.environ.get("CARREGAMENTO_PROGRESSIVO", "1") == "1"
+# Seções abaixo da dobra, cada uma com um dcc.Store "<id>-visivel"
+SECOES_SOB_DEMANDA = (
+    "pdp-card",
+    "shap-card",
+    "series-card",
+    "simulator-card",
+    "data-table-card",
+)
+# Altura (px) reservada pelo esqueleto de cada card: a página não pula quando ele chega
+ALTURAS_ESQUELETO = {
+    "metric-card-1": 110,
+    "metric-card-2": 110,
+    "feature-importance-card": 420,
+    "predictions-card": 420,
+    "pdp-card": 460,
+    "shap-card": 460,
+    "series-card": 560,
+    "simulator-card": 560,
+    "data-table-card": 640,
+}
+
 
 # --- INICIALIZAÇÃO DA APLICAÇÃO ---
 app = dash.Dash(
     __name__,
     external_stylesheets=[dbc.themes.BOOTSTRAP, dbc.icons.FONT_AWESOME],
+    # A tabela histórica é criada por callback (update_table)
+    suppress_callback_exceptions=True,
     meta_tags=[
         {
             "name": "viewport",
@@ -693,13 +445,9 @@ def get_responsive_config():
 
 
 # --- FUNÇÕES PARA CRIAR GRÁFICOS ---
-def create_feature_importance_graph(theme="light", is_mobile=False):
-    if theme == "dark":
-        bg_color = "#1a1d24"
-        text_color = "#e0e0e0"
-    else:
-        bg_color = "rgba(0,0,0,0)"
-        text_color = "#2d5016"
+def create_feature_importance_graph(is_mobile=False, regiao=REGIAO_PADRAO):
+    bg_color = "rgba(0,0,0,0)"
+    text_color = "#2d5016"
 
     green_colors = [
         "#6ebb3c",
@@ -711,7 +459,7 @@ def create_feature_importance_graph(theme="light", is_mobile=False):
     ]
 
     feature_names = np.array(model_data["feature_names"])
-    feature_importances = np.array(model_data["feature_importances"])
+    feature_importances = np.array(modelo_regiao(regiao)["feature_importances"])
     order = np.argsort(feature_importances)
     feature_names = feature_names[order][::-1]
     feature_importances = feature_importances[order][::-1]
@@ -756,24 +504,21 @@ def create_feature_importance_graph(theme="light", is_mobile=False):
     return fig
 
 
-def create_predictions_graph(theme="light", is_mobile=False):
+def create_predictions_graph(is_mobile=False, regiao=REGIAO_PADRAO):
     """Cria o gráfico de dispersão igual ao do script original"""
-    if theme == "dark":
-        bg_color = "#1a1d24"
-        text_color = "#e0e0e0"
-        grid_color = "#444444"
-    else:
-        bg_color = "rgba(0,0,0,0)"
-        text_color = "#2d5016"
-        grid_color = "#e0e0e0"
+    modelo = modelo_regiao(regiao)
+    p10, p50, p90 = modelo["y_quantis_real"]
+    bg_color = "rgba(0,0,0,0)"
+    text_color = "#2d5016"
+    grid_color = "#e0e0e0"
 
     fig = go.Figure()
 
     # Pontos de dispersão (igual ao seaborn.scatterplot do original)
     fig.add_trace(
         go.Scatter(
-            x=model_data["y_test_real"],
-            y=model_data["y_pred_real"],
+            x=modelo["y_test_real"],
+            y=modelo["y_pred_real"],
             mode="markers",
             marker=dict(
                 size=12 if is_mobile else 16,
@@ -781,12 +526,24 @@ def create_predictions_graph(theme="light", is_mobile=False):
                 line=dict(width=1, color="black"),  # Borda preta igual ao original
                 opacity=0.7,  # Alpha igual ao original
             ),
+            # Faixa P10-P90 das árvores como barra de erro em torno da previsão
+            error_y=dict(
+                type="data",
+                symmetric=False,
+                array=np.maximum(p90 - modelo["y_pred_real"], 0),
+                arrayminus=np.maximum(modelo["y_pred_real"] - p10, 0),
+                color="rgba(40, 167, 69, 0.6)",
+                thickness=1.5,
+                width=3 if is_mobile else 5,
+            ),
             text=[
                 f"Real: {real:,.0f} kg/ha".replace(",", ".")
                 + f"<br>Previsto: {pred:,.0f} kg/ha".replace(",", ".")
                 + f"<br>Erro: {abs(real-pred):,.0f} kg/ha".replace(",", ".")
-                for real, pred in zip(
-                    model_data["y_test_real"], model_data["y_pred_real"]
+                + f"<br>P10–P90: {baixo:,.0f} – {alto:,.0f} kg/ha".replace(",", ".")
+                + f"<br>P50: {mediana:,.0f} kg/ha".replace(",", ".")
+                for real, pred, baixo, mediana, alto in zip(
+                    modelo["y_test_real"], modelo["y_pred_real"], p10, p50, p90
                 )
             ],
             hovertemplate="<b>Predição</b><br>%{text}<extra></extra>",
@@ -795,8 +552,8 @@ def create_predictions_graph(theme="light", is_mobile=False):
     )
 
     # Linha de referência diagonal (igual ao matplotlib.plot do original)
-    min_val = min(min(model_data["y_test_real"]), min(model_data["y_pred_real"]))
-    max_val = max(max(model_data["y_test_real"]), max(model_data["y_pred_real"]))
+    min_val = min(min(modelo["y_test_real"]), min(modelo["y_pred_real"]))
+    max_val = max(max(modelo["y_test_real"]), max(modelo["y_pred_real"]))
 
     fig.add_trace(
         go.Scatter(
@@ -852,24 +609,319 @@ def create_predictions_graph(theme="light", is_mobile=False):
     return fig
 
 
+def indicar_indisponivel(fig, nome, is_mobile=False):
+    """Aviso no lugar de uma figura cujo arquivo pré-calculado ainda não existe"""
+    fig.add_annotation(
+        text=f"{nome} não disponível: execute modelagem.py para gerá-la",
+        showarrow=False,
+        font=dict(size=12 if is_mobile else 14),
+    )
+    fig.update_xaxes(visible=False)
+    fig.update_yaxes(visible=False)
+
+
+def create_partial_dependence_graph(is_mobile=False, regiao=REGIAO_PADRAO):
+    """Superfície de dependência parcial temperatura × precipitação (pré-calculada)"""
+    bg_color = "rgba(0,0,0,0)"
+    text_color = "#2d5016"
+
+    fig = go.Figure()
+    superficie = dependencia_parcial(regiao)
+    if superficie is None:
+        indicar_indisponivel(fig, "Superfície", is_mobile)
+    else:
+        fig.add_trace(
+            go.Heatmap(
+                x=superficie["grade2d_precip_movel"],
+                y=superficie["grade2d_temp_movel"],
+                z=superficie["pdp_2d"],
+                colorscale="Greens",
+                colorbar=dict(title="kg/ha", thickness=12 if is_mobile else 18),
+                hovertemplate=(
+                    "Temperatura: %{y:.1f} °C<br>Precipitação: %{x:.0f} mm"
+                    "<br><b>Rendimento: %{z:,.0f} kg/ha</b><extra></extra>"
+                ),
+            )
+        )
+
+    fig.update_layout(
+        title={
+            "text": "Dependência Parcial: Temperatura × Precipitação",
+            "x": 0.5,
+            "xanchor": "center",
+            "font": {
+                "size": 16 if is_mobile else 20,
+                "family": "Arial Black",
+                "color": cor_detalhes,
+            },
+        },
+        xaxis_title="Precipitação Média (mm) - 6 meses",
+        yaxis_title="Temperatura Média (°C) - 6 meses",
+        height=350 if is_mobile else 450,
+        margin=dict(l=60, r=30, t=60, b=50),
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color,
+        font=dict(color=text_color, size=10 if is_mobile else 12),
+        separators=",.",
+    )
+    return fig
+
+
+def create_shap_global_graph(is_mobile=False, regiao=REGIAO_PADRAO):
+    """Média de |SHAP| por variável (kg/ha), pré-calculada pelo modelagem.py"""
+    bg_color = "rgba(0,0,0,0)"
+    text_color = "#2d5016"
+
+    fig = go.Figure()
+    valores = explicacoes(regiao)
+    if valores is None:
+        indicar_indisponivel(fig, "Explicação", is_mobile)
+    else:
+        nomes = dict(zip(FEATURES, model_data["feature_names"]))
+        ordem = np.argsort(valores["importancia"])
+        fig.add_trace(
+            go.Bar(
+                x=valores["importancia"][ordem],
+                y=[nomes[FEATURES[indice]] for indice in ordem],
+                orientation="h",
+                marker=dict(color=cor_detalhes, line=dict(color="#1e3a0f", width=1)),
+                hovertemplate="<b>%{y}</b><br>Média |SHAP|: %{x:,.1f} kg/ha<extra></extra>",
+            )
+        )
+
+    fig.update_layout(
+        title={
+            "text": "Impacto Médio nas Previsões (SHAP)",
+            "x": 0.5,
+            "xanchor": "center",
+            "font": {
+                "size": 16 if is_mobile else 20,
+                "family": "Arial Black",
+                "color": cor_detalhes,
+            },
+        },
+        xaxis_title="Média de |SHAP| (kg/ha)",
+        height=300 if is_mobile else 400,
+        margin=dict(l=100 if is_mobile else 120, r=30 if is_mobile else 50, t=60, b=50),
+        showlegend=False,
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color,
+        font=dict(color=text_color, size=10 if is_mobile else 12),
+        xaxis=dict(tickfont=dict(size=9 if is_mobile else 12)),
+        yaxis=dict(tickfont=dict(size=9 if is_mobile else 12)),
+        separators=",.",
+    )
+    return fig
+
+
+def create_shap_local_graph(ponto=0, is_mobile=False, regiao=REGIAO_PADRAO):
+    """Decomposição (cascata) de uma previsão do conjunto de teste em contribuições SHAP"""
+    fig = go.Figure()
+    valores = explicacoes(regiao)
+    dados = dados_regiao(regiao)
+    if valores is None or len(valores["shap"]) != len(dados["X"]):
+        indicar_indisponivel(fig, "Explicação", is_mobile)
+        titulo = "Decomposição da Previsão"
+    else:
+        modelo = modelo_regiao(regiao)
+        linha = modelo["posicoes_teste"][ponto]
+        contribuicoes = valores["shap"][linha]
+        base = float(valores["valor_base"][linha])
+        nomes = dict(zip(FEATURES, model_data["feature_names"]))
+        previsto = base + float(contribuicoes.sum())
+        fig.add_trace(
+            go.Waterfall(
+                orientation="h",
+                measure=["absolute"] + ["relative"] * len(contribuicoes) + ["total"],
+                y=["Valor base"] + [nomes[nome] for nome in FEATURES] + ["Previsão"],
+                x=[base, *contribuicoes.tolist(), previsto],
+                increasing=dict(marker=dict(color="#28a745")),
+                decreasing=dict(marker=dict(color="#dc3545")),
+                totals=dict(marker=dict(color="#2d5016")),
+                connector=dict(line=dict(color="#888888", width=1)),
+                hovertemplate="<b>%{y}</b><br>%{x:+,.1f} kg/ha<extra></extra>",
+            )
+        )
+        real = modelo["y_test_real"][ponto]
+        titulo = (
+            f"Previsão {ponto + 1}: {previsto:,.0f} kg/ha (real {real:,.0f})"
+        ).replace(",", ".")
+        fig.update_xaxes(range=[min(base, previsto) * 0.9, max(base, previsto) * 1.05])
+
+    fig.update_layout(
+        title={
+            "text": titulo,
+            "x": 0.5,
+            "xanchor": "center",
+            "font": {
+                "size": 14 if is_mobile else 18,
+                "family": "Arial Black",
+                "color": cor_detalhes,
+            },
+        },
+        xaxis_title="Rendimento (kg/ha)",
+        height=300 if is_mobile else 400,
+        margin=dict(l=100 if is_mobile else 120, r=30 if is_mobile else 50, t=60, b=50),
+        showlegend=False,
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#2d5016", size=10 if is_mobile else 12),
+        yaxis=dict(autorange="reversed", tickfont=dict(size=9 if is_mobile else 12)),
+        separators=",.",
+    )
+    return fig
+
+
+def series_decimadas(regiao, pontos, inicio=None, fim=None):
+    """(datas, valores) de cada série histórica no trecho [inicio, fim], decimadas
+
+    As datas vão como texto na resolução da série (AAAA-MM-DD para as mensais), mais
+    curto que o datetime completo que o Plotly receberia.
+    """
+    dados = dados_regiao(regiao)
+    series = []
+    for coluna, _, _ in SERIES_HISTORICAS:
+        datas, valores = decimar(
+            dados["datas"], dados["series"][coluna], pontos, inicio, fim
+        )
+        series.append((np.datetime_as_string(datas), valores))
+    return series
+
+
+def titulo_series(exibidos, total):
+    return f"Série Histórica Mensal ({exibidos:,} de {total:,} pontos)".replace(
+        ",", "."
+    )
+
+
+def intervalo_visivel(relayout):
+    """(início, fim) do eixo x após um evento de relayout do gráfico de séries
+
+    (None, None) quando o gráfico volta à visão completa (duplo clique ou autoscale)
+    e None quando o evento não muda o eixo x (carga inicial, zoom só no eixo y).
+    Com os eixos x compartilhados, o evento pode vir de qualquer linha (xaxis2...).
+    """
+    for chave, valor in (relayout or {}).items():
+        eixo, _, propriedade = chave.partition(".")
+        if not eixo.startswith("xaxis"):
+            continue
+        if propriedade == "autorange" and valor:
+            return None, None
+        if propriedade == "range":
+            inicio, fim = valor
+        elif propriedade == "range[0]":
+            inicio, fim = valor, relayout.get(f"{eixo}.range[1]")
+        else:
+            continue
+        return tuple(pd.Timestamp(limite).to_datetime64() for limite in (inicio, fim))
+    return None
+
+
+def create_series_graph(is_mobile=False, regiao=REGIAO_PADRAO):
+    """Temperatura, precipitação e rendimento mensais em linhas com o eixo x comum
+
+    Scattergl (WebGL) e séries decimadas no servidor: o zoom pede de novo só o
+    trecho visível (update_series_zoom), na mesma resolução.
+    """
+    bg_color = "rgba(0,0,0,0)"
+    text_color = "#2d5016"
+
+    pontos = PONTOS_POR_TELA[bool(is_mobile)]
+    series = series_decimadas(regiao, pontos)
+    fig = make_subplots(
+        rows=len(SERIES_HISTORICAS), cols=1, shared_xaxes=True, vertical_spacing=0.04
+    )
+    for linha, ((datas, valores), (_, rotulo, cor)) in enumerate(
+        zip(series, SERIES_HISTORICAS), start=1
+    ):
+        fig.add_trace(
+            go.Scattergl(
+                x=datas,
+                y=valores,
+                mode="lines",
+                name=rotulo,
+                line=dict(color=cor, width=1.5),
+                hovertemplate=f"{rotulo}: %{{y:,.1f}}<extra></extra>",
+            ),
+            row=linha,
+            col=1,
+        )
+        fig.update_yaxes(
+            title_text=rotulo,
+            title_font=dict(size=9 if is_mobile else 12),
+            tickfont=dict(size=9 if is_mobile else 11),
+            row=linha,
+            col=1,
+        )
+
+    total = len(dados_regiao(regiao)["datas"])
+    fig.update_layout(
+        title={
+            "text": titulo_series(len(series[0][0]), total),
+            "x": 0.5,
+            "xanchor": "center",
+            "font": {
+                "size": 16 if is_mobile else 20,
+                "family": "Arial Black",
+                "color": cor_detalhes,
+            },
+        },
+        height=450 if is_mobile else 550,
+        margin=dict(l=60, r=30, t=60, b=40),
+        showlegend=False,
+        hovermode="x unified",
+        # Mantém o zoom do usuário quando as séries decimadas são trocadas
+        uirevision=regiao,
+        plot_bgcolor=bg_color,
+        paper_bgcolor=bg_color,
+        font=dict(color=text_color, size=10 if is_mobile else 12),
+        separators=",.",
+    )
+    return fig
+
+
+def get_cached_figure(builder, is_mobile=False, regiao=REGIAO_PADRAO):
+    """Figura serializada do cache; remonta se o modelo ou o dataset mudou em disco
+
+    Não depende do modelo estar residente: figuras de um modelo descartado pelo
+    registro continuam sendo servidas sem recarregá-lo.
+    """
+    chave = (builder.__name__, bool(is_mobile), regiao)
+    # A série histórica vem do dataset, o resto do modelo
+    versao = (versao_arquivo_modelo(regiao), versao_dataset(caminho_regiao(regiao)))
+    entrada = cache_figuras.get(chave)
+    if entrada is None or entrada[0] != versao:
+        # Só a versão clara (fundo transparente); o tema escuro recolore via CSS
+        entrada = cache_figuras[chave] = (
+            versao,
+            json.loads(builder(is_mobile, regiao).to_json()),
+        )
+    return entrada[1]
+
+
+def warm_figure_cache(regiao=REGIAO_PADRAO):
+    for builder in (
+        create_feature_importance_graph,
+        create_predictions_graph,
+        create_partial_dependence_graph,
+        create_shap_global_graph,
+        create_series_graph,
+    ):
+        for is_mobile in (False, True):
+            get_cached_figure(builder, is_mobile, regiao)
+
+
+warm_figure_cache()
+
+
 def create_metric_card(
     title,
     value,
     icon,
     color="#28a745",  # Agora aceita cor hexadecimal
     subtitle=None,
-    theme="light",
     is_mobile=False,
 ):
-    if theme == "dark":
-        card_bg = dark_theme_bg
-        text_color = "#e0e0e0"
-        subtitle_color = "#a0a0a0"
-    else:
-        card_bg = light_theme_bg
-        text_color = "#333333"
-        subtitle_color = "#6c757d"
-
     icon_size = 35 if is_mobile else 50
     value_size = "2rem" if is_mobile else "2.5rem"
     title_size = "0.9rem" if is_mobile else "1.1rem"
@@ -892,14 +944,14 @@ def create_metric_card(
                             ),
                             html.P(
                                 title,
-                                className="fw-bold mb-0",
-                                style={"fontSize": title_size, "color": text_color},
+                                className="fw-bold mb-0 tema-texto",
+                                style={"fontSize": title_size},
                             ),
                             (
                                 html.Small(
                                     subtitle,
+                                    className="tema-texto-secundario",
                                     style={
-                                        "color": subtitle_color,
                                         "fontSize": (
                                             "0.8rem" if is_mobile else "0.875rem"
                                         ),
@@ -915,11 +967,179 @@ def create_metric_card(
                 style={"padding": "1rem" if is_mobile else "1.5rem"},
             )
         ],
-        className="h-100 shadow border-0",
-        style={
-            "background": card_bg,
-            "border-left": f"5px solid {color} !important",
-        },
+        className="h-100 shadow border-0 tema-card-metrica",
+        style={"border-left": f"5px solid {color} !important"},
+    )
+
+
+def create_graph_card(titulo, conteudo, is_mobile=False):
+    """Card com título no cabeçalho e os gráficos no corpo"""
+    return dbc.Card(
+        [
+            dbc.CardHeader(
+                [
+                    html.H5(
+                        titulo,
+                        className="mb-0 fw-bold",
+                        style={
+                            "color": cor_detalhes,
+                            "fontSize": "1rem" if is_mobile else "1.25rem",
+                        },
+                    )
+                ],
+                className="tema-card-header",
+                style={
+                    "border-bottom": f"3px solid {cor_detalhes}",
+                    "padding": "0.75rem 1rem" if is_mobile else "1rem 1.25rem",
+                },
+            ),
+            dbc.CardBody(
+                conteudo,
+                className="tema-card",
+                style={"padding": "0.75rem" if is_mobile else "1rem"},
+            ),
+        ],
+        className="shadow border-0 h-100 tema-card",
+    )
+
+
+def create_feature_importance_card(is_mobile=False, regiao=REGIAO_PADRAO):
+    return create_graph_card(
+        "Gráfico de Barras: Análise das Variáveis do Modelo",
+        [
+            dcc.Graph(
+                id="feature-importance-graph",
+                figure=get_cached_figure(
+                    create_feature_importance_graph, is_mobile, regiao
+                ),
+                config=get_responsive_config(),
+            )
+        ],
+        is_mobile,
+    )
+
+
+def create_predictions_card(is_mobile=False, regiao=REGIAO_PADRAO):
+    return create_graph_card(
+        "Gráfico de Dispersão: Análise de Predições",
+        [
+            dcc.Graph(
+                id="predictions-vs-actual-graph",
+                figure=get_cached_figure(create_predictions_graph, is_mobile, regiao),
+                config=get_responsive_config(),
+            )
+        ],
+        is_mobile,
+    )
+
+
+def create_pdp_card(is_mobile=False, regiao=REGIAO_PADRAO):
+    return create_graph_card(
+        "Mapa de Calor: Efeito Combinado do Clima",
+        [
+            dcc.Graph(
+                id="partial-dependence-graph",
+                figure=get_cached_figure(
+                    create_partial_dependence_graph, is_mobile, regiao
+                ),
+                config=get_responsive_config(),
+            )
+        ],
+        is_mobile,
+    )
+
+
+def create_shap_card(is_mobile=False, regiao=REGIAO_PADRAO):
+    return create_graph_card(
+        "Explicação das Previsões (SHAP)",
+        [
+            dbc.Row(
+                [
+                    dbc.Col(
+                        dcc.Graph(
+                            id="shap-global-graph",
+                            figure=get_cached_figure(
+                                create_shap_global_graph, is_mobile, regiao
+                            ),
+                            config=get_responsive_config(),
+                        ),
+                        xs=12,
+                        lg=6,
+                    ),
+                    dbc.Col(
+                        [
+                            dcc.Graph(
+                                id="shap-local-graph",
+                                figure=create_shap_local_graph(0, is_mobile, regiao),
+                                config=get_responsive_config(),
+                            ),
+                            html.Small(
+                                "Clique em um ponto do gráfico de dispersão "
+                                "para ver a decomposição da previsão.",
+                                className="tema-texto-secundario",
+                            ),
+                        ],
+                        xs=12,
+                        lg=6,
+                    ),
+                ]
+            )
+        ],
+        is_mobile,
+    )
+
+
+def create_series_card(is_mobile=False, regiao=REGIAO_PADRAO):
+    return create_graph_card(
+        "Série Histórica: Clima e Rendimento",
+        [
+            dcc.Graph(
+                id="series-graph",
+                figure=get_cached_figure(create_series_graph, is_mobile, regiao),
+                config=get_responsive_config(),
+            ),
+            html.Small(
+                "Arraste sobre o gráfico para ampliar um período; "
+                "duplo clique volta à série completa.",
+                className="tema-texto-secundario",
+            ),
+        ],
+        is_mobile,
+    )
+
+
+def create_placeholder_card(altura):
+    """Esqueleto exibido no lugar de um card até o callback dele responder"""
+    return dbc.Card(
+        [
+            dbc.CardHeader(
+                html.Div(
+                    className="tema-esqueleto",
+                    style={"height": "1.5rem", "width": "60%"},
+                ),
+                className="tema-card-header",
+            ),
+            dbc.CardBody(
+                html.Div(className="tema-esqueleto", style={"height": f"{altura}px"}),
+                className="tema-card",
+            ),
+        ],
+        className="shadow border-0 h-100 tema-card",
+    )
+
+
+def card_container(id_card):
+    """Div preenchida por callback: com o carregamento progressivo, começa com um
+    esqueleto e, nas seções sob demanda, avisa quando entra na tela"""
+    if not CARREGAMENTO_PROGRESSIVO:
+        return html.Div(id=id_card)
+    atributos = (
+        {"data-carregar": f"{id_card}-visivel"} if id_card in SECOES_SOB_DEMANDA else {}
+    )
+    return html.Div(
+        id=id_card,
+        children=create_placeholder_card(ALTURAS_ESQUELETO[id_card]),
+        **atributos,
     )
 
 
@@ -941,7 +1161,14 @@ app.layout = html.Div(
         dcc.Location(id="url", refresh=False),
         dcc.Store(id="theme-store", data="light"),
         dcc.Store(id="selected-year-store", data=2023),
+        dcc.Store(id="selected-region-store", data=REGIAO_PADRAO),
         dcc.Store(id="mobile-store", data=False),
+        # Região e dispositivo do layout já aplicado: dispara os cards acima da dobra
+        dcc.Store(id="layout-pronto-store"),
+        *[
+            dcc.Store(id=f"{secao}-visivel", data=not CARREGAMENTO_PROGRESSIVO)
+            for secao in SECOES_SOB_DEMANDA
+        ],
         # Barra superior mobile
         html.Div(
             id="mobile-navbar",
@@ -989,7 +1216,16 @@ app.layout = html.Div(
                         fluid=True,
                         className="px-3 d-flex justify-content-between align-items-center",
                     ),
-                    className="shadow-sm",
+                    className="shadow-sm tema-navbar",
+                    style={
+                        "minHeight": "56px",
+                        "position": "fixed",
+                        "top": "0",
+                        "left": "0",
+                        "right": "0",
+                        "zIndex": "1030",
+                        "borderBottom": f"3px solid {cor_detalhes}",
+                    },
                 )
             ],
             className="d-block d-md-none",
@@ -1026,7 +1262,7 @@ app.layout = html.Div(
                                                 ),
                                                 html.P(
                                                     id="subtitle-text",
-                                                    className="lead text-center mt-3",
+                                                    className="lead text-center mt-3 tema-texto-secundario",
                                                 ),
                                             ],
                                             style={"position": "relative"},
@@ -1069,12 +1305,12 @@ app.layout = html.Div(
                         dbc.Row(
                             [
                                 dbc.Col(
-                                    [html.Div(id="metric-card-1")],
+                                    [card_container("metric-card-1")],
                                     xs=12,
                                     sm=6,
                                     className="mb-3 mb-sm-0",
                                 ),
-                                dbc.Col([html.Div(id="metric-card-2")], xs=12, sm=6),
+                                dbc.Col([card_container("metric-card-2")], xs=12, sm=6),
                             ],
                             className="mb-4 mb-md-5",
                         ),
@@ -1087,20 +1323,76 @@ app.layout = html.Div(
                         dbc.Row(
                             [
                                 dbc.Col(
-                                    [html.Div(id="feature-importance-card")],
+                                    [card_container("feature-importance-card")],
                                     xs=12,
                                     lg=6,
                                     className="mb-4 mb-lg-0",
                                 ),
-                                dbc.Col([html.Div(id="predictions-card")], xs=12, lg=6),
+                                dbc.Col(
+                                    [card_container("predictions-card")], xs=12, lg=6
+                                ),
+                            ],
+                            className="mb-4 mb-md-5",
+                        ),
+                        dbc.Row(
+                            [dbc.Col([card_container("pdp-card")], xs=12)],
+                            className="mb-4 mb-md-5",
+                        ),
+                        dbc.Row(
+                            [dbc.Col([card_container("shap-card")], xs=12)],
+                            className="mb-4 mb-md-5",
+                        ),
+                        dbc.Row(
+                            [dbc.Col([card_container("series-card")], xs=12)],
+                            className="mb-4 mb-md-5",
+                        ),
+                    ],
+                ),
+                # Simulador de Cenários
+                html.Div(
+                    id="simulator-container",
+                    children=[
+                        dbc.Row(
+                            [dbc.Col([card_container("simulator-card")], xs=12)],
+                            className="mb-4 mb-md-5",
+                        ),
+                    ],
+                ),
+                # Filtros de Região e Ano
+                dbc.Row(
+                    [
+                        dbc.Col(
+                            [
+                                html.Div(
+                                    [
+                                        dbc.Label(
+                                            "Filtrar por Região:",
+                                            html_for="region-filter",
+                                            id="region-filter-label",
+                                        ),
+                                        dbc.Select(
+                                            id="region-filter",
+                                            options=[
+                                                {"label": f"📍 {nome}", "value": codigo}
+                                                for codigo, nome in regioes.items()
+                                            ],
+                                            value=REGIAO_PADRAO,
+                                            className="fw-bold",
+                                        ),
+                                    ],
+                                    id="region-filter-container",
+                                    className="mb-4",
+                                    style={
+                                        "padding": "15px",
+                                        "borderRadius": "8px",
+                                        "transition": "all 0.3s ease",
+                                    },
+                                )
                             ],
-                            className="mb-4 mb-md-5",
+                            xs=12,
+                            md=6,
+                            lg=4,
                         ),
-                    ],
-                ),
-                # Filtro de Ano
-                dbc.Row(
-                    [
                         dbc.Col(
                             [
                                 html.Div(
@@ -1122,12 +1414,17 @@ app.layout = html.Div(
                                     ],
                                     id="year-filter-container",
                                     className="mb-4",
+                                    style={
+                                        "padding": "15px",
+                                        "borderRadius": "8px",
+                                        "transition": "all 0.3s ease",
+                                    },
                                 )
                             ],
                             xs=12,
                             md=6,
                             lg=4,
-                        )
+                        ),
                     ]
                 ),
                 # Tabela de Dados Históricos
@@ -1135,7 +1432,7 @@ app.layout = html.Div(
                     id="table-section",
                     children=[
                         dbc.Row(
-                            [dbc.Col([html.Div(id="data-table-card")], xs=12)],
+                            [dbc.Col([card_container("data-table-card")], xs=12)],
                             className="mb-4 mb-md-5",
                         ),
                     ],
@@ -1145,7 +1442,13 @@ app.layout = html.Div(
                     [
                         dbc.Col(
                             [
-                                html.Hr(id="footer-hr"),
+                                html.Hr(
+                                    id="footer-hr",
+                                    style={
+                                        "border-color": cor_detalhes,
+                                        "border-width": "2px",
+                                    },
+                                ),
                                 html.P(
                                     [
                                         "🚀 Dashboard criado por ",
@@ -1166,7 +1469,7 @@ app.layout = html.Div(
                                         ),
                                     ],
                                     id="footer-text",
-                                    className="text-center",
+                                    className="text-center tema-texto-secundario",
                                 ),
                             ]
                         )
@@ -1182,16 +1485,28 @@ app.layout = html.Div(
 
 
 # --- CALLBACKS ---
-@callback(
-    Output("theme-store", "data"),
+# Troca de tema inteiramente no navegador: o atributo data-theme do <html> ativa as
+# variáveis CSS de assets/tema.css, sem ida ao servidor nem reenvio de componentes
+app.clientside_callback(
+    """
+    function(n_clicks_desktop, n_clicks_mobile, current_theme) {
+        const total_clicks = (n_clicks_desktop || 0) + (n_clicks_mobile || 0);
+        const theme = total_clicks === 0
+            ? current_theme
+            : (current_theme === "light" ? "dark" : "light");
+        document.documentElement.setAttribute("data-theme", theme);
+        const icon = theme === "dark" ? "🌙" : "☀️";
+        return [theme, icon, icon];
+    }
+    """,
+    [
+        Output("theme-store", "data"),
+        Output("theme-icon", "children"),
+        Output("theme-icon-mobile", "children"),
+    ],
     [Input("theme-toggle", "n_clicks"), Input("theme-toggle-mobile", "n_clicks")],
     State("theme-store", "data"),
 )
-def toggle_theme(n_clicks_desktop, n_clicks_mobile, current_theme):
-    total_clicks = (n_clicks_desktop or 0) + (n_clicks_mobile or 0)
-    if total_clicks == 0:
-        return current_theme
-    return "dark" if current_theme == "light" else "light"
 
 
 @callback(Output("selected-year-store", "data"), Input("year-filter", "value"))
@@ -1199,226 +1514,86 @@ def update_selected_year(selected_year):
     return selected_year
 
 
+@callback(
+    [
+        Output("selected-region-store", "data"),
+        Output("year-filter", "options"),
+        Output("year-filter", "value"),
+    ],
+    Input("region-filter", "value"),
+    State("year-filter", "value"),
+)
+def update_selected_region(regiao, selected_year):
+    if regiao not in regioes:
+        raise PreventUpdate
+    # Anos da região escolhida; mantém o ano atual quando ele existe na região
+    anos_regiao = dados_regiao(regiao)["anos"]
+    if selected_year is None or int(selected_year) not in anos_regiao:
+        selected_year = anos_regiao[-1]
+    options = [{"label": f"📅 {ano}", "value": ano} for ano in anos_regiao]
+    return regiao, options, selected_year
+
+
 @callback(
     [
         Output("main-container", "style"),
-        Output("mobile-navbar", "children"),
         Output("subtitle-text", "children"),
         Output("subtitle-text", "style"),
         Output("footer-text", "style"),
-        Output("footer-hr", "style"),
-        Output("theme-icon", "children"),
-        Output("theme-icon-mobile", "children"),
         Output("metric-card-1", "children"),
         Output("metric-card-2", "children"),
-        Output("feature-importance-card", "children"),
-        Output("predictions-card", "children"),
-        Output("year-filter-container", "style"),
         Output("year-filter-label", "style"),
         Output("year-filter", "style"),
         Output("title-container", "style"),
+        Output("region-filter-label", "style"),
+        Output("region-filter", "style"),
+        Output("layout-pronto-store", "data"),
     ],
-    [Input("theme-store", "data"), Input("mobile-store", "data")],
+    [Input("mobile-store", "data"), Input("selected-region-store", "data")],
 )
-def update_theme(theme, is_mobile):
-    if theme == "dark":
-        background_color = "#0e1117"
-        card_color = "#1a1d24"
-        text_color = "#e0e0e0"
-        subtitle_color = "#a0a0a0"
-        shadow = "0 4px 8px rgba(0, 0, 0, 0.3)"
-        theme_icon = "🌙"
-        navbar_bg = dark_theme_bg
-    else:
-        background_color = "#fafafa"
-        card_color = "#ffffff"
-        text_color = "#333333"
-        subtitle_color = "#6c757d"
-        shadow = "0 4px 8px rgba(0, 0, 0, 0.1)"
-        theme_icon = "☀️"
-        navbar_bg = light_theme_bg
-
+def update_responsive_layout(is_mobile, regiao=REGIAO_PADRAO):
+    # Cores ficam no CSS (assets/tema.css); aqui só o que depende do dispositivo
     title_size = "1.8rem" if is_mobile else "3rem"
     subtitle_size = "1rem" if is_mobile else "1.3rem"
     footer_size = "0.9rem" if is_mobile else "1.1rem"
 
     main_style = {
-        "backgroundColor": background_color,
-        "color": text_color,
         "minHeight": "100vh",
-        "transition": "all 0.3s ease",
         "overflowX": "hidden",
         "width": "100%",
         "maxWidth": "100vw",
         "paddingTop": "56px" if is_mobile else "0",
     }
 
-    mobile_navbar_children = [
-        dbc.Navbar(
-            dbc.Container(
-                [
-                    html.Div(
-                        [
-                            DashIconify(
-                                icon="fa:line-chart",
-                                width=24,
-                                className="me-2",
-                                style={"color": cor_detalhes},
-                            ),
-                            html.Span(
-                                "Produtividade da Soja no RS",
-                                className="navbar-brand mb-0 h1 fw-bold",
-                                style={"color": cor_detalhes, "fontSize": "1.2rem"},
-                            ),
-                        ],
-                        className="d-flex align-items-center",
-                    ),
-                    html.Button(
-                        id="theme-toggle-mobile",
-                        children=[html.Span(theme_icon, id="theme-icon-mobile")],
-                        style={
-                            "background": "transparent",
-                            "border": f"1px solid {cor_detalhes}",
-                            "borderRadius": "50%",
-                            "cursor": "pointer",
-                            "fontSize": "1.2rem",
-                            "height": "40px",
-                            "width": "40px",
-                            "display": "flex",
-                            "alignItems": "center",
-                            "justifyContent": "center",
-                            "transition": "all 0.3s ease",
-                        },
-                    ),
-                ],
-                fluid=True,
-                className="px-3 d-flex justify-content-between align-items-center",
-            ),
-            className="shadow-sm",
-            style={
-                "minHeight": "56px",
-                "position": "fixed",
-                "top": "0",
-                "left": "0",
-                "right": "0",
-                "zIndex": "1030",
-                "background": navbar_bg,
-                "borderBottom": f"3px solid {cor_detalhes}",
-            },
-        )
-    ]
-
     subtitle_text = (
         "Modelagem com Random Forest usando dados climáticos de 2015-2025 para previsões de produtividade."
         if is_mobile
         else "Modelagem computacional da produtividade da soja em função de variações mensais de temperatura e precipitação, entre janeiro de 2015 e fevereiro de 2025, no estado do Rio Grande do Sul. Utilizou-se o modelo Random Forest para a modelagem, com o intuito de quantificar e prever o impacto dessas variações climáticas sobre a produtividade da soja."
     )
 
-    subtitle_style = {"fontSize": subtitle_size, "color": subtitle_color}
-    footer_text_style = {"fontSize": footer_size, "color": subtitle_color}
-    footer_hr_style = {"border-color": cor_detalhes, "border-width": "2px"}
+    subtitle_style = {"fontSize": subtitle_size}
+    footer_text_style = {"fontSize": footer_size}
     title_container_style = {"fontSize": title_size, "color": cor_detalhes}
 
+    modelo = modelo_regiao(regiao)
     metric_card_1 = create_metric_card(
         "R²",
-        f"{model_data['r2']:.4f}".replace(".", ","),
+        f"{modelo['r2']:.4f}".replace(".", ","),
         "fa:line-chart",
         "#28a745",  # Cor verde exata
         "Coeficiente de determinação",
-        theme,
         is_mobile,
     )
     metric_card_2 = create_metric_card(
         "MAPE",
-        f"{model_data['mape']:.2f}%".replace(".", ","),
+        f"{modelo['mape']:.2f}%".replace(".", ","),
         "fa:percent",
         "#28a745",  # Cor verde exata
         "Erro percentual absoluto médio",
-        theme,
         is_mobile,
     )
 
-    card_header_style = {
-        "background": dark_theme_bg if theme == "dark" else light_theme_bg,
-        "border-bottom": f"3px solid {cor_detalhes}",
-        "padding": "0.75rem 1rem" if is_mobile else "1rem 1.25rem",
-    }
-
-    feature_importance_card = dbc.Card(
-        [
-            dbc.CardHeader(
-                [
-                    html.H5(
-                        "Gráfico de Barras: Análise das Variáveis do Modelo",
-                        className="mb-0 fw-bold",
-                        style={
-                            "color": cor_detalhes,
-                            "fontSize": "1rem" if is_mobile else "1.25rem",
-                        },
-                    )
-                ],
-                style=card_header_style,
-            ),
-            dbc.CardBody(
-                [
-                    dcc.Graph(
-                        id="feature-importance-graph",
-                        figure=create_feature_importance_graph(theme, is_mobile),
-                        config=get_responsive_config(),
-                    )
-                ],
-                style={
-                    "backgroundColor": card_color,
-                    "padding": "0.75rem" if is_mobile else "1rem",
-                },
-            ),
-        ],
-        className="shadow border-0 h-100",
-        style={"backgroundColor": card_color},
-    )
-
-    predictions_card = dbc.Card(
-        [
-            dbc.CardHeader(
-                [
-                    html.H5(
-                        "Gráfico de Dispersão: Análise de Predições",
-                        className="mb-0 fw-bold",
-                        style={
-                            "color": cor_detalhes,
-                            "fontSize": "1rem" if is_mobile else "1.25rem",
-                        },
-                    )
-                ],
-                style=card_header_style,
-            ),
-            dbc.CardBody(
-                [
-                    dcc.Graph(
-                        id="predictions-vs-actual-graph",
-                        figure=create_predictions_graph(theme, is_mobile),
-                        config=get_responsive_config(),
-                    )
-                ],
-                style={
-                    "backgroundColor": card_color,
-                    "padding": "0.75rem" if is_mobile else "1rem",
-                },
-            ),
-        ],
-        className="shadow border-0 h-100",
-        style={"backgroundColor": card_color},
-    )
-
-    year_filter_container_style = {
-        "background": card_color,
-        "padding": "15px",
-        "borderRadius": "8px",
-        "boxShadow": shadow,
-        "transition": "all 0.3s ease",
-    }
     year_filter_label_style = {
-        "color": text_color,
         "fontWeight": "bold",
         "marginBottom": "8px",
         "fontSize": "1rem" if is_mobile else "1.1rem",
@@ -1426,8 +1601,6 @@ def update_theme(theme, is_mobile):
     year_filter_select_style = {
         "border": f"2px solid {cor_detalhes}",
         "border-radius": "8px",
-        "backgroundColor": card_color,
-        "color": text_color,
         "fontWeight": "bold",
         "fontSize": "1rem" if is_mobile else "1.1rem",
         "transition": "all 0.3s ease",
@@ -1435,51 +1608,134 @@ def update_theme(theme, is_mobile):
 
     return (
         main_style,
-        mobile_navbar_children,
         subtitle_text,
         subtitle_style,
         footer_text_style,
-        footer_hr_style,
-        theme_icon,
-        theme_icon,
         metric_card_1,
         metric_card_2,
-        feature_importance_card,
-        predictions_card,
-        year_filter_container_style,
         year_filter_label_style,
         year_filter_select_style,
         title_container_style,
+        year_filter_label_style,
+        year_filter_select_style,
+        {"mobile": bool(is_mobile), "regiao": regiao},
     )
 
 
 @callback(
-    Output("data-table-card", "children"),
     [
-        Input("selected-year-store", "data"),
-        Input("theme-store", "data"),
-        Input("mobile-store", "data"),
+        Output("feature-importance-card", "children"),
+        Output("predictions-card", "children"),
     ],
+    Input("layout-pronto-store", "data"),
+)
+def update_graph_cards(layout):
+    # Gráficos acima da dobra: pedidos logo depois de métricas e estilos
+    if not layout:
+        raise PreventUpdate
+    return (
+        create_feature_importance_card(layout["mobile"], layout["regiao"]),
+        create_predictions_card(layout["mobile"], layout["regiao"]),
+    )
+
+
+@callback(
+    Output("pdp-card", "children"),
+    [Input("pdp-card-visivel", "data"), Input("layout-pronto-store", "data")],
+)
+def update_pdp_card(visivel, layout):
+    # Abaixo da dobra: só quando a seção entra na tela
+    if not visivel or not layout:
+        raise PreventUpdate
+    return create_pdp_card(layout["mobile"], layout["regiao"])
+
+
+@callback(
+    Output("shap-card", "children"),
+    [Input("shap-card-visivel", "data"), Input("layout-pronto-store", "data")],
+)
+def update_shap_card(visivel, layout):
+    if not visivel or not layout:
+        raise PreventUpdate
+    return create_shap_card(layout["mobile"], layout["regiao"])
+
+
+@callback(
+    Output("series-card", "children"),
+    [Input("series-card-visivel", "data"), Input("layout-pronto-store", "data")],
+)
+def update_series_card(visivel, layout):
+    if not visivel or not layout:
+        raise PreventUpdate
+    return create_series_card(layout["mobile"], layout["regiao"])
+
+
+@callback(
+    Output("series-graph", "figure"),
+    Input("series-graph", "relayoutData"),
+    [State("selected-region-store", "data"), State("mobile-store", "data")],
+    prevent_initial_call=True,
 )
-def update_table(selected_year, theme, is_mobile):
-    if theme == "dark":
-        card_color = "#1a1d24"
-        text_color = "#e0e0e0"
-        table_cell_bg = "#141920"
-        table_cell_color = "#e0e0e0"
-        table_row_even = "#1a1d24"
-        table_header_bg = cor_detalhes
+def update_series_zoom(relayout, regiao, is_mobile):
+    # Zoom ou volta à visão completa: só o trecho visível, decimado de novo. O Patch
+    # troca apenas x e y dos traços; eixos e zoom ficam como estão (uirevision).
+    intervalo = intervalo_visivel(relayout)
+    if intervalo is None:
+        raise PreventUpdate
+    if intervalo == (None, None):
+        # Visão completa: as mesmas séries da figura em cache
+        figura_completa = get_cached_figure(create_series_graph, is_mobile, regiao)
+        series = [(traco["x"], traco["y"]) for traco in figura_completa["data"]]
     else:
-        card_color = "#ffffff"
-        text_color = "#333333"
-        table_cell_bg = "#ffffff"
-        table_cell_color = "#333333"
-        table_row_even = "#f9f9f9"
-        table_header_bg = cor_detalhes
+        series = series_decimadas(regiao, PONTOS_POR_TELA[bool(is_mobile)], *intervalo)
+    figura = Patch()
+    for indice, (datas, valores) in enumerate(series):
+        figura["data"][indice]["x"] = datas
+        figura["data"][indice]["y"] = valores
+    figura["layout"]["title"]["text"] = titulo_series(
+        len(series[0][0]), len(dados_regiao(regiao)["datas"])
+    )
+    return figura
+
+
+@callback(
+    Output("shap-local-graph", "figure"),
+    Input("predictions-vs-actual-graph", "clickData"),
+    [State("selected-region-store", "data"), State("mobile-store", "data")],
+    prevent_initial_call=True,
+)
+def update_shap_local(click_data, regiao, is_mobile):
+    # Só os pontos de teste (traço 0); a linha de referência não tem decomposição
+    if not click_data or click_data["points"][0]["curveNumber"] != 0:
+        raise PreventUpdate
+    return create_shap_local_graph(
+        click_data["points"][0]["pointIndex"], is_mobile, regiao
+    )
 
-    filtered_data = df_historico[df_historico["Ano"] == int(selected_year)].copy()
 
-    if filtered_data.empty:
+@callback(
+    Output("data-table-card", "children"),
+    [
+        Input("selected-year-store", "data"),
+        Input("mobile-store", "data"),
+        Input("selected-region-store", "data"),
+        Input("data-table-card-visivel", "data"),
+    ],
+)
+def update_table(selected_year, is_mobile, regiao=REGIAO_PADRAO, visivel=True):
+    if not visivel:
+        raise PreventUpdate
+    # Cores do tema via variáveis CSS (assets/tema.css)
+    table_cell_bg = "var(--tabela-celula)"
+    table_cell_color = "var(--tabela-texto)"
+    table_row_even = "var(--tabela-linha-alternada)"
+    table_header_bg = cor_detalhes
+    month_column_bg = "var(--destaque-mes)"
+
+    if (
+        regiao not in regioes
+        or int(selected_year) not in dados_regiao(regiao)["tabela"]
+    ):
         return dbc.Card(
             [
                 dbc.CardBody(
@@ -1494,34 +1750,6 @@ def update_table(selected_year, theme, is_mobile):
             ]
         )
 
-    display_data = filtered_data.drop("Ano", axis=1).copy()
-
-    # Formatação brasileira para números
-    def format_brl(x, dec=0):
-        if pd.isnull(x):
-            return ""
-        if dec == 0:
-            return (
-                f"{int(round(x)):,}".replace(",", "X")
-                .replace(".", ",")
-                .replace("X", ".")
-            )
-        else:
-            return f"{x:,.{dec}f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-    display_data["Temperatura média (°C)"] = display_data[
-        "Temperatura média (°C)"
-    ].apply(lambda x: format_brl(x, 1))
-    display_data["Precipitação média (mm)"] = display_data[
-        "Precipitação média (mm)"
-    ].apply(lambda x: format_brl(x, 1))
-    display_data["Área plantada (ha)"] = display_data["Área plantada (ha)"].apply(
-        lambda x: format_brl(x, 0)
-    )
-    display_data["Rendimento médio da produção (kg/ha)"] = display_data[
-        "Rendimento médio da produção (kg/ha)"
-    ].apply(lambda x: format_brl(x, 0))
-
     cell_padding = "8px" if is_mobile else "15px"
     font_size = "12px" if is_mobile else "14px"
     header_font_size = "13px" if is_mobile else "15px"
@@ -1573,8 +1801,8 @@ def update_table(selected_year, theme, is_mobile):
                         },
                     )
                 ],
+                className="tema-card-header",
                 style={
-                    "background": dark_theme_bg if theme == "dark" else light_theme_bg,
                     "border-bottom": f"3px solid {cor_detalhes}",
                     "padding": "0.75rem 1rem" if is_mobile else "1rem 1.25rem",
                 },
@@ -1583,8 +1811,9 @@ def update_table(selected_year, theme, is_mobile):
                 [
                     html.Div(
                         [
+                            # Os dados de cada página vêm de update_table_page
                             dash_table.DataTable(
-                                data=display_data.to_dict("records"),
+                                id="historical-table",
                                 columns=columns,
                                 style_table={"overflowX": "auto", "minWidth": "100%"},
                                 style_cell={
@@ -1637,46 +1866,39 @@ def update_table(selected_year, theme, is_mobile):
                                     {
                                         "if": {"column_id": "Mês"},
                                         "fontWeight": "bold",
-                                        "backgroundColor": (
-                                            f"rgba(40, 167, 69, 0.05)"
-                                            if theme == "light"
-                                            else f"rgba(40, 167, 69, 0.15)"
-                                        ),
+                                        "backgroundColor": month_column_bg,
                                         "minWidth": "70px" if is_mobile else "100px",
                                     },
                                     # DESABILITAR HOVER PARA COLUNA MÊS:
                                     {
                                         "if": {"column_id": "Mês", "state": "hover"},
-                                        "backgroundColor": (
-                                            f"rgba(40, 167, 69, 0.05)"
-                                            if theme == "light"
-                                            else f"rgba(40, 167, 69, 0.15)"
-                                        ),
+                                        "backgroundColor": month_column_bg,
                                         "fontWeight": "bold",
                                     },
                                     # DESABILITAR SELEÇÃO PARA COLUNA MÊS:
                                     {
                                         "if": {"column_id": "Mês", "state": "selected"},
-                                        "backgroundColor": (
-                                            f"rgba(40, 167, 69, 0.05)"
-                                            if theme == "light"
-                                            else f"rgba(40, 167, 69, 0.15)"
-                                        ),
+                                        "backgroundColor": month_column_bg,
                                         "fontWeight": "bold",
                                     },
                                     # DESABILITAR ATIVO PARA COLUNA MÊS:
                                     {
                                         "if": {"column_id": "Mês", "state": "active"},
-                                        "backgroundColor": (
-                                            f"rgba(40, 167, 69, 0.05)"
-                                            if theme == "light"
-                                            else f"rgba(40, 167, 69, 0.15)"
-                                        ),
+                                        "backgroundColor": month_column_bg,
                                         "fontWeight": "bold",
                                     },
                                 ],
-                                page_size=12,
-                                sort_action="native",
+                                page_current=0,
+                                page_size=TAMANHO_PAGINA_TABELA,
+                                page_action="custom",
+                                sort_action="custom",
+                                sort_mode="single",
+                                sort_by=[],
+                                filter_action="custom",
+                                filter_query="",
+                                # A linha de filtro envia icontains, i= ...: texto sem
+                                # diferenciar maiúsculas ("jan" encontra "Janeiro")
+                                filter_options={"case": "insensitive"},
                             )
                         ],
                         style={"overflowX": "auto"},
@@ -1716,10 +1938,7 @@ def update_table(selected_year, theme, is_mobile):
                                     html.Br(),
                                     html.Small(
                                         "NASA Prediction Of Worldwide Energy Resources (POWER)",
-                                        style={
-                                            "color": text_color,
-                                            "fontStyle": "italic",
-                                        },
+                                        style={"fontStyle": "italic"},
                                     ),
                                     html.Br(),
                                     html.Br(),
@@ -1737,23 +1956,15 @@ def update_table(selected_year, theme, is_mobile):
                                     html.Br(),
                                     html.Small(
                                         "IBGE - Levantamento Sistemático da Produção Agrícola",
-                                        style={
-                                            "color": text_color,
-                                            "fontStyle": "italic",
-                                        },
+                                        style={"fontStyle": "italic"},
                                     ),
                                 ],
+                                className="tema-fontes",
                                 style={
                                     "fontSize": "0.9rem" if is_mobile else "1rem",
-                                    "color": text_color,
                                     "display": "block",
                                     "lineHeight": "1.4",
                                     "padding": "10px",
-                                    "backgroundColor": (
-                                        "rgba(40, 167, 69, 0.05)"
-                                        if theme == "light"
-                                        else "rgba(40, 167, 69, 0.1)"
-                                    ),
                                     "borderRadius": "8px",
                                     "border": f"1px solid {cor_detalhes}",
                                 },
@@ -1761,17 +1972,330 @@ def update_table(selected_year, theme, is_mobile):
                         ]
                     ),
                 ],
+                className="tema-card",
+                style={"padding": "0.75rem" if is_mobile else "1rem"},
+            ),
+        ],
+        className="shadow border-0 tema-card",
+    )
+
+
+@callback(
+    [Output("historical-table", "data"), Output("historical-table", "page_count")],
+    [
+        Input("historical-table", "page_current"),
+        Input("historical-table", "page_size"),
+        Input("historical-table", "sort_by"),
+        Input("historical-table", "filter_query"),
+    ],
+    [State("selected-year-store", "data"), State("selected-region-store", "data")],
+)
+def update_table_page(
+    page_current, page_size, sort_by, filter_query, selected_year, regiao=REGIAO_PADRAO
+):
+    if regiao not in regioes:
+        raise PreventUpdate
+    # Só a página visível é enviada ao navegador
+    return dados_regiao(regiao)["tabela"].pagina(
+        int(selected_year),
+        page_current or 0,
+        page_size or TAMANHO_PAGINA_TABELA,
+        sort_by,
+        filter_query,
+    )
+
+
+@callback(
+    Output("simulator-card", "children"),
+    [
+        Input("selected-region-store", "data"),
+        Input("mobile-store", "data"),
+        Input("simulator-card-visivel", "data"),
+    ],
+)
+def update_simulator_panel(regiao, is_mobile, visivel=True):
+    if not visivel or regiao not in regioes:
+        raise PreventUpdate
+    # Faixas dos sliders = valores observados na região; começa no último mês da série
+    X = dados_regiao(regiao)["X"]
+    ultimo = X[-1]
+    colunas = {nome: FEATURES.index(nome) for nome in PASSOS_SIMULADOR}
+
+    def slider(id_slider, rotulo, nome, formato):
+        coluna = X[:, colunas[nome]]
+        passo = PASSOS_SIMULADOR[nome]
+        minimo = quantizar(np.floor(coluna.min() / passo) * passo, passo)
+        maximo = quantizar(np.ceil(coluna.max() / passo) * passo, passo)
+        return html.Div(
+            [
+                dbc.Label(rotulo, html_for=id_slider, className="fw-bold tema-texto"),
+                dcc.Slider(
+                    id=id_slider,
+                    min=minimo,
+                    max=maximo,
+                    step=passo,
+                    value=quantizar(ultimo[colunas[nome]], passo),
+                    marks={
+                        minimo: formato(minimo),
+                        maximo: formato(maximo),
+                    },
+                    # Só dispara o callback ao soltar o slider (sem previsões a cada pixel)
+                    updatemode="mouseup",
+                    tooltip={"placement": "bottom"},
+                ),
+            ],
+            className="mb-3",
+        )
+
+    mes_atual = (
+        meses_nome.index(dados_regiao(regiao)["df_historico"]["Mês"].iloc[-1]) + 1
+    )
+    controles = [
+        slider(
+            "sim-temp",
+            "Temperatura média - 6 meses (°C)",
+            "temp_movel",
+            lambda v: f"{v:.1f}".replace(".", ","),
+        ),
+        slider(
+            "sim-precip",
+            "Precipitação média - 6 meses (mm)",
+            "precip_movel",
+            lambda v: f"{v:.0f}",
+        ),
+        slider(
+            "sim-area",
+            "Área plantada (ha)",
+            "area_plantada",
+            lambda v: f"{v / 1e6:.2f} mi".replace(".", ","),
+        ),
+        html.Div(
+            [
+                dbc.Label("Mês", html_for="sim-mes", className="fw-bold tema-texto"),
+                dbc.Select(
+                    id="sim-mes",
+                    options=[
+                        {"label": nome, "value": numero}
+                        for numero, nome in enumerate(meses_nome, start=1)
+                    ],
+                    value=mes_atual,
+                    className="fw-bold",
+                    style={"border": f"2px solid {cor_detalhes}"},
+                ),
+            ]
+        ),
+    ]
+
+    return dbc.Card(
+        [
+            dbc.CardHeader(
+                [
+                    html.H5(
+                        "Simulador de Cenários: E se o clima mudar?",
+                        className="mb-0 fw-bold",
+                        style={
+                            "color": cor_detalhes,
+                            "fontSize": "1rem" if is_mobile else "1.25rem",
+                        },
+                    )
+                ],
+                className="tema-card-header",
                 style={
-                    "backgroundColor": card_color,
-                    "padding": "0.75rem" if is_mobile else "1rem",
+                    "border-bottom": f"3px solid {cor_detalhes}",
+                    "padding": "0.75rem 1rem" if is_mobile else "1rem 1.25rem",
                 },
             ),
+            dbc.CardBody(
+                dbc.Row(
+                    [
+                        dbc.Col(controles, xs=12, lg=5, className="mb-3 mb-lg-0"),
+                        dbc.Col(
+                            [
+                                html.Div(id="sim-resultado", className="text-center"),
+                                dcc.Graph(
+                                    id="sim-grafico",
+                                    config=get_responsive_config(),
+                                ),
+                            ],
+                            xs=12,
+                            lg=7,
+                        ),
+                    ]
+                ),
+                className="tema-card",
+                style={"padding": "0.75rem" if is_mobile else "1rem"},
+            ),
         ],
-        className="shadow border-0",
-        style={"backgroundColor": card_color},
+        className="shadow border-0 tema-card",
+    )
+
+
+@callback(
+    [Output("sim-resultado", "children"), Output("sim-grafico", "figure")],
+    [
+        Input("sim-temp", "value"),
+        Input("sim-precip", "value"),
+        Input("sim-area", "value"),
+        Input("sim-mes", "value"),
+        Input("selected-year-store", "data"),
+    ],
+    [State("selected-region-store", "data"), State("mobile-store", "data")],
+)
+def update_simulation(temp, precip, area, mes, selected_year, regiao, is_mobile):
+    if regiao not in regioes or None in (temp, precip, area, mes):
+        raise PreventUpdate
+    mes = int(mes)
+    # Mesma conversão do modelagem.py: rendimento relativo × média anual (kg/ha)
+    medias = dados_regiao(regiao)["media_por_ano"]
+    ano = int(selected_year) if int(selected_year) in medias else max(medias)
+    media_anual = medias[ano]
+    rendimento = simular_cenario(regiao, temp, precip, area) * media_anual
+
+    resultado = [
+        html.H2(
+            f"{rendimento[mes - 1]:,.0f} kg/ha".replace(",", "."),
+            className="fw-bold mb-1",
+            style={"color": cor_detalhes},
+        ),
+        html.Small(
+            f"Rendimento previsto em {meses_nome[mes - 1].lower()} "
+            f"(média anual de referência: {ano})",
+            className="tema-texto-secundario",
+        ),
+    ]
+
+    figura = go.Figure(
+        go.Scatter(
+            x=meses_nome,
+            y=rendimento,
+            mode="lines+markers",
+            line=dict(color=cor_detalhes, width=2),
+            marker=dict(
+                size=[14 if numero == mes else 7 for numero in range(1, 13)],
+                color=[
+                    "#ff0000" if numero == mes else cor_detalhes
+                    for numero in range(1, 13)
+                ],
+                line=dict(width=1, color="black"),
+            ),
+            hovertemplate="<b>%{x}</b><br>%{y:,.0f} kg/ha<extra></extra>",
+        )
+    )
+    figura.update_layout(
+        height=260 if is_mobile else 300,
+        margin=dict(l=50, r=20, t=20, b=40),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#2d5016", size=10 if is_mobile else 12),
+        yaxis_title="Rendimento (kg/ha)",
+        separators=",.",
+        showlegend=False,
+    )
+    return resultado, figura
+
+
+# --- API DE PREVISÃO ---
+def montar_matriz_features(linhas, features_modelo):
+    """Converte linhas (dicts ou listas na ordem do modelo) em uma matriz float64
+
+    Rejeita (ValueError) linhas sem todas as features e valores ausentes ou não
+    finitos: a floresta aceitaria NaN e devolveria uma previsão sem sentido.
+    """
+    if not isinstance(linhas, list):
+        raise ValueError("'linhas' deve ser uma lista de linhas (dicts ou listas).")
+    if any(isinstance(linha, dict) for linha in linhas):
+        for numero, linha in enumerate(linhas):
+            if not isinstance(linha, dict):
+                raise ValueError(
+                    f"Linha {numero}: todas as linhas devem ser dicts ou todas listas."
+                )
+            faltando = [f for f in features_modelo if f not in linha]
+            if faltando:
+                raise ValueError(
+                    f"Linha {numero}: features ausentes: {', '.join(faltando)}"
+                )
+        linhas = [[linha[f] for f in features_modelo] for linha in linhas]
+    matriz = np.asarray(linhas, dtype=np.float64)
+    if matriz.ndim != 2 or matriz.shape[1] != len(features_modelo):
+        raise ValueError(
+            f"Cada linha deve ter {len(features_modelo)} valores: {', '.join(features_modelo)}"
+        )
+    invalidas = np.flatnonzero(~np.isfinite(matriz).all(axis=1))
+    if len(invalidas):
+        raise ValueError(
+            "Valores ausentes ou não finitos nas linhas: "
+            + ", ".join(map(str, invalidas[:10].tolist()))
+            + ("..." if len(invalidas) > 10 else "")
+        )
+    return matriz
+
+
+@app.server.route("/predict", methods=["POST"])
+def predict():
+    payload = request.get_json(silent=True)
+    if isinstance(payload, list):
+        payload = {"linhas": payload}
+    if not isinstance(payload, dict) or not payload.get("linhas"):
+        return jsonify({"erro": "Envie um JSON com a lista 'linhas'."}), 400
+
+    regiao = str(payload.get("regiao", REGIAO_PADRAO))
+    if regiao not in regioes:
+        return jsonify({"erro": f"Região desconhecida: {regiao}"}), 400
+    modelo = modelo_regiao(regiao)
+    features_modelo = modelo["features"]
+
+    try:
+        matriz = montar_matriz_features(payload["linhas"], features_modelo)
+        media_anual = payload.get("media_anual")
+        if media_anual is not None:
+            media_anual = np.broadcast_to(
+                np.asarray(media_anual, dtype=np.float64), (matriz.shape[0],)
+            )
+            if not np.isfinite(media_anual).all():
+                raise ValueError("'media_anual' deve ser um número finito.")
+    except (KeyError, TypeError, ValueError) as erro:
+        return jsonify({"erro": str(erro)}), 400
+
+    # Uma única chamada vetorizada para o lote inteiro: motor compilado nos lotes
+    # pequenos, pipeline do sklearn nos grandes. A floresta compilada do .pkl dá os
+    # mesmos valores do pipeline; a do artefato compacto difere na precisão float32
+    # das folhas (diferenças da ordem de 1e-8 no rendimento relativo)
+    pipeline = pipeline_regiao(regiao) if len(matriz) > LOTE_MAXIMO_MOTOR else None
+    if pipeline is None:
+        y_pred_rel = modelo["floresta"].prever(matriz)
+    else:
+        y_pred_rel = pipeline.predict(pd.DataFrame(matriz, columns=features_modelo))
+
+    resposta = {"features": features_modelo, "rendimento_relativo": y_pred_rel.tolist()}
+    if payload.get("intervalos"):
+        # P10/P50/P90 das árvores; a média acima não muda
+        _, quantis_rel = modelo["floresta"].prever_intervalo(matriz)
+        resposta["intervalo_relativo"] = dict(
+            zip(("p10", "p50", "p90"), quantis_rel.tolist())
+        )
+        if media_anual is not None:
+            resposta["intervalo"] = dict(
+                zip(("p10", "p50", "p90"), (quantis_rel * media_anual).tolist())
+            )
+    if media_anual is not None:
+        # Conversão para kg/ha igual ao modelagem.py (rendimento relativo × média anual)
+        resposta["rendimento"] = (y_pred_rel * media_anual).tolist()
+    return jsonify(resposta)
+
+
+@app.server.route("/modelos/estatisticas")
+def model_registry_stats():
+    # Acertos, falhas e descartes do registro de modelos deste processo (e dos
+    # pipelines carregados para lotes grandes)
+    return jsonify(
+        {
+            **registro_modelos.estatisticas(),
+            "pipelines": registro_pipelines.estatisticas(),
+        }
     )
 
 
 if __name__ == "__main__":
+    # Servidor de desenvolvimento (um processo); em produção: gunicorn -c gunicorn.conf.py wsgi:application
     port = int(os.environ.get("PORT", 8050))
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -1,106 +1,209 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, KFold
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import r2_score, mean_absolute_percentage_error
-from scipy.stats import zscore
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV
 import seaborn as sns
 import joblib
 
-# Criando um DataFrame com dados mensais de temperatura, precipitação, área plantada e rendimento (2015-2025)
-data = {
-    'mes': list(range(1, 123)), # Índice do mês (de 1 a 122)
-    # Temperatura média (°C):
-    'temp_media': [23.63, 23.43, 22.27, 19.20, 16.26, 13.59, 13.39, 17.44, 15.73, 17.59, 19.47, 22.60, 23.92, 24.52, 20.63, 20.40, 13.27, 10.24, 12.57, 14.34, 14.40, 17.89, 19.55, 22.81, 23.84, 24.25, 21.36, 18.24, 16.66, 13.93, 14.02, 15.29, 18.52, 18.30, 19.04, 23.33, 23.98, 23.15, 22.10, 21.85, 16.56, 11.76, 12.73, 12.21, 17.56, 18.31, 21.19, 22.74, 24.82, 23.02, 21.35, 20.20, 17.12, 16.19, 11.97, 13.04, 15.52, 19.54, 21.40, 23.07, 24.40, 23.89, 24.30, 18.94, 15.11, 14.35, 11.63, 14.36, 16.23, 18.69, 21.00, 23.50, 24.50, 23.06, 22.63, 19.70, 14.08, 12.55, 11.80, 15.15, 17.14, 18.11, 21.49, 24.06, 27.08, 25.11, 21.53, 18.30, 13.61, 11.29, 15.20, 12.96, 14.29, 17.30, 19.83, 23.91, 26.26, 24.76, 24.79, 19.27, 16.66, 14.56, 13.73, 15.13, 17.62, 18.05, 20.75, 23.28, 23.59, 25.32, 23.37, 20.71, 14.91, 15.52, 11.85, 13.99, 17.41, 19.29, 21.83, 21.47, 24.97, 26.88],
-    # Precipitação média (mm):
-    'precip_media': [201.91, 90.50, 62.05, 75.15, 126.29, 110.86, 158.67, 82.94, 136.49, 267.48, 156.21, 305.49, 101.91, 114.10, 201.94, 215.71, 79.38, 30.80, 118.08, 119.46, 61.66, 233.78, 127.50, 153.64, 163.43, 150.90, 166.79, 183.33, 284.47, 106.05, 26.83, 166.39, 139.54, 207.34, 102.86, 88.56, 146.15, 69.67,	140.22, 79.41, 95.58, 106.66, 131.27, 130.67, 175.34, 138.34, 152.75, 116.76, 225.22, 92.60, 101.23, 142.88, 194.92, 54.89, 116.54, 80.51, 71.02, 269.97, 130.29, 51.87, 122.75, 62.85,	30.97, 43.30, 143.60, 177.14, 144.13, 65.02, 125.90, 69.37, 59.36, 98.97, 166.06, 91.24, 102.07, 40.71, 126.48, 143.66, 44.12, 73.58, 188.76, 95.42, 67.85, 41.92, 91.87, 92.82, 151.34, 193.13, 160.87, 138.41, 140.68, 106.70, 68.54, 109.66, 48.62, 68.14, 57.89, 79.51, 93.33, 34.16, 133.03, 102.83, 135.74, 69.50, 322.29, 230.83, 260.05, 141.12, 110.53, 83.44, 122.13, 239.37, 293.33, 153.65, 50.20, 94.24, 139.63, 122.33, 85.14, 97.31, 57.37, 109.49],
-    # Área plantada (ha):
-    'area_plantada': [5200279, 5219684, 5230879, 5230879, 5241776, 5241776, 5263899, 5263899, 5263899, 5263899, 5263899, 5263899, 5471680, 5475537, 5472388, 5472388, 5477005, 5477005, 5474084, 5474084, 5474084, 5474084, 5474084, 5464084, 5463281, 5499742, 5496062, 5496062, 5528233, 5528233, 5541860, 5541860, 5541860, 5541860, 5541860, 5541860, 5674433, 5674433, 5674433, 5679427, 5679427, 5679427, 5679427, 5758133, 5758133, 5709034, 5709034, 5709034, 5805001, 5806922, 5828790, 5828790, 5848766, 5848766, 5843714, 5843714, 5843513, 5843533, 5843533, 5843533, 5930249, 5930249, 5976049, 5976049, 5980832, 5980832, 5981671, 5981671, 5981671, 5980671, 5980671, 5980671, 6075058, 6087229, 6091873, 6091873, 6095677, 6095677, 6107270, 6107270, 6107270, 6107320, 6107320, 6107620, 6362434, 6362588, 6381617, 6381617, 6387985, 6387985, 6387670, 6387670, 6387670, 6387670, 6387670, 6387670, 6628647, 6638744, 6637125, 6637125, 6658472, 6658472, 6651731, 6651731, 6641731, 6640385, 6640385, 6642290, 6716122, 6692798, 6700006, 6700006, 6707273, 6707273, 6708247, 6708247, 6707247, 6707747, 6707747, 6707747, 6817844, 6786139],
-    # Rendimento médio da produção (kg/ha):
-    'rendimento': [2817, 2850, 2890, 2890, 2976, 2976, 2983, 2983, 2983, 2983, 2983, 2983, 2967, 2942, 2921, 2921, 2985, 2985, 2972, 2972, 2972, 2972, 2972, 2981, 2998, 3031, 3141, 3141, 3361, 3361, 3385, 3385, 3385, 3385, 3385, 3385, 3140, 3140, 3140, 3093, 3093, 3093, 3093, 3104, 3103, 3104, 3104, 3104, 3206, 3209, 3233, 3233, 3194, 3194, 3177, 3177, 3178, 3178, 3178, 3178, 3249, 3249, 2280, 2280, 1883, 1883, 1883, 1883, 1882, 1894, 1894, 1895, 3197, 3206, 3226, 3226, 3324, 3324, 3341, 3341, 3344, 3344, 3344, 3344, 3312, 2069, 1512, 1512, 1472, 1472, 1500, 1500, 1503, 1503, 1503, 1503, 3207, 2758, 2227, 2227, 1949, 1949, 1912, 1912, 1912, 1912, 1912, 1912, 3193, 3247, 3244, 3244, 3045, 3045, 2809, 2809, 2811, 2809, 2809, 2809, 3245, 2792]
+from dataset import REGIAO_PADRAO, caminho_regiao, carregar_dataset, listar_regioes
+from artefato import salvar_artefato
+from instrumentacao import Instrumentacao
+from engenharia_features import FEATURES, ano_do_mes, gerar_features
+from explicacao import shap_floresta
+from modelos import caminho_artefato, caminho_modelo
+from motor_inferencia import FlorestaCompilada
+
+# Hiperparâmetros do modelo final (os mesmos listados no README)
+PARAMETROS_RF = {
+    'n_estimators': 800,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 3,
+    'max_features': 0.5,
+    'random_state': 42
+}
+
+# Grade da busca de hiperparâmetros; o número de árvores é o recurso do successive halving
+GRADE_BUSCA = {
+    'rf__max_depth': [None, 6, 8, 10, 14],
+    'rf__min_samples_split': [2, 5, 10],
+    'rf__min_samples_leaf': [1, 3, 5],
+    'rf__max_features': [0.3, 0.5, 0.7, 1.0]
 }
-df = pd.DataFrame(data)
-
-# Criando a coluna de ano com base no mês
-df['ano'] = 2015 + (df['mes'] - 1) // 12
-
-# Calculando a média anual do rendimento
-df['media_anual'] = df.groupby('ano')['rendimento'].transform('mean')
-
-# Criando a variável de rendimento relativo (rendimento dividido pela média anual)
-df['rendimento_relativo'] = df['rendimento'] / df['media_anual']
-
-# Criando variáveis defasadas (lag) para capturar tendências temporais
-df['lag_rendimento'] = df['rendimento'].shift(1)
-df['lag_rendimento_rel'] = df['lag_rendimento'] / df['media_anual']
-
-# Aplicando o Z-score para remover outliers
-cols_zscore = ['rendimento_relativo', 'lag_rendimento_rel']
-df_z = df[cols_zscore].dropna()
-z = np.abs(zscore(df_z))
-df_clean = df.loc[df_z.index][(z < 3).all(axis=1)].copy()
-
-# Feature Engineering: Suavização Temporal (Médias Móveis)
-# Criando médias móveis para temperatura e precipitação (janela de 6 meses)
-df_clean['temp_movel'] = df_clean['temp_media'].rolling(window=6).mean().fillna(df_clean['temp_media'])
-df_clean['precip_movel'] = df_clean['precip_media'].rolling(window=6).mean().fillna(df_clean['precip_media'])
-
-# Feature Engineering: Criação de Features Interativas
-# Criando uma variável de interação entre temperatura e precipitação
-df_clean['clima_interacao'] = df_clean['temp_movel'] * df_clean['precip_movel']
-
-# Feature Engineering: Codificação Cíclica (Sazonalidade)
-# Criando variáveis sazonais usando seno e cosseno para representar o ciclo anual
-df_clean['mes_sin'] = np.sin(2 * np.pi * df_clean['mes'] / 12)
-df_clean['mes_cos'] = np.cos(2 * np.pi * df_clean['mes'] / 12)
-
-# Definição das variáveis independentes (X) e dependente (y)
-X = df_clean[['mes_cos', 'mes_sin', 'temp_movel', 'precip_movel', 'clima_interacao', 'area_plantada']].dropna()
-y = df_clean.loc[X.index, 'rendimento_relativo']
-media_ano = df_clean.loc[X.index, 'media_anual']
-
-# Divisão dos dados em treino e teste (80% treino, 20% teste)
-X_train, X_test, y_train, y_test, media_train, media_test = train_test_split(
-    X, y, media_ano, test_size=0.2, random_state=42
-)
-
-np.save('indices_teste.npy', X_test.index)  
-media_test.to_csv('media_test.csv')
-
-# Criando um pipeline com normalização dos dados e Random Forest Regressor
-pipeline = Pipeline([
-    ('scaler', StandardScaler()), # Normalização dos dados
-    ('rf', RandomForestRegressor( # Modelo de aprendizado de máquina
-        n_estimators=800,
-        max_depth=10,
-        min_samples_split=5,
-        min_samples_leaf=3,
-        max_features=0.5,
+ARVORES_MINIMAS = 30
+ARVORES_MAXIMAS = 800
+ARQUIVO_RANKING = 'busca_hiperparametros.csv'
+
+# Dependência parcial: variáveis com curva 1-D, par com superfície 2-D e resolução das grades
+VARIAVEIS_PDP = ['temp_movel', 'precip_movel', 'area_plantada']
+PAR_PDP = ('temp_movel', 'precip_movel')
+RESOLUCAO_PDP = 30
+RESOLUCAO_PDP_2D = 20
+
+# Regiões com menos linhas (após o filtro de Z-score) não são treinadas
+LINHAS_MINIMAS = 24
+ARQUIVO_METRICAS_REGIOES = 'metricas_regioes.csv'
+
+# Validação walk-forward: anos completos de histórico antes do primeiro ano de teste
+ANOS_TREINO_MINIMOS = 3
+ARQUIVO_WALK_FORWARD = 'validacao_walk_forward.csv'
+
+# Tempo, CPU e memória de cada etapa do treino; perfil opcional do ajuste da floresta
+ARQUIVO_INSTRUMENTACAO = 'instrumentacao_treino.json'
+ARQUIVO_PERFIL_FIT = 'perfil_fit.prof'
+
+
+def nome_arquivo(nome, regiao=REGIAO_PADRAO):
+    # Arquivos da série estadual mantêm o nome original; os das demais regiões levam o código
+    if str(regiao) == REGIAO_PADRAO:
+        return nome
+    base, extensao = os.path.splitext(nome)
+    return f'{base}_{regiao}{extensao}'
+
+
+def carregar_dados(regiao=REGIAO_PADRAO):
+    # Carregando os dados mensais de temperatura, precipitação, área plantada e rendimento (2015-2025)
+    # a partir da partição da região no dataset colunar em dados/ (o mesmo lido pelo dashboard)
+    return pd.DataFrame(carregar_dataset(caminho_regiao(regiao)))
+
+
+def preparar_features(df):
+    # Feature Engineering compartilhada com o dashboard (engenharia_features.py):
+    # média anual, rendimento relativo, defasagem, filtro de Z-score (|z| < 3),
+    # médias móveis de 6 meses, interação clima e codificação cíclica do mês
+    features = gerar_features(
+        df['mes'], df['temp_media'], df['precip_media'], df['area_plantada'], df['rendimento']
+    )
+
+    # Definição das variáveis independentes (X) e dependente (y)
+    X = pd.DataFrame(features['X'], index=df.index[features['indice']], columns=FEATURES)
+    y = pd.Series(features['rendimento_relativo'], index=X.index, name='rendimento_relativo')
+    media_ano = pd.Series(features['media_anual'], index=X.index, name='media_anual')
+    return X, y, media_ano
+
+
+def dividir_dados(X, y, media_ano):
+    # Divisão dos dados em treino e teste (80% treino, 20% teste); as linhas de teste
+    # e suas previsões vão para o artefato do modelo (salvar_modelo)
+    return train_test_split(X, y, media_ano, test_size=0.2, random_state=42)
+
+
+def criar_pipeline(**parametros):
+    # Criando um pipeline com normalização dos dados e Random Forest Regressor
+    return Pipeline([
+        ('scaler', StandardScaler()), # Normalização dos dados
+        ('rf', RandomForestRegressor(**{**PARAMETROS_RF, **parametros})) # Modelo de aprendizado de máquina
+    ])
+
+
+def buscar_hiperparametros(X_train, y_train, n_jobs=-1, regiao=REGIAO_PADRAO):
+    # Successive halving: todos os candidatos começam com poucas árvores e só os
+    # melhores de cada rodada seguem para a próxima, com 3x mais árvores.
+    # Os ajustes de cada rodada são distribuídos entre todos os núcleos (processos)
+    busca = HalvingGridSearchCV(
+        criar_pipeline(),
+        GRADE_BUSCA,
+        resource='rf__n_estimators',
+        min_resources=ARVORES_MINIMAS,
+        max_resources=ARVORES_MAXIMAS,
+        factor=3,
+        aggressive_elimination=True,
+        cv=KFold(n_splits=5, shuffle=True, random_state=42),
+        scoring='r2',
+        n_jobs=n_jobs,
         random_state=42
-    ))
-])
+    )
+    busca.fit(X_train, y_train)
+
+    # Ranking com parâmetros, score de validação cruzada e tempo de ajuste de cada rodada
+    resultados = pd.DataFrame(busca.cv_results_)
+    ranking = pd.concat([
+        pd.json_normalize(resultados['params']).rename(columns=lambda c: c.replace('rf__', '')),
+        resultados[['iter', 'n_resources', 'mean_test_score', 'std_test_score', 'mean_fit_time']]
+    ], axis=1).sort_values(['iter', 'mean_test_score'], ascending=[False, False])
+    # Um ranking por região: com treinar_regioes as buscas rodam em paralelo
+    caminho = nome_arquivo(ARQUIVO_RANKING, regiao)
+    ranking.to_csv(caminho, index=False)
+
+    # O recurso da busca não entra no modelo final, que usa sempre todas as árvores
+    melhores = {k.replace('rf__', ''): v for k, v in busca.best_params_.items() if k != 'rf__n_estimators'}
+    print(f"Melhores parâmetros: {melhores} (R² CV: {busca.best_score_:.4f})")
+    print(f"Ranking salvo em {caminho}")
+    return melhores
+
+
+def metricas(y_test_real, y_pred_real):
+    # R² e MAPE (%) na escala original (kg/ha)
+    return (r2_score(y_test_real, y_pred_real),
+            mean_absolute_percentage_error(y_test_real, y_pred_real) * 100)
+
+
+def avaliar(pipeline, X_test, y_test, media_test):
+    # Previsões relativas → conversão para escala original
+    y_pred_rel = pipeline.predict(X_test)
+    y_pred_real = y_pred_rel * media_test
+    y_test_real = y_test * media_test
+
+    # Avaliação do modelo
+    r2_final, mape_final = metricas(y_test_real, y_pred_real)
 
-# Treinamento do modelo
-pipeline.fit(X_train, y_train)
+    # Exibição dos resultados
+    print(f"R²: {r2_final:.4f}")
+    print(f"MAPE: {mape_final:.4f}%")
+    return y_test_real, y_pred_real
 
-# Previsões relativas → conversão para escala original
-y_pred_rel = pipeline.predict(X_test)
-y_pred_real = y_pred_rel * media_test
-y_test_real = y_test * media_test
 
-# Avaliação do modelo
-r2_final = r2_score(y_test_real, y_pred_real)
-mape_final = mean_absolute_percentage_error(y_test_real, y_pred_real) * 100
+def calcular_dependencia_parcial(pipeline, X, media_referencia):
+    # Dependência parcial: média das previsões sobre as linhas de X com a(s) variável(is)
+    # fixada(s) em cada ponto da grade (percentis 5-95). clima_interacao é derivada de
+    # temperatura e precipitação, então é recalculada em cada ponto.
+    base = X[FEATURES].to_numpy(dtype=np.float64)
+    indice = {nome: FEATURES.index(nome) for nome in FEATURES}
+    grades = {nome: np.linspace(*np.percentile(X[nome], [5, 95]), RESOLUCAO_PDP) for nome in VARIAVEIS_PDP}
+    grade_a, grade_b = (np.linspace(*np.percentile(X[nome], [5, 95]), RESOLUCAO_PDP_2D) for nome in PAR_PDP)
+    malha_a, malha_b = np.meshgrid(grade_a, grade_b, indexing='ij')
+
+    # Cada bloco: {variável: valores nos pontos da grade}
+    blocos = [{nome: grades[nome]} for nome in VARIAVEIS_PDP]
+    blocos.append({PAR_PDP[0]: malha_a.ravel(), PAR_PDP[1]: malha_b.ravel()})
+    lotes = []
+    for bloco in blocos:
+        n_pontos = len(next(iter(bloco.values())))
+        lote = np.repeat(base[np.newaxis], n_pontos, axis=0)
+        for nome, valores in bloco.items():
+            lote[:, :, indice[nome]] = valores[:, np.newaxis]
+        lote[:, :, indice['clima_interacao']] = lote[:, :, indice['temp_movel']] * lote[:, :, indice['precip_movel']]
+        lotes.append(lote.reshape(-1, len(FEATURES)))
+
+    # Todas as grades avaliadas em uma única chamada vetorizada ao modelo
+    previsto = pipeline.predict(pd.DataFrame(np.concatenate(lotes), columns=FEATURES))
+    medias = np.split(previsto, np.cumsum([len(lote) for lote in lotes])[:-1])
+    medias = [m.reshape(-1, len(base)).mean(axis=1) for m in medias]
+
+    # Rendimento relativo × média anual de referência → kg/ha; float32 basta para exibir
+    resultado = {'media_referencia': np.float64(media_referencia)}
+    for nome, media in zip(VARIAVEIS_PDP, medias):
+        resultado[f'grade_{nome}'] = grades[nome].astype(np.float32)
+        resultado[f'pdp_{nome}'] = (media * media_referencia).astype(np.float32)
+    resultado[f'grade2d_{PAR_PDP[0]}'] = grade_a.astype(np.float32)
+    resultado[f'grade2d_{PAR_PDP[1]}'] = grade_b.astype(np.float32)
+    resultado['pdp_2d'] = (medias[-1].reshape(malha_a.shape) * media_referencia).astype(np.float32)
+    return resultado
 
-# Exibição dos resultados
-print(f"R²: {r2_final:.4f}")
-print(f"MAPE: {mape_final:.4f}%")
 
 # Rótulos legíveis para as variáveis explicativas — mais fáceis de entender no gráfico
-variaveis_legiveis = [
+VARIAVEIS_LEGIVEIS = [
     'Sazonalidade (Cosseno)',
     'Sazonalidade (Seno)',
     'Temperatura Média (°C)\n(6 meses)',
@@ -108,37 +211,312 @@ variaveis_legiveis = [
     'Temperatura x Precipitação\n(Interação)',
     'Área Plantada (ha)'
 ]
+ARQUIVO_GRAFICO_IMPORTANCIA = 'grafico_importancia_variaveis.png'
+ARQUIVO_GRAFICO_DISPERSAO = 'grafico_dispersao_teste.png'
+
+
+def grafico_importancia(importancias, caminho=ARQUIVO_GRAFICO_IMPORTANCIA, mostrar=True):
+    # Gráfico de importância das variáveis
+    plt.figure(figsize=(8, 5))
+    sns.barplot(x=importancias, y=VARIAVEIS_LEGIVEIS, color="#00F020")
+    plt.title('Importância das Variáveis', fontsize=14)
+    plt.xlabel('Importância')
+    plt.ylabel('Variável')
+    plt.tight_layout()
+    plt.savefig(caminho, dpi=300) # Salvar o gráfico
+    if mostrar:
+        plt.show()
+    plt.close()
+    return caminho
+
+
+def grafico_dispersao(y_test_real, y_pred_real, caminho=ARQUIVO_GRAFICO_DISPERSAO, mostrar=True):
+    # Gráfico de dispersão entre valores reais e previstos
+    plt.figure(figsize=(6, 6))
+    sns.scatterplot(x=y_test_real, y=y_pred_real, color="#28a745", s=60, edgecolor='k', alpha=0.7)
+    plt.plot([y_test_real.min(), y_test_real.max()],
+             [y_test_real.min(), y_test_real.max()],
+              color="#ff0000", linestyle='--', linewidth=2)
+    plt.xlabel('Valor Real')
+    plt.ylabel('Valor Previsto')
+    plt.title('Dispersão: Valor Real vs Previsto (Teste)')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(caminho, dpi=300) # Salvar o gráfico
+    if mostrar:
+        plt.show()
+    plt.close()
+    return caminho
+
+
+def calcular_explicacoes(pipeline, X, media_ano, n_jobs=-1):
+    # Valores SHAP exatos (TreeSHAP) de todas as linhas de X, na ordem das features do
+    # histórico, convertidos para kg/ha pela média anual de cada linha: o dashboard mostra
+    # a média de |SHAP| por variável e a decomposição de cada previsão sem chamar o modelo
+    valores, base = shap_floresta(pipeline, X, n_jobs)
+    media = np.asarray(media_ano, dtype=np.float64)
+    shap_real = valores * media[:, np.newaxis]
+    return {
+        'shap': shap_real.astype(np.float32),
+        'valor_base': (base * media).astype(np.float32),
+        'importancia': np.abs(shap_real).mean(axis=0).astype(np.float32),
+    }
+
+
+def salvar_modelo(pipeline, regiao, X, y, media_ano, posicoes_teste, n_jobs=-1, medicao=None):
+    # Pipeline do sklearn (.pkl, base do treino incremental) e artefato compacto lido pelo
+    # dashboard e pela API (artefato.py): floresta, scaler, R²/MAPE, linhas e previsões de
+    # teste, dependência parcial (sobre o treino) e SHAP de todas as linhas de X
+    medicao = medicao or Instrumentacao()
+    y, media_ano = np.asarray(y, dtype=np.float64), np.asarray(media_ano, dtype=np.float64)
+    posicoes_teste = np.asarray(posicoes_teste)
+    treino = np.setdiff1d(np.arange(len(X)), posicoes_teste)
+    X_teste = X.iloc[posicoes_teste]
+    media_teste = media_ano[posicoes_teste]
+    y_real = y[posicoes_teste] * media_teste
+    y_previsto = pipeline.predict(X_teste) * media_teste
+    # Faixa P10/P50/P90 das árvores em cada linha de teste, exibida no gráfico de predições
+    _, quantis = FlorestaCompilada.compilar(pipeline).prever_intervalo(X_teste)
+    r2, mape = metricas(y_real, y_previsto)
+
+    caminho = caminho_modelo(regiao)
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    with medicao.etapa('joblib.dump'):
+        joblib.dump(pipeline, caminho)
+    # Superfícies de dependência parcial e valores SHAP lidos pelo dashboard (sem chamar o modelo)
+    with medicao.etapa('dependencia_parcial'):
+        pdp = calcular_dependencia_parcial(pipeline, X.iloc[treino], media_ano[treino].mean())
+    with medicao.etapa('shap'):
+        shap = calcular_explicacoes(pipeline, X, media_ano, n_jobs)
+    with medicao.etapa('artefato'):
+        vetores = {
+            'teste/X': X_teste[FEATURES].to_numpy(dtype=np.float64),
+            'teste/posicoes': posicoes_teste.astype(np.int32),
+            'teste/media': media_teste,
+            'teste/y_real': y_real,
+            'teste/y_previsto': y_previsto,
+            'teste/quantis': quantis * media_teste,
+            **{f'pdp/{nome}': valor for nome, valor in pdp.items()},
+            **{f'shap/{nome}': valor for nome, valor in shap.items()},
+        }
+        salvar_artefato(caminho_artefato(caminho), pipeline, {'r2': r2, 'mape': mape}, vetores,
+                        regiao=str(regiao), linhas=len(X), linhas_treino=len(treino))
+    return r2, mape
+
+
+def gerar_graficos(pipeline, y_test_real, y_pred_real, regiao=REGIAO_PADRAO):
+    # Modo interativo: gera, salva e exibe os dois gráficos, um após o outro
+    grafico_importancia(pipeline.named_steps['rf'].feature_importances_,
+                        nome_arquivo(ARQUIVO_GRAFICO_IMPORTANCIA, regiao))
+    grafico_dispersao(y_test_real, y_pred_real, nome_arquivo(ARQUIVO_GRAFICO_DISPERSAO, regiao))
+
+
+def _sem_janela():
+    # Processos de renderização: backend sem interface gráfica
+    plt.switch_backend('Agg')
+
+
+def renderizar_graficos(executor, pipeline, y_test_real, y_pred_real, regiao=REGIAO_PADRAO):
+    # Modo headless: cada gráfico é renderizado (savefig com dpi=300) em um processo do
+    # executor, enquanto o processo principal segue com a serialização do modelo
+    return [
+        executor.submit(grafico_importancia, pipeline.named_steps['rf'].feature_importances_,
+                        nome_arquivo(ARQUIVO_GRAFICO_IMPORTANCIA, regiao), False),
+        executor.submit(grafico_dispersao, np.asarray(y_test_real), np.asarray(y_pred_real),
+                        nome_arquivo(ARQUIVO_GRAFICO_DISPERSAO, regiao), False),
+    ]
+
+
+# Matriz compartilhada pelos processos da validação walk-forward (uma por processo)
+_compartilhada = {}
+
+
+def _abrir_matriz_compartilhada(nome, formato):
+    # Cada processo mapeia o mesmo bloco de memória, sem cópia nem pickle da matriz
+    bloco = shared_memory.SharedMemory(name=nome)
+    _compartilhada['bloco'] = bloco
+    _compartilhada['matriz'] = np.ndarray(formato, dtype=np.float64, buffer=bloco.buf)
+
+
+def _avaliar_fold(ano_teste, parametros):
+    # Colunas: FEATURES, rendimento relativo, média anual e ano
+    matriz = _compartilhada['matriz']
+    n = len(FEATURES)
+    anos = matriz[:, n + 2]
+    treino, teste = anos < ano_teste, anos == ano_teste
+    inicio, cpu = time.perf_counter(), time.process_time()
+    pipeline = criar_pipeline(**parametros, n_jobs=1)
+    pipeline.fit(pd.DataFrame(matriz[treino, :n], columns=FEATURES), matriz[treino, n])
+    previsto = pipeline.predict(pd.DataFrame(matriz[teste, :n], columns=FEATURES))
+    media = matriz[teste, n + 1]
+    r2, mape = metricas(matriz[teste, n] * media, previsto * media)
+    return {'ano_teste': int(ano_teste), 'linhas_treino': int(treino.sum()), 'linhas_teste': int(teste.sum()),
+            'r2': r2, 'mape': mape, 'segundos': time.perf_counter() - inicio,
+            'cpu_segundos': time.process_time() - cpu}
+
+
+def validacao_walk_forward(regiao=REGIAO_PADRAO, n_jobs=-1, parametros=None, medir_serial=False):
+    # Validação em janela expansiva por ano-safra: cada fold treina com todos os anos anteriores
+    # e testa no ano seguinte, sem meses futuros no treino. O ano-safra é o ano civil do mês,
+    # o mesmo período de referência do LSPA e da média anual usada no alvo relativo
+    # medir_serial: repete os folds em série neste processo para medir a aceleração real
+    df = carregar_dados(regiao)
+    X, y, media_ano = preparar_features(df)
+    anos = ano_do_mes(df['mes'].to_numpy()[X.index])
+    anos_teste = np.unique(anos)[ANOS_TREINO_MINIMOS:]
+
+    # Features, alvo, média anual e ano em um único bloco de memória compartilhada
+    matriz = np.column_stack([X[FEATURES].to_numpy(dtype=np.float64), y, media_ano, anos])
+    bloco = shared_memory.SharedMemory(create=True, size=matriz.nbytes)
+    try:
+        np.ndarray(matriz.shape, dtype=np.float64, buffer=bloco.buf)[:] = matriz
+        processos = os.cpu_count() if n_jobs == -1 else n_jobs
+        inicio = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=min(processos, len(anos_teste)),
+                                 initializer=_abrir_matriz_compartilhada,
+                                 initargs=(bloco.name, matriz.shape)) as executor:
+            folds = list(executor.map(_avaliar_fold, anos_teste, [parametros or {}] * len(anos_teste)))
+        segundos = time.perf_counter() - inicio
+        segundos_serial = None
+        if medir_serial:
+            _abrir_matriz_compartilhada(bloco.name, matriz.shape)
+            try:
+                inicio = time.perf_counter()
+                for ano in anos_teste:
+                    _avaliar_fold(ano, parametros or {})
+                segundos_serial = time.perf_counter() - inicio
+            finally:
+                _compartilhada.pop('matriz')
+                _compartilhada.pop('bloco').close()
+    finally:
+        bloco.close()
+        bloco.unlink()
+
+    resultado = pd.DataFrame(folds)
+    resultado.to_csv(nome_arquivo(ARQUIVO_WALK_FORWARD, regiao), index=False)
+    print(resultado.to_string(index=False))
+    print(f"R² médio: {resultado['r2'].mean():.4f} | MAPE médio: {resultado['mape'].mean():.4f}%")
+    if segundos_serial is None:
+        # Sem a execução serial, a aceleração é só estimada pelo tempo de CPU somado dos folds,
+        # que ignora a disputa por cache e memória entre os processos
+        print(f"Tempo: {segundos:.2f}s em {min(processos, len(anos_teste))} processos "
+              f"(aceleração estimada {resultado['cpu_segundos'].sum() / segundos:.2f}x: "
+              f"CPU somada dos folds ÷ tempo de parede; use --medir-serial para medir)")
+    else:
+        print(f"Tempo: {segundos:.2f}s em {min(processos, len(anos_teste))} processos, "
+              f"{segundos_serial:.2f}s em série (aceleração medida {segundos_serial / segundos:.2f}x)")
+    return resultado
+
+
+def treinar_regiao(regiao=REGIAO_PADRAO, buscar=False, n_jobs=-1, graficos='janela', perfilar_fit=False,
+                   verboso=True):
+    # Pipeline completo de uma região: dados → features → busca (opcional) → treino → avaliação
+    # Cada etapa é medida (parede, CPU, pico de RSS) e o relatório vai para instrumentacao_treino.json
+    # graficos: 'janela' (exibe as figuras), 'headless' (só salva, em paralelo) ou None (sem figuras)
+    # verboso: imprime R²/MAPE e o resumo das etapas (desligado no treino paralelo de regiões,
+    # que imprime a tabela de todas no final)
+    inicio = time.perf_counter()
+    medicao = Instrumentacao({'pipeline.fit': nome_arquivo(ARQUIVO_PERFIL_FIT, regiao)} if perfilar_fit else None)
+    with medicao.etapa('carregar_dados'):
+        df = carregar_dados(regiao)
+    # Filtro de Z-score, médias móveis e demais features (uma única passada vetorizada)
+    with medicao.etapa('preparar_features'):
+        X, y, media_ano = preparar_features(df)
+    if len(X) < LINHAS_MINIMAS:
+        print(f"[{regiao}] ignorada: {len(X)} linhas (mínimo {LINHAS_MINIMAS})")
+        return {'regiao': regiao, 'linhas': len(X), 'r2': None, 'mape': None, 'segundos': None}
+    with medicao.etapa('dividir_dados'):
+        X_train, X_test, y_train, y_test, media_train, media_test = dividir_dados(X, y, media_ano)
+
+    parametros = {}
+    if buscar:
+        with medicao.etapa('buscar_hiperparametros'):
+            parametros = buscar_hiperparametros(X_train, y_train, n_jobs, regiao)
+    pipeline = criar_pipeline(**parametros)
+
+    # Treinamento do modelo
+    with medicao.etapa('pipeline.fit'):
+        pipeline.fit(X_train, y_train)
+
+    with medicao.etapa('avaliar'):
+        if verboso:
+            y_test_real, y_pred_real = avaliar(pipeline, X_test, y_test, media_test)
+        else:
+            y_test_real, y_pred_real = y_test * media_test, pipeline.predict(X_test) * media_test
+        r2_final, mape_final = metricas(y_test_real, y_pred_real)
+    executor = None
+    if graficos == 'headless':
+        _sem_janela()
+        executor = ProcessPoolExecutor(max_workers=2, initializer=_sem_janela)
+        figuras = renderizar_graficos(executor, pipeline, y_test_real, y_pred_real, regiao)
+    elif graficos:
+        with medicao.etapa('gerar_graficos'):
+            gerar_graficos(pipeline, y_test_real, y_pred_real, regiao)
+
+    # Salvar pipeline completo (modelo + scaler) e o artefato compacto com métricas e previsões
+    salvar_modelo(pipeline, regiao, X, y, media_ano, X.index.get_indexer(X_test.index), n_jobs, medicao)
+
+    if executor is not None:
+        # Só o tempo que sobra da renderização depois da serialização
+        with medicao.etapa('gerar_graficos'):
+            for figura in figuras:
+                figura.result()
+        executor.shutdown()
+
+    medicao.salvar(nome_arquivo(ARQUIVO_INSTRUMENTACAO, regiao), regiao=str(regiao), linhas=len(df),
+                   linhas_treino=len(X_train), r2=r2_final, mape=mape_final)
+    if verboso:
+        print(medicao.resumo())
+    return {'regiao': regiao, 'linhas': len(X), 'r2': r2_final, 'mape': mape_final,
+            'segundos': time.perf_counter() - inicio}
+
+
+def treinar_regioes(regioes, buscar=False, n_jobs=-1, perfilar_fit=False):
+    # Uma floresta por região, em paralelo: cada processo treina uma região inteira
+    # (com a floresta e a busca em um único núcleo, para não disputar CPU entre processos)
+    resultados = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(treinar_regiao)(regiao, buscar, 1, None, perfilar_fit, verboso=False)
+        for regiao in regioes
+    )
+    resumo = pd.DataFrame(resultados)
+    resumo.to_csv(ARQUIVO_METRICAS_REGIOES, index=False)
+    print(resumo.to_string(index=False))
+    print(f"Métricas por região salvas em {ARQUIVO_METRICAS_REGIOES}")
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Treinamento do modelo de produtividade da soja no RS')
+    parser.add_argument('--buscar', action='store_true',
+                        help='executa a busca de hiperparâmetros (successive halving) antes do treino final')
+    parser.add_argument('--n-jobs', type=int, default=-1,
+                        help='processos usados na busca ou no treino das regiões (-1 = todos os núcleos)')
+    parser.add_argument('--regioes', nargs='+', default=[REGIAO_PADRAO],
+                        help='códigos das regiões a treinar ("todas" = todas as partições do dataset)')
+    parser.add_argument('--perfilar-fit', action='store_true',
+                        help=f'grava o cProfile do ajuste da floresta em {ARQUIVO_PERFIL_FIT}')
+    parser.add_argument('--graficos', choices=['janela', 'headless', 'nenhum'], default='janela',
+                        help='janela: salva e exibe as figuras; headless: só salva, em processos paralelos '
+                             'durante a serialização (sem plt.show); nenhum: não gera figuras')
+    parser.add_argument('--walk-forward', action='store_true',
+                        help='só executa a validação walk-forward por ano-safra (folds em paralelo)')
+    parser.add_argument('--medir-serial', action='store_true',
+                        help='com --walk-forward, repete os folds em série para medir a aceleração real')
+    args = parser.parse_args()
+    graficos = None if args.graficos == 'nenhum' else args.graficos
+
+    regioes = list(listar_regioes()) if args.regioes == ['todas'] else args.regioes
+    if args.walk_forward:
+        for regiao in regioes:
+            validacao_walk_forward(regiao, args.n_jobs, medir_serial=args.medir_serial)
+    elif len(regioes) == 1:
+        treinar_regiao(regioes[0], args.buscar, args.n_jobs, graficos, args.perfilar_fit)
+    else:
+        treinar_regioes(regioes, args.buscar, args.n_jobs, args.perfilar_fit)
+
 
-# Importância das variáveis no modelo
-importancias = pipeline.named_steps['rf'].feature_importances_
-variaveis = X.columns
-
-# Gráfico de importância das variáveis
-plt.figure(figsize=(8, 5))
-sns.barplot(x=importancias, y=variaveis_legiveis, color="#00F020")
-plt.title('Importância das Variáveis', fontsize=14)
-plt.xlabel('Importância')
-plt.ylabel('Variável')
-plt.tight_layout()
-plt.savefig('grafico_importancia_variaveis.png', dpi=300) # Salvar o gráfico 
-plt.show()
-
-# Gráfico de dispersão entre valores reais e previstos
-plt.figure(figsize=(6, 6))
-sns.scatterplot(x=y_test_real, y=y_pred_real, color="#28a745", s=60, edgecolor='k', alpha=0.7)
-plt.plot([y_test_real.min(), y_test_real.max()],
-         [y_test_real.min(), y_test_real.max()],
-          color="#ff0000", linestyle='--', linewidth=2)
-plt.xlabel('Valor Real')
-plt.ylabel('Valor Previsto')
-plt.title('Dispersão: Valor Real vs Previsto (Teste)')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('grafico_dispersao_teste.png', dpi=300) # Salvar o gráfico
-plt.show()
-
-# Salvar pipeline completo (modelo + scaler)
-joblib.dump(pipeline, 'modelo_produtividade_soja.pkl')
+if __name__ == '__main__':
+    main()
 
 # R²: 0.9870
-# MAPE: 2.1332%
\ No newline at end of file
+# MAPE: 2.1332%
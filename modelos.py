@@ -0,0 +1,227 @@
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+from dataset import REGIAO_PADRAO
+from motor_inferencia import FlorestaCompilada
+
+# Modelo estadual no arquivo de sempre; um modelo por região em modelos/
+ARQUIVO_MODELO = "modelo_produtividade_soja.pkl"
+DIRETORIO_MODELOS = "modelos"
+
+
+def caminho_modelo(regiao=REGIAO_PADRAO, diretorio=""):
+    """Caminho do pipeline treinado de uma região, relativo a `diretorio`"""
+    if str(regiao) == REGIAO_PADRAO:
+        return os.path.join(diretorio, ARQUIVO_MODELO)
+    nome = f"{os.path.splitext(ARQUIVO_MODELO)[0]}_{regiao}.pkl"
+    return os.path.join(diretorio, DIRETORIO_MODELOS, nome)
+
+
+def caminho_artefato(caminho):
+    """Artefato compacto (artefato.py) gravado ao lado do pipeline em `caminho`"""
+    return os.path.splitext(caminho)[0] + ".artefato.npy"
+
+
+# Aberturas da floresta antes de desistir, se a versão lida for trocada no meio
+TENTATIVAS_ABRIR = 3
+
+
+def floresta_mapeada(caminho):
+    """Floresta compilada do pipeline em `caminho`, aberta com mmap
+
+    Os vetores ficam em <modelo>.floresta, (re)gerado a partir do .pkl quando
+    falta ou está desatualizado. Os processos que abrem o mesmo diretório
+    compartilham as páginas em vez de manter cada um a sua cópia da floresta.
+    """
+    destino = os.path.splitext(caminho)[0] + ".floresta"
+    info = os.path.join(destino, FlorestaCompilada.ARQUIVO_INFO)
+    if not os.path.exists(info) or os.path.getmtime(info) < os.path.getmtime(caminho):
+        _gerar_floresta(caminho, destino)
+    for tentativa in range(TENTATIVAS_ABRIR):
+        # Resolve o link uma vez: todos os vetores vêm da mesma versão
+        try:
+            return FlorestaCompilada.abrir(os.path.realpath(destino))
+        except FileNotFoundError:
+            # A versão resolvida acabou de ser removida por outro processo
+            if tentativa == TENTATIVAS_ABRIR - 1:
+                raise
+
+
+def _gerar_floresta(caminho, destino):
+    """Compila o pipeline em um diretório versionado e aponta `destino` para ele
+
+    `destino` é um link simbólico trocado com os.replace (atômico): quem abre a
+    floresta sempre encontra uma versão completa, e as versões antigas só são
+    removidas depois da troca. Quem já as mapeou segue com as páginas abertas.
+    """
+    pipeline = joblib.load(caminho)
+    floresta = FlorestaCompilada.compilar(pipeline)
+    floresta.metadados["importancias"] = pipeline.named_steps[
+        "rf"
+    ].feature_importances_.tolist()
+    diretorio = os.path.dirname(destino) or "."
+    prefixo = f".{os.path.basename(destino)}-"
+    versao = tempfile.mkdtemp(prefix=prefixo, dir=diretorio)
+    floresta.salvar(versao)
+
+    if os.path.isdir(destino) and not os.path.islink(destino):
+        # Formato antigo (diretório comum): sai do caminho para dar lugar ao link
+        os.replace(destino, tempfile.mkdtemp(prefix=prefixo, dir=diretorio))
+    link = os.path.join(diretorio, f"{prefixo}link-{os.getpid()}")
+    if os.path.lexists(link):
+        os.unlink(link)
+    os.symlink(os.path.basename(versao), link)
+    os.replace(link, destino)
+
+    # Versões completas mais antigas que a atual; as que outro processo ainda está
+    # gravando (sem floresta.json) ou acabou de gravar (mais novas) ficam
+    atual = os.path.realpath(destino)
+    gravada_em = os.path.getmtime(os.path.join(atual, FlorestaCompilada.ARQUIVO_INFO))
+    for nome in os.listdir(diretorio):
+        antigo = os.path.join(diretorio, nome)
+        info = os.path.join(antigo, FlorestaCompilada.ARQUIVO_INFO)
+        if (
+            nome.startswith(prefixo)
+            and not os.path.islink(antigo)
+            and os.path.realpath(antigo) != atual
+            and os.path.exists(info)
+            and os.path.getmtime(info) <= gravada_em
+        ):
+            shutil.rmtree(antigo, ignore_errors=True)
+
+
+# Orçamento de memória dos modelos residentes em cada processo
+LIMITE_MEMORIA_MB = float(os.environ.get("MODELOS_MEMORIA_MB", 512))
+
+
+def _mapeado(array):
+    """True se o array (ou a base de que é vista) aponta para um arquivo mapeado"""
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def tamanho_em_memoria(objeto, _vistos=None):
+    """Estimativa dos bytes residentes de um modelo (arrays NumPy e árvores do sklearn)
+
+    Arrays mapeados de arquivo não contam: suas páginas ficam no cache do sistema
+    operacional, compartilhadas por todos os processos que abrem o mesmo arquivo.
+    """
+    vistos = set() if _vistos is None else _vistos
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+
+    if isinstance(objeto, np.ndarray):
+        if _mapeado(objeto):
+            return 0
+        base = objeto
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        # Vistas contam uma única vez, pelo array que de fato tem os dados
+        if base is not objeto:
+            return tamanho_em_memoria(base, vistos)
+        if objeto.dtype == object:
+            return objeto.nbytes + sum(
+                tamanho_em_memoria(x, vistos) for x in objeto.flat
+            )
+        return objeto.nbytes
+    if hasattr(objeto, "node_count") and hasattr(objeto, "__getstate__"):
+        # sklearn.tree._tree.Tree: nós e valores ficam em buffers C, que o
+        # __getstate__ expõe como arrays
+        estado = objeto.__getstate__()
+        return estado["nodes"].nbytes + estado["values"].nbytes
+    if isinstance(objeto, dict):
+        return sum(tamanho_em_memoria(valor, vistos) for valor in objeto.values())
+    if isinstance(objeto, (list, tuple)):
+        return sum(tamanho_em_memoria(item, vistos) for item in objeto)
+    if hasattr(objeto, "__dict__"):
+        return tamanho_em_memoria(vars(objeto), vistos)
+    return 0
+
+
+class RegistroModelos:
+    """Modelos carregados sob demanda por chave, com descarte LRU por memória
+
+    `carregar(chave)` devolve o modelo e `versao(chave)` (opcional) identifica a
+    versão em disco: se mudar, o modelo é recarregado na próxima consulta. Quando
+    os modelos residentes passam de `limite_bytes`, os usados há mais tempo são
+    descartados (o recém-carregado nunca é).
+    """
+
+    def __init__(
+        self,
+        carregar,
+        versao=None,
+        limite_bytes=LIMITE_MEMORIA_MB * 2**20,
+        medir=tamanho_em_memoria,
+    ):
+        self.carregar = carregar
+        self.versao = versao
+        self.limite_bytes = limite_bytes
+        self.medir = medir
+        # chave -> (versão, modelo, bytes), do menos para o mais recente
+        self._modelos = OrderedDict()
+        self._trava = threading.RLock()
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    def obter(self, chave):
+        with self._trava:
+            versao = self.versao(chave) if self.versao else None
+            entrada = self._modelos.get(chave)
+            if entrada is not None and entrada[0] == versao:
+                self._modelos.move_to_end(chave)
+                self.acertos += 1
+                return entrada[1]
+
+            self.falhas += 1
+            self._modelos.pop(chave, None)
+            modelo = self.carregar(chave)
+            self._modelos[chave] = (versao, modelo, self.medir(modelo))
+            while self.bytes_em_uso > self.limite_bytes and len(self._modelos) > 1:
+                self._modelos.popitem(last=False)
+                self.descartes += 1
+            return modelo
+
+    def __contains__(self, chave):
+        return chave in self._modelos
+
+    def __len__(self):
+        return len(self._modelos)
+
+    def remover(self, chave):
+        with self._trava:
+            self._modelos.pop(chave, None)
+
+    def limpar(self):
+        with self._trava:
+            self._modelos.clear()
+
+    @property
+    def bytes_em_uso(self):
+        return sum(entrada[2] for entrada in self._modelos.values())
+
+    def estatisticas(self):
+        """Contadores e ocupação atual, para monitoramento"""
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "descartes": self.descartes,
+                "taxa_acerto": self.acertos / consultas if consultas else None,
+                "residentes": list(self._modelos),
+                "bytes_em_uso": self.bytes_em_uso,
+                "limite_bytes": self.limite_bytes,
+            }
@@ -0,0 +1,226 @@
+import math
+import re
+
+import numpy as np
+
+# Operadores da sintaxe de filter_query do DataTable (equivalentes em texto e símbolo)
+OPERADORES = {
+    "eq": "=",
+    "ne": "!=",
+    "lt": "<",
+    "le": "<=",
+    "gt": ">",
+    "ge": ">=",
+    "=": "=",
+    "!=": "!=",
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+    "contains": "contains",
+    "datestartswith": "datestartswith",
+}
+COMPARACOES = {
+    "=": np.equal,
+    "!=": np.not_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+}
+
+# {coluna} operador valor, com o valor opcionalmente entre aspas. A linha de filtro
+# do DataTable prefixa os operadores com "s" (diferencia maiúsculas) ou "i" (não
+# diferencia), conforme filter_options: {Mês} icontains jan, {Área plantada (ha)} s> 3
+_TERMO_FILTRO = re.compile(
+    r"^\s*\{(?P<coluna>[^}]+)\}\s+"
+    r"(?P<caso>[si])?"
+    r"(?P<operador>>=|<=|!=|=|<|>|eq|ne|lt|le|gt|ge|contains|datestartswith)\s+"
+    r"(?P<valor>.+?)\s*$",
+    re.IGNORECASE,
+)
+
+
+def formatar_brl(valores, casas=0):
+    """Formatação brasileira (1.234,5) vetorizada sobre um array de números"""
+    valores = np.asarray(valores, dtype=np.float64)
+    nulos = np.isnan(valores)
+    # "%.nf" arredonda como o f-string; o sinal é tratado à parte
+    texto = np.char.mod(f"%.{casas}f", np.abs(np.where(nulos, 0, valores)))
+    inteiro, _, fracao = np.char.partition(texto, ".").T
+    numeros = inteiro.astype(np.int64)
+
+    # Grupos de milhar da direita para a esquerda, todos com 3 dígitos...
+    grupos = [np.char.zfill((numeros % 1000).astype(str), 3)]
+    numeros = numeros // 1000
+    while numeros.any():
+        grupos.append(np.char.zfill((numeros % 1000).astype(str), 3))
+        numeros = numeros // 1000
+    milhares = grupos.pop()
+    for grupo in reversed(grupos):
+        milhares = np.char.add(np.char.add(milhares, "."), grupo)
+    # ...e depois sem os zeros (e pontos) à esquerda
+    milhares = np.char.lstrip(milhares, "0.")
+    milhares = np.where(milhares == "", "0", milhares)
+
+    if casas:
+        milhares = np.char.add(np.char.add(milhares, ","), fracao)
+    # Como no f-string, "-0,0" mantém o sinal; sem decimais (int(round(x))) não
+    negativos = np.signbit(valores)
+    if not casas:
+        negativos &= inteiro != "0"
+    milhares = np.where(negativos, np.char.add("-", milhares), milhares)
+    return np.where(nulos, "", milhares).astype(object)
+
+
+def interpretar_numero(texto):
+    """Converte "1.234,5" (ou "1234.5") em float; None se não for número"""
+    texto = texto.strip()
+    if "," in texto or texto.count(".") > 1:
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+def interpretar_filtro(filter_query):
+    """Separa o filter_query do DataTable em termos (coluna, operador, valor, sensivel)
+
+    sensivel diz se textos são comparados diferenciando maiúsculas; sem prefixo, só
+    contains e datestartswith não diferenciam. Termos que não seguem a sintaxe
+    suportada são ignorados.
+    """
+    termos = []
+    for parte in (filter_query or "").split(" && "):
+        encontrado = _TERMO_FILTRO.match(parte)
+        if encontrado is None:
+            continue
+        valor = encontrado["valor"]
+        if len(valor) >= 2 and valor[0] == valor[-1] and valor[0] in "\"'`":
+            valor = valor[1:-1]
+        operador = OPERADORES[encontrado["operador"].lower()]
+        caso = (encontrado["caso"] or "").lower()
+        if caso:
+            sensivel = caso == "s"
+        else:
+            sensivel = operador not in ("contains", "datestartswith")
+        termos.append((encontrado["coluna"], operador, valor, sensivel))
+    return termos
+
+
+class IndiceTabela:
+    """Tabela histórica formatada e pré-ordenada para paginação no servidor
+
+    As linhas ficam agrupadas (por ano) em blocos contíguos. Para cada coluna
+    guarda-se uma permutação que ordena cada bloco por aquela coluna, então
+    ordenar e paginar um grupo são apenas fatiamentos; o filtro é uma máscara
+    vetorizada sobre as linhas do grupo. Só a página pedida vira registros.
+    """
+
+    def __init__(self, historico, casas_decimais, grupo="Ano", chaves=None):
+        # chaves: ordenação alternativa de colunas de texto, alinhada às linhas
+        posicoes = np.argsort(historico[grupo].to_numpy(), kind="stable")
+        historico = historico.iloc[posicoes]
+        chaves = {
+            coluna: np.asarray(chave)[posicoes]
+            for coluna, chave in (chaves or {}).items()
+        }
+        valores_grupo = historico[grupo].to_numpy()
+        historico = historico.drop(columns=grupo)
+
+        # Valores brutos (filtros numéricos e ordenação) e texto exibido, por coluna
+        self.colunas = list(historico.columns)
+        self.valores = {}
+        self.textos = {}
+        for coluna in self.colunas:
+            if coluna in casas_decimais:
+                self.valores[coluna] = historico[coluna].to_numpy(dtype=np.float64)
+                texto = formatar_brl(self.valores[coluna], casas_decimais[coluna])
+            else:
+                self.valores[coluna] = historico[coluna].to_numpy(dtype=str)
+                texto = self.valores[coluna]
+            self.textos[coluna] = np.asarray(texto, dtype=str)
+        # Versão minúscula para os filtros de texto (sem diferenciar maiúsculas)
+        self.textos_minusculos = {
+            coluna: np.char.lower(texto) for coluna, texto in self.textos.items()
+        }
+
+        # Limites [início, fim) de cada grupo na ordem estável
+        grupos, inicios = np.unique(valores_grupo, return_index=True)
+        fins = np.append(inicios[1:], len(valores_grupo))
+        self.limites = {
+            grupo.item(): (int(inicio), int(fim))
+            for grupo, inicio, fim in zip(grupos, inicios, fins)
+        }
+
+        # Ordem de cada coluna dentro dos grupos (lexsort é estável)
+        self.ordens = {
+            coluna: np.lexsort(
+                (chaves.get(coluna, self.valores[coluna]), valores_grupo)
+            )
+            for coluna in self.colunas
+        }
+
+    def __contains__(self, grupo):
+        return grupo in self.limites
+
+    def _filtrar(self, posicoes, filter_query):
+        mascara = np.ones(len(posicoes), dtype=bool)
+        for coluna, operador, valor, sensivel in interpretar_filtro(filter_query):
+            if coluna not in self.valores:
+                continue
+            if sensivel:
+                textos = self.textos[coluna][posicoes]
+            else:
+                textos = self.textos_minusculos[coluna][posicoes]
+                valor = valor.lower()
+            if operador == "contains":
+                mascara &= np.char.find(textos, valor) >= 0
+                continue
+            if operador == "datestartswith":
+                mascara &= np.char.startswith(textos, valor)
+                continue
+            numero = interpretar_numero(valor)
+            if self.valores[coluna].dtype.kind == "f" and numero is not None:
+                mascara &= COMPARACOES[operador](self.valores[coluna][posicoes], numero)
+            else:
+                mascara &= COMPARACOES[operador](textos, valor)
+        return mascara
+
+    def registros(self, posicoes):
+        """Monta os registros (dicts) do DataTable apenas para as posições pedidas"""
+        linhas = zip(
+            *(self.textos[coluna][posicoes].tolist() for coluna in self.colunas)
+        )
+        return [dict(zip(self.colunas, linha)) for linha in linhas]
+
+    def pagina(self, grupo, pagina=0, tamanho=12, sort_by=None, filter_query=""):
+        """Registros da página pedida e o total de páginas do grupo"""
+        if grupo not in self.limites:
+            return [], 0
+        inicio, fim = self.limites[grupo]
+
+        if sort_by:
+            ordem = self.ordens[sort_by[0]["column_id"]][inicio:fim]
+            if sort_by[0]["direction"] == "desc":
+                ordem = ordem[::-1]
+        elif filter_query:
+            ordem = np.arange(inicio, fim)
+        else:
+            # Caso mais comum: ordem original, a página é uma fatia direta
+            total = fim - inicio
+            paginas = max(1, math.ceil(total / tamanho))
+            pagina = min(max(pagina, 0), paginas - 1)
+            primeira = inicio + pagina * tamanho
+            return (
+                self.registros(slice(primeira, min(primeira + tamanho, fim))),
+                paginas,
+            )
+
+        if filter_query:
+            ordem = ordem[self._filtrar(ordem, filter_query)]
+        paginas = max(1, math.ceil(len(ordem) / tamanho))
+        pagina = min(max(pagina, 0), paginas - 1)
+        selecionadas = ordem[pagina * tamanho : (pagina + 1) * tamanho]
+        return self.registros(selecionadas), paginas
@@ -0,0 +1,44 @@
+"""Configuração compartilhada dos testes (pytest a partir da raiz do repositório)."""
+
+import os
+import sys
+import warnings
+
+import joblib
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from dataset import caminho_regiao, carregar_dataset  # noqa: E402
+from engenharia_features import FEATURES, gerar_features  # noqa: E402
+from modelos import caminho_modelo  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def pipeline():
+    """Pipeline treinado da região padrão, versionado no repositório"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return joblib.load(os.path.join(RAIZ, caminho_modelo()))
+
+
+@pytest.fixture(scope="session")
+def historico():
+    """Colunas do dataset da região padrão"""
+    return carregar_dataset(caminho_regiao())
+
+
+@pytest.fixture(scope="session")
+def X_historico(historico):
+    """Features do histórico no formato de entrada do pipeline (DataFrame)"""
+    features = gerar_features(
+        historico["mes"],
+        historico["temp_media"],
+        historico["precip_media"],
+        historico["area_plantada"],
+        historico["rendimento"],
+    )
+    return pd.DataFrame(features["X"], columns=FEATURES)
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.metrics import mean_absolute_percentage_error, r2_score
+
+import artefato
+from artefato import Artefato, salvar_artefato
+from modelos import caminho_artefato, caminho_modelo, tamanho_em_memoria
+
+
+@pytest.fixture(scope="module")
+def caminho(pipeline, tmp_path_factory):
+    caminho = str(tmp_path_factory.mktemp("artefato") / "modelo.artefato.npy")
+    vetores = {
+        "teste/y_real": np.arange(5, dtype=np.float64),
+        "teste/posicoes": np.arange(5, dtype=np.int64),
+        "shap/shap": np.ones((3, 6), dtype=np.float32),
+    }
+    salvar_artefato(caminho, pipeline, {"r2": 0.9, "mape": 5.0}, vetores, regiao="RS")
+    return caminho
+
+
+def test_ida_e_volta(caminho, pipeline):
+    aberto = Artefato.abrir(caminho)
+    assert aberto.verificar()
+    assert aberto.metricas == {"r2": 0.9, "mape": 5.0}
+    assert aberto.manifesto["regiao"] == "RS"
+    assert aberto.manifesto["features"] == list(pipeline.feature_names_in_)
+    assert aberto.manifesto["arvores"] == len(pipeline.named_steps["rf"].estimators_)
+    np.testing.assert_array_equal(aberto.grupo("teste")["y_real"], np.arange(5.0))
+    assert aberto.grupo("shap")["shap"].shape == (3, 6)
+    # Vetores alinhados e mapeados: nada copiado para a memória do processo
+    inicio = aberto.dados.ctypes.data
+    for vetor in aberto.vetores.values():
+        assert (vetor.ctypes.data - inicio) % artefato.ALINHAMENTO == 0
+    assert tamanho_em_memoria(aberto.floresta) == 0
+
+
+def test_floresta_do_artefato(caminho, pipeline, X_historico):
+    floresta = Artefato.abrir(caminho).floresta
+    # Limiares float32 exatos: cada árvore chega à mesma folha que no sklearn e só
+    # o valor da folha perde precisão (float32)
+    padronizado = pipeline.named_steps["scaler"].transform(X_historico)
+    por_arvore = np.stack(
+        [
+            arvore.predict(padronizado.astype(np.float32))
+            for arvore in pipeline.named_steps["rf"]
+        ]
+    )
+    np.testing.assert_array_equal(
+        floresta.prever_por_arvore(X_historico), por_arvore.astype(np.float32)
+    )
+    np.testing.assert_allclose(
+        floresta.prever(X_historico), pipeline.predict(X_historico), rtol=1e-6
+    )
+
+
+def test_conteudo_alterado_nao_confere(caminho, tmp_path):
+    bruto = np.load(caminho)
+    bruto[-1] ^= 0xFF
+    alterado = str(tmp_path / "alterado.npy")
+    np.save(alterado, bruto)
+    assert not Artefato.abrir(alterado).verificar()
+
+
+def test_arquivos_invalidos(caminho, tmp_path):
+    outro = str(tmp_path / "outro.npy")
+    np.save(outro, np.zeros(10))
+    with pytest.raises(ValueError, match="não é um artefato"):
+        Artefato.abrir(outro)
+
+    # Versão do formato diferente da que o código lê
+    bruto = np.load(caminho)
+    tamanho = int.from_bytes(bytes(bruto[:8]), "little")
+    manifesto = bytes(bruto[8 : 8 + tamanho]).replace(b'"versao": 1', b'"versao": 9')
+    bruto[8 : 8 + tamanho] = np.frombuffer(manifesto, dtype=np.uint8)
+    np.save(outro, bruto)
+    with pytest.raises(ValueError, match="versão 9"):
+        Artefato.abrir(outro)
+
+
+def test_vetor_nao_numerico(pipeline, tmp_path):
+    with pytest.raises(ValueError, match="não é numérico"):
+        salvar_artefato(
+            str(tmp_path / "x.npy"), pipeline, {}, {"teste/nomes": np.array(["a"])}
+        )
+    assert os.listdir(tmp_path) == []
+
+
+def test_artefato_versionado_confere_com_o_pipeline(pipeline):
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    caminho = os.path.join(raiz, caminho_artefato(caminho_modelo()))
+    aberto = Artefato.abrir(caminho)
+    assert aberto.verificar()
+    parametros = pipeline.named_steps["rf"].get_params()
+    assert aberto.manifesto["parametros"]["max_depth"] == parametros["max_depth"]
+    assert aberto.manifesto["importancias"] == pytest.approx(
+        pipeline.named_steps["rf"].feature_importances_
+    )
+    teste = aberto.grupo("teste")
+    assert aberto.metricas["r2"] == pytest.approx(
+        r2_score(teste["y_real"], teste["y_previsto"])
+    )
+    assert aberto.metricas["mape"] == pytest.approx(
+        mean_absolute_percentage_error(teste["y_real"], teste["y_previsto"]) * 100
+    )
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.base import clone
+
+from atualizacao_incremental import (
+    atualizar_floresta,
+    carregar_estado,
+    salvar_estado,
+    validar_quantidade,
+)
+from dataset import salvar_dataset
+
+
+@pytest.fixture
+def pequeno(pipeline, X_historico):
+    """Pipeline com a mesma configuração do modelo, mas só 10 árvores"""
+    y = np.random.default_rng(0).normal(1, 0.1, len(X_historico))
+    modelo = clone(pipeline).set_params(rf__n_estimators=10, rf__n_jobs=1)
+    return modelo.fit(X_historico, y), X_historico, y
+
+
+@pytest.mark.parametrize(
+    "quantidade, modo",
+    [
+        (10, "substituir"),
+        (11, "substituir"),
+        (0, "substituir"),
+        (0, "crescer"),
+        (5, "x"),
+    ],
+)
+def test_quantidade_invalida(quantidade, modo):
+    with pytest.raises(ValueError):
+        validar_quantidade(quantidade, modo, 10)
+
+
+def test_substituir_mantem_o_tamanho(pequeno):
+    modelo, X, y = pequeno
+    antigas = list(modelo.named_steps["rf"].estimators_)
+    atualizar_floresta(modelo, X, y, 3, "substituir", 1, n_jobs=1)
+    rf = modelo.named_steps["rf"]
+    assert rf.n_estimators == len(rf.estimators_) == 10
+    assert rf.estimators_[:7] == antigas[3:]
+
+
+def test_crescer_soma_as_novas(pequeno):
+    modelo, X, y = pequeno
+    atualizar_floresta(modelo, X, y, 15, "crescer", 1, n_jobs=1)
+    assert len(modelo.named_steps["rf"].estimators_) == 25
+
+
+def test_substituir_tudo_e_recusado_sem_mudar_a_floresta(pequeno):
+    modelo, X, y = pequeno
+    antigas = list(modelo.named_steps["rf"].estimators_)
+    with pytest.raises(ValueError, match="crescer"):
+        atualizar_floresta(modelo, X, y, 20, "substituir", 1, n_jobs=1)
+    assert modelo.named_steps["rf"].estimators_ == antigas
+
+
+def test_estado_vale_so_para_a_versao_gravada(historico, tmp_path):
+    caminho = str(tmp_path / "RS")
+    colunas = {nome: np.array(coluna) for nome, coluna in historico.items()}
+    salvar_dataset(colunas, caminho)
+    estado, origem = carregar_estado(caminho, colunas)
+    assert origem == "reconstruido"
+
+    salvar_estado(caminho, estado, colunas["mes"][-1])
+    carregado, origem = carregar_estado(caminho, colunas)
+    assert origem == "carregado"
+    assert carregado.para_dict() == estado.para_dict()
+
+    # Partição regravada por outro caminho: o estado gravado não vale mais
+    salvar_dataset(colunas, caminho)
+    os.utime(os.path.join(caminho, "schema.json"), ns=(1, 1))
+    assert carregar_estado(caminho, colunas)[1] == "reconstruido"
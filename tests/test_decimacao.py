@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from decimacao import decimar, janela, lttb
+
+
+def lttb_referencia(x, y, pontos):
+    """LTTB ponto a ponto, como no algoritmo original (Steinarsson, 2013)"""
+    n = len(x)
+    escolhidos = [0]
+    anterior = 0
+    for balde in range(pontos - 2):
+        inicio = 1 + balde * (n - 2) // (pontos - 2)
+        fim = 1 + (balde + 1) * (n - 2) // (pontos - 2)
+        proximo_fim = min(1 + (balde + 2) * (n - 2) // (pontos - 2), n)
+        if fim >= n - 1:
+            proximo = [n - 1]
+        else:
+            proximo = range(fim, proximo_fim)
+        media_x = sum(x[j] for j in proximo) / len(proximo)
+        media_y = sum(y[j] for j in proximo) / len(proximo)
+        ax, ay = x[anterior], y[anterior]
+        maior = -1.0
+        for j in range(inicio, fim):
+            area = abs((ax - media_x) * (y[j] - ay) - (ax - x[j]) * (media_y - ay))
+            if area > maior:
+                maior, anterior = area, j
+        escolhidos.append(anterior)
+    escolhidos.append(n - 1)
+    return escolhidos
+
+
+@pytest.mark.parametrize("n, pontos", [(10, 3), (100, 7), (1000, 100), (5003, 400)])
+def test_igual_a_referencia(n, pontos):
+    gerador = np.random.default_rng(n)
+    x = np.cumsum(gerador.uniform(0.5, 1.5, n))
+    y = np.cumsum(gerador.normal(size=n))
+    indices = lttb(x, y, pontos)
+    assert indices.tolist() == lttb_referencia(x.tolist(), y.tolist(), pontos)
+
+
+def test_mantem_extremos_e_um_ponto_por_balde():
+    n, pontos = 1000, 50
+    y = np.sin(np.arange(n) / 30)
+    indices = lttb(np.arange(n), y, pontos)
+    assert len(indices) == pontos
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+    limites = 1 + np.arange(pontos - 1) * (n - 2) // (pontos - 2)
+    baldes = np.searchsorted(limites, indices[1:-1], "right") - 1
+    assert baldes.tolist() == list(range(pontos - 2))
+
+
+def test_preserva_pico_que_a_amostragem_perderia():
+    y = np.zeros(10_000)
+    y[4321] = 100.0
+    indices = lttb(np.arange(len(y)), y, 100)
+    assert 4321 in indices
+    assert 4321 not in np.arange(0, len(y), len(y) // 100)
+
+
+def test_series_curtas_voltam_inteiras():
+    x = np.arange(10)
+    np.testing.assert_array_equal(lttb(x, x, 10), x)
+    np.testing.assert_array_equal(lttb(x, x, 50), x)
+    np.testing.assert_array_equal(lttb(x, x, 2), x)
+
+
+def test_janela_inclui_um_vizinho_de_cada_lado():
+    x = np.arange(0, 100, 10)
+    assert janela(x, 25, 55) == slice(2, 7)
+    assert janela(x, 20, 50) == slice(1, 7)
+    assert janela(x) == slice(0, 10)
+    assert janela(x, -5, 1000) == slice(0, 10)
+
+
+def test_decimar_trecho_de_datas():
+    datas = np.datetime64("2015-01-01") + np.arange(100_000).astype("timedelta64[h]")
+    valores = np.random.default_rng(0).normal(size=len(datas))
+    x, y = decimar(datas, valores, 200, "2016-01-01", "2016-03-01")
+    assert len(x) == 200
+    assert x.dtype == datas.dtype
+    assert x[0] < np.datetime64("2016-01-01") <= x[1]
+    assert x[-2] <= np.datetime64("2016-03-01") < x[-1]
+    np.testing.assert_array_equal(y, valores[np.searchsorted(datas, x)])
+    # Sem limites: a série inteira, com as duas pontas
+    x, _ = decimar(datas, valores, 200)
+    assert x[0] == datas[0] and x[-1] == datas[-1]
@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from engenharia_features import (
+    JANELA_MOVEL,
+    FeaturesIncrementais,
+    gerar_features,
+    media_movel,
+)
+
+COLUNAS = ("mes", "temp_media", "precip_media", "area_plantada", "rendimento")
+
+
+def ate(historico, n):
+    return [np.asarray(historico[nome])[:n] for nome in COLUNAS]
+
+
+def test_incremental_igual_ao_lote(historico):
+    # Um mês novo (sem rendimento, como um mês a prever) a partir do estado dos n
+    # primeiros deve dar a mesma linha que o lote sobre os n + 1 meses, sempre que o
+    # lote mantém as mesmas linhas anteriores
+    comparados = 0
+    for n in range(JANELA_MOVEL, len(historico["mes"]) - 1):
+        anteriores = gerar_features(*ate(historico, n))
+        lote = gerar_features(*ate(historico, n + 1))
+        if not np.array_equal(lote["indice"], np.append(anteriores["indice"], n)):
+            continue
+        estado = FeaturesIncrementais.a_partir_do_historico(*ate(historico, n))
+        mes, temp, precip, area, _ = (coluna[n] for coluna in ate(historico, n + 1))
+        linha = estado.atualizar(mes, temp, precip, area)
+        np.testing.assert_array_equal(linha, lote["X"][-1])
+        comparados += 1
+    assert comparados > len(historico["mes"]) // 2
+
+
+def test_estado_acumulado_igual_ao_lote(historico):
+    colunas = ate(historico, len(historico["mes"]))
+    lote = gerar_features(*colunas)
+    estado = FeaturesIncrementais.a_partir_do_historico(*colunas)
+    rendimento = colunas[-1].astype(np.float64)
+    alvo = np.column_stack(
+        [
+            lote["rendimento_relativo"],
+            rendimento[lote["indice"] - 1] / lote["media_anual"],
+        ]
+    )
+    assert estado.n == len(lote["indice"])
+    np.testing.assert_allclose(estado.soma, alvo.sum(axis=0))
+    np.testing.assert_allclose(estado.soma_quadrados, (alvo**2).sum(axis=0))
+    np.testing.assert_array_equal(
+        list(estado.temp), colunas[1][lote["indice"]][-JANELA_MOVEL:]
+    )
+
+
+def test_media_movel_igual_ao_pandas(historico):
+    valores = pd.Series(np.asarray(historico["temp_media"], dtype=np.float64))
+    # Código original: rolling(6).mean(), com o próprio valor nos primeiros meses
+    esperado = valores.rolling(JANELA_MOVEL).mean().fillna(valores)
+    np.testing.assert_allclose(media_movel(valores), esperado, rtol=0, atol=2e-12)
+    curta = valores[: JANELA_MOVEL - 1]
+    np.testing.assert_array_equal(media_movel(curta), curta)
+
+
+def test_primeiro_mes_e_outlier_ficam_de_fora(historico):
+    # Sem rendimento anterior não há defasagem
+    assert FeaturesIncrementais().atualizar(1, 25.0, 100.0, 1000, 3000) is None
+
+    colunas = ate(historico, len(historico["mes"]))
+    mes, temp, precip, area, rendimento = (int(coluna[-1]) for coluna in colunas)
+    estado = FeaturesIncrementais.a_partir_do_historico(*colunas)
+    assert estado.atualizar(mes + 1, temp, precip, area, rendimento) is not None
+    assert estado.atualizar(mes + 2, temp, precip, area, 100 * rendimento) is None
+    # Mês a prever (sem rendimento): o Z-score não se aplica
+    assert estado.atualizar(mes + 3, temp, precip, area) is not None
+
+
+def test_estado_gravado_continua_igual(historico):
+    colunas = ate(historico, len(historico["mes"]))
+    estado = FeaturesIncrementais.a_partir_do_historico(*colunas)
+    copia = FeaturesIncrementais.de_dict(json.loads(json.dumps(estado.para_dict())))
+    mes = int(colunas[0][-1])
+    for passo, rendimento in enumerate((3100, 2900, None), start=1):
+        entrada = (mes + passo, 22.0 + passo, 130.0, 6_000_000, rendimento)
+        np.testing.assert_array_equal(
+            estado.atualizar(*entrada), copia.atualizar(*entrada)
+        )
+    assert estado.para_dict() == copia.para_dict()
@@ -0,0 +1,273 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from aiohttp import web
+
+import ingestao
+from dataset import caminho_regiao, carregar_dataset, listar_regioes, salvar_regiao
+from ingestao import (
+    CacheRespostas,
+    ingerir,
+    ler_nasa_power,
+    ler_sidra,
+    mesclar_colunas,
+    montar_colunas,
+    nome_gravacao,
+    url_nasa_power,
+    url_sidra,
+)
+
+FONTE = {
+    "nome": "Teste",
+    "latitude": -28.65,
+    "longitude": -53.6,
+    "nivel": "n3",
+    "codigo": "43",
+}
+
+# Cabeçalho como a API do SIDRA devolve: código e nome de cada dimensão
+CABECALHO_SIDRA = {
+    "NC": "Nível Territorial (Código)",
+    "NN": "Nível Territorial",
+    "MC": "Unidade de Medida (Código)",
+    "MN": "Unidade de Medida",
+    "V": "Valor",
+    "D1C": "Unidade da Federação (Código)",
+    "D1N": "Unidade da Federação",
+    "D2C": "Mês (Código)",
+    "D2N": "Mês",
+    "D3C": "Variável (Código)",
+    "D3N": "Variável",
+    "D4C": "Produto das lavouras (Código)",
+    "D4N": "Produto das lavouras",
+}
+
+
+def resposta_nasa(ano, temperatura, precipitacao):
+    parametros = {"T2M": {}, "PRECTOTCORR_SUM": {}}
+    for mes in range(1, 13):
+        parametros["T2M"][f"{ano}{mes:02d}"] = temperatura + mes
+        parametros["PRECTOTCORR_SUM"][f"{ano}{mes:02d}"] = precipitacao + mes
+    # Agregado anual (mês 13) e valor ausente
+    parametros["T2M"][f"{ano}13"] = 99.0
+    parametros["PRECTOTCORR_SUM"][f"{ano}12"] = -999
+    return json.dumps({"properties": {"parameter": parametros}}).encode()
+
+
+def resposta_sidra(ano, mes, area, rendimento):
+    linhas = [CABECALHO_SIDRA]
+    for codigo, nome, valor in (
+        ("109", "Área plantada", area),
+        ("112", "Rendimento médio", rendimento),
+        ("216", "Área colhida", "1"),
+    ):
+        linhas.append(
+            {
+                "V": valor,
+                "D2C": f"{ano}{mes:02d}",
+                "D2N": f"mês {mes} {ano}",
+                "D3C": codigo,
+                "D3N": nome,
+            }
+        )
+    return json.dumps(linhas).encode()
+
+
+def test_ler_nasa_power():
+    meses = ler_nasa_power(resposta_nasa(2016, 20.0, 100.0))
+    assert meses[13] == {"temp_media": 21.0, "precip_media": 101.0}
+    # Sem o agregado anual e sem o valor ausente
+    assert len(meses) == 12
+    assert meses[24] == {"temp_media": 32.0}
+
+
+def test_ler_sidra_usa_as_colunas_de_codigo():
+    assert ler_sidra(resposta_sidra(2015, 2, "6700000", "3150")) == {
+        2: {"area_plantada": 6_700_000, "rendimento": 3150}
+    }
+    # "-", "..", "..." e "X": valores nulos ou sigilosos ficam de fora
+    for marcador in ("-", "..", "...", "X"):
+        assert ler_sidra(resposta_sidra(2015, 2, marcador, "3150")) == {
+            2: {"rendimento": 3150}
+        }
+
+
+def test_montar_colunas_para_no_primeiro_mes_incompleto():
+    completo = {"temp_media": 20.0, "precip_media": 100.0}
+    completo |= {"area_plantada": 10, "rendimento": 3000}
+    dados = {1: completo, 2: completo, 3: {"temp_media": 20.0}, 4: completo}
+    colunas = montar_colunas(dados, 1)
+    np.testing.assert_array_equal(colunas["mes"], [1, 2])
+    assert colunas["mes"].dtype == np.int32
+    assert colunas["area_plantada"].dtype == np.int64
+
+
+def test_cache_enderecado_pelo_conteudo(tmp_path):
+    cache = CacheRespostas(str(tmp_path))
+    assert cache.gravar("http://a/x?p=1", b"{}") is True
+    assert cache.gravar("http://b/x?p=1", b"{}") is False  # mesma requisição
+    assert cache.gravar("http://a/y", b"{}") is True
+    assert len(list((tmp_path / "objetos").iterdir())) == 1
+    cache.salvar_indice()
+    assert CacheRespostas(str(tmp_path)).obter("http://outro/x?p=1") == b"{}"
+
+
+@pytest.fixture
+def fontes(tmp_path, monkeypatch):
+    """Dataset vazio com uma região de teste e as respostas gravadas de 2015"""
+    raiz = tmp_path / "dataset"
+    raiz.mkdir()
+    (raiz / "fontes.json").write_text(json.dumps({"T1": FONTE}), encoding="utf-8")
+    gravacoes = tmp_path / "gravacoes"
+    gravacoes.mkdir()
+
+    def gravar(url, conteudo):
+        (gravacoes / nome_gravacao(url)).write_bytes(conteudo)
+
+    gravar(url_nasa_power(FONTE, 2015), resposta_nasa(2015, 20.0, 100.0))
+    for mes in (1, 2, 3):
+        gravar(
+            url_sidra(FONTE, 2015, mes), resposta_sidra(2015, mes, "6700000", "3150")
+        )
+    return raiz, gravacoes, gravar
+
+
+async def com_servidor(gravacoes, monkeypatch, corrotina):
+    executor = web.AppRunner(ingestao.criar_servidor_gravado(str(gravacoes)))
+    await executor.setup()
+    site = web.TCPSite(executor, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{executor.addresses[0][1]}"
+    monkeypatch.setattr(ingestao, "URL_NASA_POWER", url)
+    monkeypatch.setattr(ingestao, "URL_SIDRA", url)
+    try:
+        return await corrotina
+    finally:
+        await executor.cleanup()
+
+
+def test_ingestao_grava_e_depois_usa_o_cache(fontes, tmp_path, monkeypatch):
+    raiz, gravacoes, _ = fontes
+    cache = str(tmp_path / "cache")
+    relatorio = asyncio.run(
+        com_servidor(
+            gravacoes,
+            monkeypatch,
+            ingerir(["T1"], 1, 3, str(raiz), CacheRespostas(cache)),
+        )
+    )
+    assert relatorio["T1"] == {
+        "linhas": 3,
+        "gravado": True,
+        "requisicoes": {"novo": 4},
+    }
+    colunas = carregar_dataset(caminho_regiao("T1", str(raiz)))
+    np.testing.assert_array_equal(colunas["mes"], [1, 2, 3])
+    np.testing.assert_array_equal(colunas["temp_media"], [21.0, 22.0, 23.0])
+    np.testing.assert_array_equal(colunas["rendimento"], [3150] * 3)
+    assert listar_regioes(str(raiz)) == {"T1": "Teste"}
+
+    # Períodos fechados vêm do cache, sem servidor, e o dataset não é regravado
+    relatorio = asyncio.run(ingerir(["T1"], 1, 3, str(raiz), CacheRespostas(cache)))
+    assert relatorio["T1"] == {
+        "linhas": 3,
+        "gravado": False,
+        "requisicoes": {"cache": 4},
+    }
+
+
+def test_mes_revisado_regrava_so_quando_muda(fontes, tmp_path, monkeypatch):
+    raiz, gravacoes, gravar = fontes
+    cache = str(tmp_path / "cache")
+    # Abril de 2015 como mês atual: a partir de fevereiro tudo ainda está em revisão
+    monkeypatch.setattr(ingestao, "mes_atual", lambda: 4)
+
+    def rodar():
+        return asyncio.run(
+            com_servidor(
+                gravacoes,
+                monkeypatch,
+                ingerir(["T1"], 1, 3, str(raiz), CacheRespostas(cache)),
+            )
+        )["T1"]
+
+    assert rodar()["gravado"] is True
+    relatorio = rodar()
+    assert relatorio["gravado"] is False
+    assert relatorio["requisicoes"] == {"cache": 1, "inalterado": 3}
+
+    gravar(url_sidra(FONTE, 2015, 3), resposta_sidra(2015, 3, "6700000", "2900"))
+    relatorio = rodar()
+    assert relatorio["gravado"] is True
+    assert relatorio["requisicoes"] == {"cache": 1, "inalterado": 2, "novo": 1}
+    colunas = carregar_dataset(caminho_regiao("T1", str(raiz)))
+    np.testing.assert_array_equal(colunas["rendimento"], [3150, 3150, 2900])
+
+
+def colunas_de_teste(meses, rendimento):
+    meses = np.asarray(meses)
+    return {
+        "mes": meses.astype(np.int32),
+        "temp_media": meses + 0.5,
+        "precip_media": meses + 100.0,
+        "area_plantada": np.full(len(meses), 10, dtype=np.int64),
+        "rendimento": np.full(len(meses), rendimento, dtype=np.int64),
+    }
+
+
+def test_mesclar_sobrescreve_e_anexa_pelo_mes():
+    atual = colunas_de_teste([3, 4, 5], 1000)
+    colunas = mesclar_colunas(atual, colunas_de_teste([5, 6], 2000))
+    np.testing.assert_array_equal(colunas["mes"], [3, 4, 5, 6])
+    np.testing.assert_array_equal(colunas["rendimento"], [1000, 1000, 2000, 2000])
+    colunas = mesclar_colunas(atual, colunas_de_teste([1, 2], 2000))
+    np.testing.assert_array_equal(colunas["mes"], [1, 2, 3, 4, 5])
+    assert colunas["mes"].dtype == np.int32
+    assert mesclar_colunas(None, atual) is atual
+
+
+def test_mesclar_recusa_buracos():
+    atual = colunas_de_teste([3, 4, 5], 1000)
+    with pytest.raises(ValueError, match="buraco"):
+        mesclar_colunas(atual, colunas_de_teste([7, 8], 2000))
+    with pytest.raises(ValueError, match="buraco"):
+        mesclar_colunas(atual, colunas_de_teste([1], 2000))
+    with pytest.raises(ValueError, match="contínuos"):
+        mesclar_colunas(colunas_de_teste([1, 3], 1000), colunas_de_teste([4], 2000))
+
+
+def test_periodo_parcial_mantem_os_meses_anteriores(fontes, tmp_path, monkeypatch):
+    raiz, gravacoes, _ = fontes
+    # Partição com 2014 inteiro (meses -11..0) e janeiro de 2015
+    salvar_regiao(colunas_de_teste(np.arange(-11, 2), 1000), "T1", "Teste", str(raiz))
+    relatorio = asyncio.run(
+        com_servidor(
+            gravacoes,
+            monkeypatch,
+            ingerir(["T1"], 2, 3, str(raiz), CacheRespostas(str(tmp_path / "c"))),
+        )
+    )
+    assert relatorio["T1"]["gravado"] is True
+    colunas = carregar_dataset(caminho_regiao("T1", str(raiz)))
+    np.testing.assert_array_equal(colunas["mes"], np.arange(-11, 4))
+    np.testing.assert_array_equal(colunas["rendimento"][:13], [1000] * 13)
+    np.testing.assert_array_equal(colunas["rendimento"][13:], [3150, 3150])
+    np.testing.assert_array_equal(colunas["temp_media"][13:], [22.0, 23.0])
+
+
+def test_periodo_com_buraco_nao_grava(fontes, tmp_path, monkeypatch):
+    raiz, gravacoes, _ = fontes
+    salvar_regiao(colunas_de_teste([6, 7], 1000), "T1", "Teste", str(raiz))
+    relatorio = asyncio.run(
+        com_servidor(
+            gravacoes,
+            monkeypatch,
+            ingerir(["T1"], 1, 3, str(raiz), CacheRespostas(str(tmp_path / "c"))),
+        )
+    )
+    assert relatorio["T1"]["gravado"] is False
+    assert "buraco" in relatorio["T1"]["erro"]
+    colunas = carregar_dataset(caminho_regiao("T1", str(raiz)))
+    np.testing.assert_array_equal(colunas["mes"], [6, 7])
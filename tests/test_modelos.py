@@ -0,0 +1,167 @@
+import os
+import time
+
+import joblib
+import numpy as np
+import pytest
+
+from modelos import (
+    RegistroModelos,
+    caminho_artefato,
+    caminho_modelo,
+    floresta_mapeada,
+    tamanho_em_memoria,
+)
+from motor_inferencia import FlorestaCompilada
+
+
+def registro_de_teste(limite_bytes=1000, versoes=None):
+    """Registro de arrays de 400 bytes por chave, com as cargas anotadas"""
+    cargas = []
+
+    def carregar(chave):
+        cargas.append(chave)
+        return np.zeros(50)
+
+    versao = versoes.get if versoes is not None else None
+    return RegistroModelos(carregar, versao=versao, limite_bytes=limite_bytes), cargas
+
+
+def test_carrega_uma_vez_e_conta_acertos():
+    registro, cargas = registro_de_teste()
+    primeiro = registro.obter("RS")
+    assert registro.obter("RS") is primeiro
+    assert cargas == ["RS"]
+    estatisticas = registro.estatisticas()
+    assert (estatisticas["acertos"], estatisticas["falhas"]) == (1, 1)
+    assert estatisticas["taxa_acerto"] == 0.5
+    assert estatisticas["bytes_em_uso"] == 400
+
+
+def test_descarta_o_usado_ha_mais_tempo():
+    registro, cargas = registro_de_teste(limite_bytes=1000)
+    registro.obter("a")
+    registro.obter("b")
+    registro.obter("a")  # "b" passa a ser o menos recente
+    registro.obter("c")
+    assert registro.estatisticas()["residentes"] == ["a", "c"]
+    assert registro.descartes == 1
+    registro.obter("b")
+    assert cargas == ["a", "b", "c", "b"]
+    assert registro.bytes_em_uso <= registro.limite_bytes
+
+
+def test_recem_carregado_fica_mesmo_acima_do_limite():
+    registro, _ = registro_de_teste(limite_bytes=100)
+    registro.obter("a")
+    registro.obter("b")
+    assert "b" in registro and "a" not in registro
+    assert len(registro) == 1
+
+
+def test_recarrega_quando_a_versao_muda():
+    versoes = {"RS": 1}
+    registro, cargas = registro_de_teste(versoes=versoes)
+    antigo = registro.obter("RS")
+    versoes["RS"] = 2
+    assert registro.obter("RS") is not antigo
+    assert registro.obter("RS") is registro.obter("RS")
+    assert cargas == ["RS", "RS"]
+
+
+def test_tamanho_em_memoria():
+    array = np.zeros(1000)
+    # Vistas e repetições contam uma vez, pelo array que tem os dados
+    assert tamanho_em_memoria({"a": array, "b": array[:10], "c": [array]}) == 8000
+
+
+def test_tamanho_do_pipeline_conta_as_arvores(pipeline):
+    nos = sum(arvore.tree_.node_count for arvore in pipeline.named_steps["rf"])
+    # Cada nó do sklearn ocupa mais de 8 bytes (filhos, feature, limiar, ...)
+    assert tamanho_em_memoria(pipeline) > nos * 8 * 5
+
+
+@pytest.fixture
+def modelo_salvo(pipeline, tmp_path):
+    caminho = str(tmp_path / "modelo.pkl")
+    joblib.dump(pipeline, caminho)
+    return caminho
+
+
+def versoes(tmp_path):
+    return sorted(
+        nome for nome in os.listdir(tmp_path) if nome.startswith(".modelo.floresta-")
+    )
+
+
+def tocar(caminho, segundos=10):
+    futuro = time.time() + segundos
+    os.utime(caminho, (futuro, futuro))
+
+
+def test_floresta_mapeada_nao_ocupa_memoria_e_e_regenerada(
+    modelo_salvo, pipeline, tmp_path, X_historico
+):
+    floresta = floresta_mapeada(modelo_salvo)
+    assert tamanho_em_memoria(floresta) < 10_000
+    assert floresta.metadados["importancias"] == pytest.approx(
+        pipeline.named_steps["rf"].feature_importances_
+    )
+    destino = str(tmp_path / "modelo.floresta")
+    assert os.path.islink(destino)
+    primeira = os.path.realpath(destino)
+
+    # Um .pkl mais novo que a versão gerada faz a floresta ser recompilada: o link
+    # passa para a nova versão e a antiga é removida depois da troca
+    tocar(modelo_salvo)
+    nova = floresta_mapeada(modelo_salvo)
+    assert os.path.realpath(destino) != primeira
+    assert versoes(tmp_path) == [os.path.basename(os.path.realpath(destino))]
+    # Quem já tinha a versão antiga mapeada continua lendo dela
+    np.testing.assert_array_equal(
+        floresta.prever(X_historico), nova.prever(X_historico)
+    )
+
+
+def test_diretorio_no_formato_antigo_vira_link(modelo_salvo, pipeline, tmp_path):
+    destino = str(tmp_path / "modelo.floresta")
+    FlorestaCompilada.compilar(pipeline).salvar(destino)
+    tocar(modelo_salvo)
+    floresta_mapeada(modelo_salvo)
+    assert os.path.islink(destino)
+    assert len(versoes(tmp_path)) == 1
+
+
+def test_versao_sendo_gravada_por_outro_processo_fica(modelo_salvo, tmp_path):
+    floresta_mapeada(modelo_salvo)
+    # Outro processo no meio de salvar(): vetores sem o floresta.json
+    em_andamento = tmp_path / ".modelo.floresta-outro"
+    em_andamento.mkdir()
+    (em_andamento / "feature.npy").write_bytes(b"")
+    tocar(modelo_salvo)
+    floresta_mapeada(modelo_salvo)
+    assert em_andamento.exists()
+
+
+def test_abrir_tenta_de_novo_se_a_versao_sumir(modelo_salvo, monkeypatch):
+    floresta_mapeada(modelo_salvo)
+    abrir = FlorestaCompilada.abrir
+    chamadas = []
+
+    def abrir_com_troca(caminho, *args, **kwargs):
+        chamadas.append(caminho)
+        if len(chamadas) == 1:
+            raise FileNotFoundError(caminho)
+        return abrir(caminho, *args, **kwargs)
+
+    monkeypatch.setattr(FlorestaCompilada, "abrir", abrir_com_troca)
+    assert floresta_mapeada(modelo_salvo).n_arvores == 800
+    assert len(chamadas) == 2
+
+
+def test_caminhos():
+    assert caminho_modelo() == "modelo_produtividade_soja.pkl"
+    assert caminho_modelo("4314902", "raiz") == os.path.join(
+        "raiz", "modelos", "modelo_produtividade_soja_4314902.pkl"
+    )
+    assert caminho_artefato("modelos/m.pkl") == "modelos/m.artefato.npy"
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engenharia_features import FEATURES
+from modelos import tamanho_em_memoria
+from motor_inferencia import FlorestaCompilada
+
+
+@pytest.fixture(scope="module")
+def floresta(pipeline):
+    return FlorestaCompilada.compilar(pipeline)
+
+
+@pytest.fixture(scope="module")
+def linhas_aleatorias(X_historico):
+    # Sorteadas dentro da faixa de cada feature no histórico, em mais de um bloco
+    gerador = np.random.default_rng(0)
+    minimo, maximo = X_historico.min().to_numpy(), X_historico.max().to_numpy()
+    return pd_frame(gerador.uniform(minimo, maximo, size=(600, len(FEATURES))))
+
+
+def pd_frame(matriz):
+    return pd.DataFrame(matriz, columns=FEATURES)
+
+
+def test_igual_ao_pipeline_no_historico(floresta, pipeline, X_historico):
+    np.testing.assert_array_equal(
+        floresta.prever(X_historico), pipeline.predict(X_historico)
+    )
+
+
+def test_igual_ao_pipeline_em_linhas_aleatorias(floresta, pipeline, linhas_aleatorias):
+    assert len(linhas_aleatorias) > FlorestaCompilada.ELEMENTOS_POR_BLOCO // 800
+    np.testing.assert_array_equal(
+        floresta.prever(linhas_aleatorias), pipeline.predict(linhas_aleatorias)
+    )
+
+
+def test_igual_ao_pipeline_sobre_os_limiares(floresta, pipeline, X_historico):
+    # Cada linha põe uma feature exatamente sobre um limiar (já no espaço original)
+    # ou no float64 seguinte: é onde um limiar mal convertido mudaria o caminho
+    gerador = np.random.default_rng(1)
+    internos = np.flatnonzero(np.isfinite(floresta.limiar))
+    nos = gerador.choice(internos, size=1500, replace=False)
+    base = X_historico.to_numpy()[gerador.integers(len(X_historico), size=len(nos))]
+    linhas = []
+    for deslocamento in (0, np.inf):
+        matriz = base.copy()
+        valores = floresta.limiar[nos]
+        if deslocamento:
+            valores = np.nextafter(valores, deslocamento)
+        matriz[np.arange(len(nos)), floresta.feature[nos]] = valores
+        linhas.append(matriz)
+    X = pd_frame(np.vstack(linhas))
+    np.testing.assert_array_equal(floresta.prever(X), pipeline.predict(X))
+
+
+def test_saida_por_arvore_e_intervalo(floresta, pipeline, X_historico):
+    X = X_historico.iloc[:50]
+    padronizado = pipeline.named_steps["scaler"].transform(X).astype(np.float32)
+    por_arvore = np.stack(
+        [arvore.predict(padronizado) for arvore in pipeline.named_steps["rf"]]
+    )
+    np.testing.assert_array_equal(floresta.prever_por_arvore(X), por_arvore)
+
+    previsao, quantis = floresta.prever_intervalo(X)
+    np.testing.assert_array_equal(previsao, pipeline.predict(X))
+    np.testing.assert_array_equal(
+        quantis, np.quantile(por_arvore, (0.1, 0.5, 0.9), axis=0)
+    )
+
+
+def test_forma_compacta_difere_so_na_precisao_das_folhas(pipeline, linhas_aleatorias):
+    compacta = FlorestaCompilada.compilar(pipeline, compacta=True)
+    assert compacta.limiar.dtype == compacta.valor.dtype == np.float32
+    np.testing.assert_allclose(
+        compacta.prever(linhas_aleatorias),
+        pipeline.predict(linhas_aleatorias),
+        rtol=1e-6,
+    )
+
+
+def test_salvar_e_abrir_mapeado(floresta, pipeline, X_historico, tmp_path):
+    floresta.salvar(tmp_path / "floresta")
+    aberta = FlorestaCompilada.abrir(tmp_path / "floresta")
+    assert tamanho_em_memoria(aberta) < 10_000  # vetores mapeados, não copiados
+    assert aberta.features == floresta.features
+    np.testing.assert_array_equal(
+        aberta.prever(X_historico), pipeline.predict(X_historico)
+    )
+
+
+def test_matriz_com_numero_errado_de_features(floresta):
+    with pytest.raises(ValueError, match="features"):
+        floresta.prever(np.zeros((2, len(FEATURES) - 1)))
@@ -0,0 +1,103 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    import main
+
+LINHA = {
+    "mes_cos": 1.0,
+    "mes_sin": 0.0,
+    "temp_movel": 20.5,
+    "precip_movel": 120.0,
+    "clima_interacao": 2460.0,
+    "area_plantada": 6700000,
+}
+
+
+@pytest.fixture(scope="module")
+def cliente():
+    return main.app.server.test_client()
+
+
+def prever(cliente, corpo):
+    return cliente.post("/predict", json=corpo)
+
+
+def test_linhas_em_dict_e_em_lista_dao_o_mesmo_resultado(cliente):
+    features = main.modelo_regiao()["features"]
+    por_dict = prever(cliente, {"linhas": [LINHA] * 3, "media_anual": 3000})
+    por_lista = prever(
+        cliente, {"linhas": [[LINHA[f] for f in features]] * 3, "media_anual": 3000}
+    )
+    assert por_dict.status_code == por_lista.status_code == 200
+    assert por_dict.get_json() == por_lista.get_json()
+    corpo = por_dict.get_json()
+    assert len(corpo["rendimento"]) == 3
+    assert corpo["rendimento"][0] == pytest.approx(
+        corpo["rendimento_relativo"][0] * 3000
+    )
+
+
+def test_intervalos(cliente):
+    corpo = prever(cliente, {"linhas": [LINHA], "intervalos": True}).get_json()
+    p10, p50, p90 = (corpo["intervalo_relativo"][q][0] for q in ("p10", "p50", "p90"))
+    assert p10 <= p50 <= p90
+
+
+@pytest.mark.parametrize(
+    "corpo",
+    [
+        # só a primeira linha era conferida (KeyError: 'mes_cos' → 500)
+        {"linhas": [LINHA, {"mes_sin": 1.0}]},
+        # 'linhas' que não é lista (KeyError: 0 → 500)
+        {"linhas": {"a": 1}},
+        {"linhas": "abc"},
+        # null virava NaN e passava pela floresta (200)
+        {"linhas": [[1, 2, 3, 4, 5, None]]},
+        {"linhas": [{**LINHA, "temp_movel": None}]},
+        {"linhas": [[1, 2, 3]]},
+        {"linhas": [[1, 2, 3, 4, 5, "x"]]},
+        {"linhas": [LINHA, [1, 2, 3, 4, 5, 6]]},
+        {"linhas": [LINHA], "media_anual": "x"},
+        {"linhas": [LINHA], "media_anual": [1, 2]},
+        {"linhas": []},
+        {"linhas": [LINHA], "regiao": "XX"},
+    ],
+)
+def test_entradas_invalidas_retornam_400(cliente, corpo):
+    resposta = prever(cliente, corpo)
+    assert resposta.status_code == 400
+    assert "erro" in resposta.get_json()
+
+
+@pytest.mark.parametrize("valor", ["NaN", "Infinity", "-Infinity"])
+def test_valores_nao_finitos_retornam_400(cliente, valor):
+    # JSON com NaN/Infinity literais (aceitos pelo json.loads do Python)
+    corpo = '{"linhas": [[1, 0, 20, 120, %s, 6700000]]}' % valor
+    resposta = cliente.post("/predict", data=corpo, content_type="application/json")
+    assert resposta.status_code == 400
+    media = '{"linhas": [[1, 0, 20, 120, 2400, 6700000]], "media_anual": %s}' % valor
+    resposta = cliente.post("/predict", data=media, content_type="application/json")
+    assert resposta.status_code == 400
+
+
+@pytest.mark.parametrize("tamanho", [10, main.LOTE_MAXIMO_MOTOR + 1])
+def test_lotes_pequenos_e_grandes_conferem_com_o_pipeline(cliente, pipeline, tamanho):
+    # Acima de LOTE_MAXIMO_MOTOR o lote vai para o pipeline do sklearn (mesmo com o
+    # artefato carregado); abaixo, o motor compacto difere só na precisão float32
+    gerador = np.random.default_rng(0)
+    matriz = np.tile([LINHA[f] for f in main.FEATURES], (tamanho, 1))
+    matriz[:, 2:4] += gerador.normal(0, 2, (tamanho, 2))
+    matriz[:, 4] = matriz[:, 2] * matriz[:, 3]
+    resposta = prever(cliente, {"linhas": matriz.tolist()})
+    assert resposta.status_code == 200
+    esperado = pipeline.predict(pd.DataFrame(matriz, columns=main.FEATURES))
+    obtido = np.array(resposta.get_json()["rendimento_relativo"])
+    if tamanho > main.LOTE_MAXIMO_MOTOR:
+        np.testing.assert_array_equal(obtido, esperado)
+    else:
+        np.testing.assert_allclose(obtido, esperado, rtol=1e-6)
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tabela_historico import IndiceTabela, formatar_brl, interpretar_filtro
+
+CASAS = {"Temperatura média (°C)": 1, "Área plantada (ha)": 0}
+
+
+@pytest.fixture
+def tabela():
+    historico = pd.DataFrame(
+        {
+            "Ano": [2020, 2020, 2020, 2021, 2021],
+            "Mês": ["Janeiro", "Fevereiro", "Março", "Janeiro", "Fevereiro"],
+            "Temperatura média (°C)": [24.5, 19.0, 21.25, 25.0, 18.0],
+            "Área plantada (ha)": [6_700_000, 6_800_000, 6_750_000, 6_900_000, 7e6],
+        }
+    )
+    return IndiceTabela(historico, CASAS, chaves={"Mês": [1, 2, 3, 1, 2]})
+
+
+def meses(tabela, filter_query, ano=2020):
+    registros, _ = tabela.pagina(ano, filter_query=filter_query)
+    return [registro["Mês"] for registro in registros]
+
+
+# filter_query como a linha de filtro do DataTable envia (colunas do tipo "text")
+@pytest.mark.parametrize(
+    "filter_query, esperado",
+    [
+        # filter_options case "insensitive" (o padrão no main.py)
+        ("{Mês} icontains jan", ["Janeiro"]),
+        ("{Mês} icontains ÇO", ["Março"]),
+        ('{Mês} i= "fevereiro"', ["Fevereiro"]),
+        # case "sensitive" (padrão do DataTable)
+        ("{Mês} scontains jan", []),
+        ("{Mês} scontains Jan", ["Janeiro"]),
+        ("{Mês} s= Fevereiro", ["Fevereiro"]),
+        ("{Mês} s!= Fevereiro", ["Janeiro", "Março"]),
+        # comparações numéricas, com ponto ou vírgula decimal
+        ("{Temperatura média (°C)} s> 20", ["Janeiro", "Março"]),
+        ("{Temperatura média (°C)} i<= 21,25", ["Fevereiro", "Março"]),
+        ("{Área plantada (ha)} s>= 6.750.000", ["Fevereiro", "Março"]),
+        # texto exibido (formatação brasileira)
+        ("{Temperatura média (°C)} icontains 21,2", ["Março"]),
+        # vários termos
+        ("{Temperatura média (°C)} s> 20 && {Mês} icontains mar", ["Março"]),
+    ],
+)
+def test_filtro_da_interface(tabela, filter_query, esperado):
+    assert meses(tabela, filter_query) == esperado
+
+
+def test_operadores_sem_prefixo_mantem_o_comportamento():
+    assert interpretar_filtro("{Mês} contains jan && {Ano} eq 2020") == [
+        ("Mês", "contains", "jan", False),
+        ("Ano", "=", "2020", True),
+    ]
+
+
+def test_prefixo_de_caso():
+    assert interpretar_filtro("{Mês} scontains Jan && {Mês} ICONTAINS jan") == [
+        ("Mês", "contains", "Jan", True),
+        ("Mês", "contains", "jan", False),
+    ]
+
+
+def test_termos_invalidos_sao_ignorados(tabela):
+    assert interpretar_filtro("{Mês} xcontains jan") == []
+    assert meses(tabela, "{Coluna inexistente} s= 1") == [
+        "Janeiro",
+        "Fevereiro",
+        "Março",
+    ]
+
+
+def test_ordenacao_e_paginacao(tabela):
+    ordenado = [{"column_id": "Temperatura média (°C)", "direction": "desc"}]
+    registros, paginas = tabela.pagina(2020, 0, 2, ordenado)
+    assert paginas == 2
+    assert [registro["Mês"] for registro in registros] == ["Janeiro", "Março"]
+    # Mês ordena pela chave numérica, não alfabeticamente
+    registros, _ = tabela.pagina(
+        2021, sort_by=[{"column_id": "Mês", "direction": "asc"}]
+    )
+    assert [registro["Mês"] for registro in registros] == ["Janeiro", "Fevereiro"]
+    assert tabela.pagina(1999) == ([], 0)
+
+
+def format_brl(x, dec=0):
+    """Formatação célula a célula que o formatar_brl substituiu (referência)"""
+    if pd.isnull(x):
+        return ""
+    if dec == 0:
+        return (
+            f"{int(round(x)):,}".replace(",", "X").replace(".", ",").replace("X", ".")
+        )
+    return f"{x:,.{dec}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def test_formatar_brl_igual_a_formatacao_por_celula():
+    bordas = [0, -0.0, 0.05, -0.04, 0.5, -0.5, 1.5, 2.5, -2.5, 0.25, 0.35, 999.95]
+    grandes = [1234.5, -1234567.891, 999_999.5, 1e9, -1e12, np.nan]
+    aleatorios = np.random.default_rng(0).normal(0, 10.0 ** np.arange(-2, 8), (50, 10))
+    valores = np.concatenate([bordas, grandes, aleatorios.ravel()])
+    for casas in (0, 1, 2):
+        esperado = [format_brl(valor, casas) for valor in valores]
+        assert formatar_brl(valores, casas).tolist() == esperado
+    assert formatar_brl([-0.04], 1).tolist() == ["-0,0"]
+    assert formatar_brl([-0.4], 0).tolist() == ["0"]
+
+
+def test_tabela_do_historico_igual_a_formatacao_por_celula(historico):
+    colunas = {
+        "Temperatura média (°C)": ("temp_media", 1),
+        "Precipitação média (mm)": ("precip_media", 1),
+        "Área plantada (ha)": ("area_plantada", 0),
+        "Rendimento médio da produção (kg/ha)": ("rendimento", 0),
+    }
+    tabela = pd.DataFrame(
+        {"Ano": 2015 + (np.asarray(historico["mes"]) - 1) // 12}
+        | {coluna: historico[nome] for coluna, (nome, _) in colunas.items()}
+    )
+    indice = IndiceTabela(
+        tabela, {coluna: casas for coluna, (_, casas) in colunas.items()}
+    )
+    for ano, linhas in tabela.groupby("Ano"):
+        registros, _ = indice.pagina(ano, tamanho=12)
+        assert registros == [
+            {
+                coluna: format_brl(linha[coluna], casas)
+                for coluna, (_, casas) in colunas.items()
+            }
+            for _, linha in linhas.iterrows()
+        ]
@@ -0,0 +1,79 @@
+"""Ponto de entrada WSGI de produção do dashboard.
+
+Uso:
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Com preload_app (gunicorn.conf.py), o processo mestre importa este módulo uma única
+vez, antes do fork: dataset, índices da tabela, modelos e figuras de todas as regiões
+são carregados aqui e os workers herdam essas páginas copy-on-write, em vez de cada
+um montar a sua cópia. Ao final, gc.freeze() move os objetos pré-carregados para a
+geração permanente do coletor de lixo: as coletas nos workers deixam de percorrer
+(e de escrever nos cabeçalhos de) esses objetos, o que copiaria as páginas.
+"""
+
+import gc
+import logging
+import os
+
+import main
+
+# Avisos no log de erros do gunicorn (fora dele, vão para o stderr)
+log = logging.getLogger("gunicorn.error")
+
+# Regiões carregadas antes do fork (códigos separados por vírgula); padrão: todas
+# as que têm modelo treinado
+PRECARREGAR_REGIOES = os.environ.get("PRECARREGAR_REGIOES")
+
+# Rotas requisitadas uma vez no mestre: o Dash monta o registro de callbacks, o
+# layout e o índice dos assets na primeira requisição
+ROTAS_AQUECIMENTO = ("/", "/_dash-layout", "/_dash-dependencies")
+
+
+def precarregar(regioes=None):
+    """Carrega dados, modelos e figuras das regiões e aquece as rotas do Dash
+
+    Regiões sem modelo treinado são ignoradas. O pré-carregamento para antes de
+    estourar o orçamento do registro de modelos (MODELOS_MEMORIA_MB): um modelo a
+    mais só descartaria outro já carregado. As demais regiões são carregadas sob
+    demanda pelos workers. Retorna as regiões pré-carregadas.
+    """
+    if regioes is None:
+        regioes = (
+            [regiao.strip() for regiao in PRECARREGAR_REGIOES.split(",")]
+            if PRECARREGAR_REGIOES
+            else list(main.regioes)
+        )
+    registro = main.registro_modelos
+    carregadas, maior = [], 0
+    for posicao, regiao in enumerate(regioes):
+        if regiao not in main.regioes:
+            log.warning(
+                "Pré-carregamento: região %s sem modelo treinado, ignorada", regiao
+            )
+            continue
+        if carregadas and registro.bytes_em_uso + maior > registro.limite_bytes:
+            log.warning(
+                "Pré-carregamento interrompido no limite de %.0f MB do registro de "
+                "modelos; carregadas sob demanda: %s",
+                registro.limite_bytes / 2**20,
+                ", ".join(regioes[posicao:]),
+            )
+            break
+        antes = registro.bytes_em_uso
+        main.dados_regiao(regiao)
+        main.modelo_regiao(regiao)
+        main.warm_figure_cache(regiao)
+        maior = max(maior, registro.bytes_em_uso - antes)
+        carregadas.append(regiao)
+    cliente = main.app.server.test_client()
+    for rota in ROTAS_AQUECIMENTO:
+        cliente.get(rota)
+    return carregadas
+
+
+precarregar()
+# Tudo o que foi criado até aqui fica fora das coletas (e intocado nos workers)
+gc.collect()
+gc.freeze()
+
+application = main.app.server